@@ -0,0 +1 @@
+"""效能測試腳本"""
@@ -0,0 +1,176 @@
+"""Flex 訊息建立效能比較
+
+比較收據型 bubble (含 N 個品項列) 每則訊息的建立時間：
+- 手寫字典：處理器每次以字典常值建立整棵樹
+- 深複製範本：copy.deepcopy 範本後遞迴代入參數
+- 編譯範本：FlexTemplate 渲染計畫，只重建含參數的節點
+並比較轉換為 LINE SDK 訊息後序列化為 JSON 的時間
+(FlexSendMessage 重新建立 SDK 物件 vs PrebuiltFlexSendMessage)。
+
+執行方式:
+    python -m benchmarks.bench_flex_template
+"""
+
+import argparse
+import copy
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from linebot.models import FlexSendMessage
+
+from linebot_module.infrastructure.flex_template import (
+    PLACEHOLDER, FlexTemplate, PrebuiltFlexSendMessage
+)
+
+
+def _row(label: str, value: str) -> Dict[str, Any]:
+    return {
+        "type": "box",
+        "layout": "horizontal",
+        "contents": [
+            {"type": "text", "text": label, "size": "sm", "color": "#555555", "flex": 0},
+            {"type": "text", "text": value, "size": "sm", "color": "#111111", "align": "end"},
+        ],
+    }
+
+
+def build_template(item_count: int) -> Dict[str, Any]:
+    """建立收據範本：標題、訂單編號與總金額為參數，品項列為靜態內容"""
+    return {
+        "type": "bubble",
+        "body": {
+            "type": "box",
+            "layout": "vertical",
+            "contents": [
+                {"type": "text", "text": "RECEIPT", "weight": "bold", "color": "#1DB446", "size": "sm"},
+                {"type": "text", "text": "{{ store }}", "weight": "bold", "size": "xxl", "margin": "md"},
+                {"type": "separator", "margin": "xxl"},
+                {
+                    "type": "box",
+                    "layout": "vertical",
+                    "margin": "xxl",
+                    "spacing": "sm",
+                    "contents": [_row(f"品項 {i}", f"${i * 10}.00") for i in range(item_count)],
+                },
+                {"type": "separator", "margin": "xxl"},
+                _row("TOTAL", "${{ total }}"),
+                {"type": "text", "text": "訂單編號 #{{ order_id }}", "size": "xs", "color": "#aaaaaa"},
+            ],
+        },
+        "footer": {
+            "type": "box",
+            "layout": "vertical",
+            "contents": [{
+                "type": "button",
+                "action": {"type": "uri", "label": "查看訂單", "uri": "{{ order_url }}"},
+            }],
+        },
+    }
+
+
+def naive_builder(item_count: int) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """回傳每次以字典常值建立整棵樹的函式 (模擬手寫處理器)"""
+    def build(params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "type": "bubble",
+            "body": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {"type": "text", "text": "RECEIPT", "weight": "bold", "color": "#1DB446", "size": "sm"},
+                    {"type": "text", "text": params["store"], "weight": "bold", "size": "xxl", "margin": "md"},
+                    {"type": "separator", "margin": "xxl"},
+                    {
+                        "type": "box",
+                        "layout": "vertical",
+                        "margin": "xxl",
+                        "spacing": "sm",
+                        "contents": [_row(f"品項 {i}", f"${i * 10}.00") for i in range(item_count)],
+                    },
+                    {"type": "separator", "margin": "xxl"},
+                    _row("TOTAL", f"${params['total']}"),
+                    {"type": "text", "text": f"訂單編號 #{params['order_id']}", "size": "xs", "color": "#aaaaaa"},
+                ],
+            },
+            "footer": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [{
+                    "type": "button",
+                    "action": {"type": "uri", "label": "查看訂單", "uri": params["order_url"]},
+                }],
+            },
+        }
+    return build
+
+
+def deepcopy_render(template: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """深複製範本後遞迴代入參數"""
+    def substitute(node: Any) -> Any:
+        if isinstance(node, dict):
+            return {key: substitute(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [substitute(value) for value in node]
+        if isinstance(node, str):
+            return PLACEHOLDER.sub(lambda m: str(params[m.group(1)]), node)
+        return node
+    return substitute(copy.deepcopy(template))
+
+
+def measure(func: Callable[[], Any], iterations: int) -> float:
+    """回傳每次呼叫的平均 CPU 時間 (微秒)"""
+    func()  # 暖身
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - start) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=20, help="收據品項列數")
+    parser.add_argument("--iterations", type=int, default=2000, help="重複次數")
+    args = parser.parse_args()
+
+    params = {
+        "store": "Brown Store",
+        "total": "1,234.00",
+        "order_id": "0001",
+        "order_url": "https://example.com/orders/0001",
+    }
+    contents = build_template(args.items)
+    template = FlexTemplate("receipt", "收據 #{{ order_id }}", contents)
+    build = naive_builder(args.items)
+    assert template.render(params) == build(params) == deepcopy_render(contents, params)
+
+    print(f"bubble with {args.items} item rows, {args.iterations} iterations")
+    rows: List[tuple] = [
+        ("手寫字典    ", lambda: build(params)),
+        ("深複製範本  ", lambda: deepcopy_render(contents, params)),
+        ("編譯範本    ", lambda: template.render(params)),
+    ]
+    baseline = None
+    for label, func in rows:
+        us = measure(func, args.iterations)
+        baseline = baseline or us
+        print(f"{label}: {us:8.2f} µs/render ({baseline / us:6.2f}x)")
+
+    print("轉換為 SDK 訊息並序列化:")
+    rows = [
+        ("FlexSendMessage        ", lambda: json.dumps(
+            FlexSendMessage(alt_text="收據", contents=build(params)).as_json_dict()
+        )),
+        ("PrebuiltFlexSendMessage", lambda: json.dumps(
+            PrebuiltFlexSendMessage("收據", template.render(params)).as_json_dict()
+        )),
+    ]
+    baseline = None
+    for label, func in rows:
+        us = measure(func, args.iterations // 4 or 1)
+        baseline = baseline or us
+        print(f"{label}: {us:8.2f} µs/message ({baseline / us:6.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""領域模型建立效能比較
+
+比較 webhook 事件轉換為領域模型的三種方式每則事件的 CPU 時間與記憶體：
+完整 pydantic 驗證並保留 raw_data (預設)、精簡模式 (model_construct，
+raw_data 參照原事件)、精簡模式且不保留 raw_data。
+
+執行方式:
+    python -m benchmarks.bench_message_construct
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from linebot_module.infrastructure.line_api_service import MessageConverter
+
+
+def build_events(event_count: int) -> List[dict]:
+    """建立文字與圖片訊息交錯的事件字典 (模擬已解析的 webhook payload)"""
+    events = []
+    for i in range(event_count):
+        if i % 2:
+            message = {"id": str(100000 + i), "type": "image", "contentProvider": {"type": "line"}}
+        else:
+            message = {
+                "id": str(100000 + i),
+                "type": "text",
+                "quoteToken": f"quote_{i}",
+                "text": "這是一則用於效能測試的訊息 " * 4,
+            }
+        events.append({
+            "type": "message",
+            "mode": "active",
+            "timestamp": 1700000000000 + i,
+            "source": {"type": "user", "userId": f"U{i:032d}"},
+            "webhookEventId": f"01H{i:023d}",
+            "deliveryContext": {"isRedelivery": False},
+            "replyToken": f"reply_token_{i:024d}",
+            "message": message,
+        })
+    return events
+
+
+@contextmanager
+def converter_mode(lean: bool, retain_raw_data: bool) -> Iterator[None]:
+    """暫時切換轉換器模式"""
+    saved = MessageConverter.lean_mode, MessageConverter.retain_raw_data
+    MessageConverter.lean_mode, MessageConverter.retain_raw_data = lean, retain_raw_data
+    try:
+        yield
+    finally:
+        MessageConverter.lean_mode, MessageConverter.retain_raw_data = saved
+
+
+def measure_time(events: List[dict], iterations: int) -> float:
+    """回傳每則事件的平均 CPU 時間 (微秒)"""
+    convert = MessageConverter.from_webhook_event
+    start = time.process_time()
+    for _ in range(iterations):
+        for event in events:
+            convert(event)
+    return (time.process_time() - start) / (iterations * len(events)) * 1_000_000
+
+
+def measure_memory(payload: str) -> tuple:
+    """回傳每則事件處理後仍保留的記憶體與配置峰值 (bytes)
+
+    由 JSON 解析事件開始計算，轉換完成後釋放事件列表，
+    因此未保留 raw_data 的模式不會被原始事件字典計入。
+    """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    events = json.loads(payload)
+    messages = [MessageConverter.from_webhook_event(event) for event in events]
+    count = len(events)
+    del events
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert all(messages)
+    return (after - before) / count, (peak - before) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000, help="事件數")
+    parser.add_argument("--iterations", type=int, default=20, help="重複次數")
+    args = parser.parse_args()
+
+    payload = json.dumps(build_events(args.events))
+    events = json.loads(payload)
+    modes = [
+        ("驗證 + raw_data ", False, True),
+        ("精簡 + raw_data ", True, True),
+        ("精簡，無 raw_data", True, False),
+    ]
+
+    print(f"{args.events} events, {args.iterations} iterations")
+    baseline = None
+    for label, lean, retain in modes:
+        with converter_mode(lean, retain):
+            measure_time(events, 1)  # 暖身
+            us = measure_time(events, args.iterations)
+            retained, peak = measure_memory(payload)
+        baseline = baseline or us
+        print(
+            f"{label}: {us:7.2f} µs/event ({baseline / us:4.1f}x)  "
+            f"保留 {retained:7.0f} B/event  峰值 {peak:7.0f} B/event"
+        )
+
+
+if __name__ == "__main__":
+    main()
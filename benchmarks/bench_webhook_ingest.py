@@ -0,0 +1,103 @@
+"""Webhook 解析效能比較
+
+比較舊流程 (WebhookHandler.handle + parser.parse 兩次驗證與解析、
+SDK 物件再轉換為領域模型) 與新流程 (單次 HMAC 驗證、單次 JSON 解析、
+直接由字典建立領域模型) 每個請求所花費的 CPU 時間。
+
+執行方式:
+    python -m benchmarks.bench_webhook_ingest
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import time
+import warnings
+
+from linebot import WebhookHandler
+
+from linebot_module.infrastructure.line_api_service import MessageConverter
+from linebot_module.infrastructure.webhook_parser import WebhookParser
+
+CHANNEL_SECRET = "benchmark_channel_secret"
+
+
+def build_payload(event_count: int) -> bytes:
+    """建立包含多個文字訊息事件的 webhook payload"""
+    events = []
+    for i in range(event_count):
+        events.append({
+            "type": "message",
+            "mode": "active",
+            "timestamp": 1700000000000 + i,
+            "source": {"type": "user", "userId": f"U{i:032d}"},
+            "webhookEventId": f"01H{i:023d}",
+            "deliveryContext": {"isRedelivery": False},
+            "replyToken": f"reply_token_{i:024d}",
+            "message": {
+                "id": str(100000 + i),
+                "type": "text",
+                "quoteToken": f"quote_{i}",
+                "text": "這是一則用於效能測試的訊息 " * 4,
+            },
+        })
+    return json.dumps({"destination": "Ubot", "events": events}).encode("utf-8")
+
+
+def sign(body: bytes) -> str:
+    """產生 X-Line-Signature"""
+    digest = hmac.new(CHANNEL_SECRET.encode("utf-8"), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("utf-8")
+
+
+def sdk_ingest(handler: WebhookHandler, body: bytes, signature: str) -> list:
+    """舊流程：SDK 驗證並解析兩次，再由 SDK 物件轉換"""
+    handler.handle(body.decode("utf-8"), signature)
+    events = handler.parser.parse(body.decode("utf-8"), signature)
+    return [MessageConverter.from_line_message(event) for event in events]
+
+
+def fast_ingest(parser: WebhookParser, body: bytes, signature: str) -> list:
+    """新流程：單次驗證與解析，直接建立領域模型"""
+    events = parser.parse_events(body, signature)
+    return [MessageConverter.from_webhook_event(event) for event in events]
+
+
+def measure(func, iterations: int) -> float:
+    """回傳每次呼叫的平均 CPU 時間 (微秒)"""
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - start) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=5, help="每個請求的事件數")
+    parser.add_argument("--iterations", type=int, default=2000, help="重複次數")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+
+    body = build_payload(args.events)
+    signature = sign(body)
+    handler = WebhookHandler(CHANNEL_SECRET)
+    fast_parser = WebhookParser(CHANNEL_SECRET)
+
+    # 暖身並確認兩條路徑產生相同結果
+    assert [m.text for m in sdk_ingest(handler, body, signature)] == \
+        [m.text for m in fast_ingest(fast_parser, body, signature)]
+
+    sdk_us = measure(lambda: sdk_ingest(handler, body, signature), args.iterations)
+    fast_us = measure(lambda: fast_ingest(fast_parser, body, signature), args.iterations)
+
+    print(f"payload: {len(body)} bytes, {args.events} events, {args.iterations} iterations")
+    print(f"SDK 流程     : {sdk_us:10.1f} µs/request")
+    print(f"快速流程     : {fast_us:10.1f} µs/request")
+    print(f"節省 CPU     : {sdk_us - fast_us:10.1f} µs/request ({sdk_us / fast_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""端對端壓力測試工具"""
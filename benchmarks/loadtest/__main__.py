@@ -0,0 +1,176 @@
+"""端對端壓力測試
+
+啟動本機的 LINE API 模擬伺服器，以固定速率向服務送出已簽章的 webhook，
+統計吞吐量、端對端延遲 (webhook 送出到模擬伺服器收到 reply) 百分位數與錯誤數。
+
+服務另行啟動 (建議，避免與壓力產生器競爭 CPU):
+    LINE_API_ENDPOINT=http://127.0.0.1:9000 LINE_API_DATA_ENDPOINT=http://127.0.0.1:9000 \\
+        python main.py
+    python -m benchmarks.loadtest --rate 200 --duration 30 --concurrency 64
+
+或在同一行程內啟動服務 (快速驗證用):
+    python -m benchmarks.loadtest --in-process --rate 100 --duration 10
+"""
+
+import argparse
+import asyncio
+import warnings
+from typing import Dict, List, Optional
+
+from benchmarks.loadtest.generator import LoadResult, generate_load
+from benchmarks.loadtest.stub_api import (
+    StubRecorder, add_stub_arguments, create_stub_app, serve, stub_config_from_args
+)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """以最近排名法計算百分位數"""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def build_report(load: LoadResult, recorder: StubRecorder) -> Dict[str, object]:
+    """彙整壓力產生器與模擬伺服器的紀錄"""
+    latencies = [
+        recorder.replies[token] - sent
+        for token, sent in load.sent_at.items()
+        if token in recorder.replies
+    ]
+    last_reply = max((recorder.replies[t] for t in load.sent_at if t in recorder.replies),
+                     default=load.finished_at)
+    elapsed = max(last_reply, load.finished_at) - load.started_at
+
+    return {
+        "requests": sum(load.statuses.values()),
+        "webhook_statuses": dict(load.statuses),
+        "behind_schedule": load.behind_schedule,
+        "events": len(load.sent_at),
+        "replies": len(latencies),
+        "missing_replies": len(load.sent_at) - len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "e2e_ms": {
+            f"p{p}": percentile(latencies, p) * 1000 for p in (50, 95, 99)
+        },
+        "e2e_max_ms": max(latencies) * 1000 if latencies else float("nan"),
+        "webhook_ms": {
+            f"p{p}": percentile(load.webhook_latencies, p) * 1000 for p in (50, 95, 99)
+        },
+        "stub_responses": {
+            f"{endpoint} {status}": count
+            for (endpoint, status), count in sorted(recorder.responses.items())
+        },
+    }
+
+
+def print_report(report: Dict[str, object]) -> None:
+    """輸出壓力測試報告"""
+    e2e = report["e2e_ms"]
+    webhook = report["webhook_ms"]
+    print("\n📊 壓力測試結果")
+    print(f"  webhook 請求     : {report['requests']}  狀態 {report['webhook_statuses']}")
+    print(f"  晚於排程送出     : {report['behind_schedule']}")
+    print(f"  事件 / 已回覆    : {report['events']} / {report['replies']}"
+          f"  (未回覆 {report['missing_replies']})")
+    print(f"  吞吐量           : {report['throughput']:.1f} replies/sec")
+    print(f"  端對端延遲       : p50 {e2e['p50']:.1f} ms  p95 {e2e['p95']:.1f} ms"
+          f"  p99 {e2e['p99']:.1f} ms  max {report['e2e_max_ms']:.1f} ms")
+    print(f"  webhook 回應時間 : p50 {webhook['p50']:.1f} ms  p95 {webhook['p95']:.1f} ms"
+          f"  p99 {webhook['p99']:.1f} ms")
+    print("  模擬 API 回應    :")
+    for key, count in report["stub_responses"].items():
+        print(f"    {key:20s} {count}")
+
+
+async def start_service_in_process(stub_url: str, host: str, port: int, secret: Optional[str]):
+    """在同一行程內啟動服務，LINE API 指向模擬伺服器
+
+    --secret 同時作為服務驗證簽章的 channel secret；
+    未指定且未設定 LINE_CHANNEL_SECRET 時使用固定的測試用 secret。
+    """
+    from linebot_module.config.settings import settings
+
+    # 每則訊息的 info 日誌會與壓力產生器競爭 CPU，只保留警告以上
+    settings.log_level = "WARNING"
+    settings.line_api_endpoint = stub_url
+    settings.line_api_data_endpoint = stub_url
+    settings.line_api_warmup_connections = 0
+    settings.line_channel_access_token = settings.line_channel_access_token or "loadtest"
+    settings.line_channel_secret = secret or settings.line_channel_secret or "loadtest-secret"
+
+    from main import app
+
+    return await serve(app, host, port)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, object]:
+    """啟動模擬伺服器、送出壓力並等待回覆"""
+    from linebot_module.config.settings import settings
+
+    recorder = StubRecorder()
+    stub_app = create_stub_app(stub_config_from_args(args), recorder)
+    servers = [await serve(stub_app, args.stub_host, args.stub_port)]
+    stub_url = f"http://{args.stub_host}:{args.stub_port}"
+    print(f"🧪 LINE API 模擬伺服器: {stub_url}")
+
+    target = args.target
+    if args.in_process:
+        servers.append(await start_service_in_process(
+            stub_url, "127.0.0.1", args.service_port, args.secret
+        ))
+        target = f"http://127.0.0.1:{args.service_port}"
+        print(f"🚀 服務已在行程內啟動: {target}")
+
+    try:
+        print(f"📨 送出 webhook: {args.rate}/s × {args.duration}s，並行上限 {args.concurrency}")
+        load = await generate_load(
+            f"{target}/api/v1/webhook",
+            args.secret or settings.line_channel_secret,
+            args.rate,
+            args.duration,
+            args.concurrency,
+            args.events_per_request,
+            args.users,
+        )
+
+        # 等待仍在處理中的事件完成回覆
+        deadline = asyncio.get_running_loop().time() + args.drain
+        while asyncio.get_running_loop().time() < deadline:
+            if all(token in recorder.replies for token in load.sent_at):
+                break
+            await asyncio.sleep(0.1)
+    finally:
+        # 先關閉服務，讓仍在送出的回覆完成後再關閉模擬伺服器
+        for server, task in reversed(servers):
+            server.should_exit = True
+            await task
+
+    return build_report(load, recorder)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="服務網址")
+    parser.add_argument("--in-process", action="store_true", help="在同一行程內啟動服務")
+    parser.add_argument("--service-port", type=int, default=8100, help="行程內服務的埠號")
+    parser.add_argument(
+        "--secret", default=None,
+        help="Channel Secret (預設讀取 Settings；--in-process 時也用於行程內的服務)"
+    )
+    parser.add_argument("--rate", type=float, default=100.0, help="每秒 webhook 請求數")
+    parser.add_argument("--duration", type=float, default=10.0, help="持續秒數")
+    parser.add_argument("--concurrency", type=int, default=64, help="同時進行中的請求上限")
+    parser.add_argument("--events-per-request", type=int, default=1, help="每個請求的事件數")
+    parser.add_argument("--users", type=int, default=1000, help="模擬的使用者數")
+    parser.add_argument("--drain", type=float, default=10.0, help="送出完畢後等待回覆的秒數")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    print_report(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
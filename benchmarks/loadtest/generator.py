@@ -0,0 +1,137 @@
+"""已簽章 Webhook 產生器
+
+以固定速率與並行上限向 /api/v1/webhook 送出帶有正確 X-Line-Signature 的請求，
+每個事件使用唯一的 reply token，並記錄送出時間供計算端對端延遲。
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import httpx
+
+
+@dataclass
+class LoadResult:
+    """壓力產生器的量測結果"""
+
+    # reply token -> webhook 送出時間 (time.perf_counter)
+    sent_at: Dict[str, float] = field(default_factory=dict)
+    # webhook 回應狀態碼 (連線錯誤記為 "error") -> 次數
+    statuses: Counter = field(default_factory=Counter)
+    # webhook 請求的回應時間 (秒)
+    webhook_latencies: List[float] = field(default_factory=list)
+    # 因並行上限而晚於排程送出的請求數
+    behind_schedule: int = 0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+
+def sign_body(body: bytes, channel_secret: str) -> str:
+    """產生 X-Line-Signature"""
+    digest = hmac.new(channel_secret.encode("utf-8"), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("utf-8")
+
+
+def build_webhook_body(seq: int, events_per_request: int, users: int) -> tuple:
+    """建立一個 webhook 請求內容
+
+    Args:
+        seq: 請求序號
+        events_per_request: 每個請求的事件數
+        users: 模擬的使用者數 (事件隨機分配給使用者)
+
+    Returns:
+        tuple: (請求內容, 此請求所有事件的 reply token)
+    """
+    now_ms = int(time.time() * 1000)
+    events = []
+    reply_tokens = []
+    for i in range(events_per_request):
+        token = f"lt-{seq}-{i}"
+        reply_tokens.append(token)
+        events.append({
+            "type": "message",
+            "mode": "active",
+            "timestamp": now_ms,
+            "source": {"type": "user", "userId": f"U{random.randrange(users):032d}"},
+            "webhookEventId": f"lt{seq:012d}{i:04d}",
+            "deliveryContext": {"isRedelivery": False},
+            "replyToken": token,
+            "message": {"id": f"{seq}{i:04d}", "type": "text", "text": f"load test {seq}-{i}"},
+        })
+    body = json.dumps({"destination": "Uloadtest", "events": events}).encode("utf-8")
+    return body, reply_tokens
+
+
+async def generate_load(
+    target_url: str,
+    channel_secret: str,
+    rate: float,
+    duration: float,
+    concurrency: int,
+    events_per_request: int = 1,
+    users: int = 1000
+) -> LoadResult:
+    """以固定速率送出 webhook 請求
+
+    Args:
+        target_url: webhook 網址，例如 http://127.0.0.1:8000/api/v1/webhook
+        channel_secret: 服務端使用的 LINE Channel Secret
+        rate: 每秒請求數
+        duration: 持續秒數
+        concurrency: 同時進行中的請求上限
+        events_per_request: 每個請求的事件數
+        users: 模擬的使用者數
+
+    Returns:
+        LoadResult: 量測結果
+    """
+    result = LoadResult()
+    semaphore = asyncio.Semaphore(concurrency)
+    total = max(1, int(rate * duration))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+
+        async def send(seq: int) -> None:
+            body, reply_tokens = build_webhook_body(seq, events_per_request, users)
+            headers = {
+                "Content-Type": "application/json",
+                "X-Line-Signature": sign_body(body, channel_secret),
+            }
+            try:
+                started = time.perf_counter()
+                for token in reply_tokens:
+                    result.sent_at[token] = started
+                response = await client.post(target_url, content=body, headers=headers)
+                result.webhook_latencies.append(time.perf_counter() - started)
+                result.statuses[response.status_code] += 1
+            except httpx.HTTPError:
+                result.statuses["error"] += 1
+            finally:
+                semaphore.release()
+
+        tasks = []
+        result.started_at = time.perf_counter()
+        for seq in range(total):
+            scheduled = result.started_at + seq / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await semaphore.acquire()
+            if time.perf_counter() - scheduled > 0.01:
+                result.behind_schedule += 1
+            tasks.append(asyncio.create_task(send(seq)))
+
+        await asyncio.gather(*tasks)
+        result.finished_at = time.perf_counter()
+
+    return result
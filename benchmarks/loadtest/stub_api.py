@@ -0,0 +1,185 @@
+"""LINE Messaging API 模擬伺服器
+
+提供 reply、push、multicast、使用者資料、訊息內容與 bot 資訊端點，
+可設定回應延遲、錯誤率與 429 注入比例，並記錄每個 reply token 的到達時間
+供壓力測試計算端對端延遲。
+
+單獨執行 (搭配其他壓力產生器):
+    python -m benchmarks.loadtest.stub_api --stub-port 9000 --latency-ms 30 --error-rate 0.01
+
+服務端設定 LINE_API_ENDPOINT 與 LINE_API_DATA_ENDPOINT 指向此伺服器即可。
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+@dataclass
+class StubConfig:
+    """模擬伺服器行為設定"""
+
+    latency_ms: float = 20.0          # 平均回應延遲
+    latency_jitter_ms: float = 10.0   # 延遲的隨機變動範圍 (±)
+    error_rate: float = 0.0           # 回應 500 的比例
+    rate_limit_rate: float = 0.0      # 回應 429 的比例
+    retry_after: int = 1              # 429 回應的 Retry-After 秒數
+    content_size: int = 64 * 1024     # 訊息內容端點回傳的大小 (bytes)
+
+
+@dataclass
+class StubRecorder:
+    """記錄模擬伺服器收到的請求"""
+
+    # reply token -> 成功回覆的到達時間 (time.perf_counter)
+    replies: Dict[str, float] = field(default_factory=dict)
+    # (端點, 狀態碼) -> 次數
+    responses: Counter = field(default_factory=Counter)
+    push_messages: int = 0
+    multicast_recipients: int = 0
+
+
+def create_stub_app(config: StubConfig, recorder: Optional[StubRecorder] = None) -> FastAPI:
+    """建立模擬 LINE API 的 FastAPI 應用程式
+
+    Args:
+        config: 延遲與錯誤注入設定
+        recorder: 請求紀錄，None 時建立新的紀錄
+
+    Returns:
+        FastAPI: 模擬伺服器應用程式，紀錄可由 app.state.recorder 取得
+    """
+    app = FastAPI(title="LINE API stub")
+    recorder = recorder or StubRecorder()
+    app.state.recorder = recorder
+    app.state.config = config
+
+    async def simulate(endpoint: str) -> Optional[Response]:
+        """模擬延遲，依設定比例回傳錯誤回應"""
+        delay = config.latency_ms + random.uniform(-1, 1) * config.latency_jitter_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            recorder.responses[(endpoint, 429)] += 1
+            return JSONResponse(
+                {"message": "The API rate limit has been exceeded. Try again later."},
+                status_code=429,
+                headers={"Retry-After": str(config.retry_after)}
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            recorder.responses[(endpoint, 500)] += 1
+            return JSONResponse({"message": "Internal server error"}, status_code=500)
+
+        recorder.responses[(endpoint, 200)] += 1
+        return None
+
+    @app.post("/v2/bot/message/reply")
+    async def reply(request: Request):
+        error = await simulate("reply")
+        if error is not None:
+            return error
+        body = await request.json()
+        recorder.replies[body["replyToken"]] = time.perf_counter()
+        return {"sentMessages": [{"id": "0", "quoteToken": "stub"} for _ in body["messages"]]}
+
+    @app.post("/v2/bot/message/push")
+    async def push(request: Request):
+        error = await simulate("push")
+        if error is not None:
+            return error
+        body = await request.json()
+        recorder.push_messages += len(body["messages"])
+        return {"sentMessages": [{"id": "0", "quoteToken": "stub"} for _ in body["messages"]]}
+
+    @app.post("/v2/bot/message/multicast")
+    async def multicast(request: Request):
+        error = await simulate("multicast")
+        if error is not None:
+            return error
+        body = await request.json()
+        recorder.multicast_recipients += len(body["to"])
+        return {}
+
+    @app.get("/v2/bot/profile/{user_id}")
+    async def profile(user_id: str):
+        error = await simulate("profile")
+        if error is not None:
+            return error
+        return {"userId": user_id, "displayName": f"stub-{user_id[-4:]}", "language": "zh-TW"}
+
+    @app.get("/v2/bot/message/{message_id}/content")
+    async def content(message_id: str):
+        error = await simulate("content")
+        if error is not None:
+            return error
+        return Response(b"\0" * config.content_size, media_type="image/jpeg")
+
+    @app.get("/v2/bot/info")
+    async def bot_info():
+        error = await simulate("bot_info")
+        if error is not None:
+            return error
+        return {"userId": "Ustub", "basicId": "@stub", "displayName": "stub", "chatMode": "bot"}
+
+    return app
+
+
+async def serve(app: FastAPI, host: str, port: int) -> Tuple[uvicorn.Server, asyncio.Task]:
+    """在目前的事件迴圈啟動 ASGI 應用程式，啟動完成後回傳
+
+    Returns:
+        Tuple[uvicorn.Server, asyncio.Task]: 伺服器與執行中的工作；
+        結束時設定 server.should_exit = True 並等待工作完成
+    """
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """加入模擬伺服器的命令列參數"""
+    parser.add_argument("--stub-host", default="127.0.0.1", help="模擬伺服器位址")
+    parser.add_argument("--stub-port", type=int, default=9000, help="模擬伺服器埠號")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="平均回應延遲 (毫秒)")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="延遲變動範圍 (毫秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回應 500 的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="回應 429 的比例")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 的 Retry-After 秒數")
+
+
+def stub_config_from_args(args: argparse.Namespace) -> StubConfig:
+    """由命令列參數建立模擬伺服器設定"""
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_stub_app(stub_config_from_args(args))
+    uvicorn.run(app, host=args.stub_host, port=args.stub_port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Webhook 熱路徑微基準測試
+
+分別量測簽章驗證、多事件 payload 的 JSON 解析、訊息轉換、
+路由分派與 pydantic 模型建立，輸出每秒操作數與每次操作的記憶體配置峰值，
+並可儲存基準值供之後比較以偵測效能退化。
+
+執行方式:
+    python -m benchmarks.suite                    # 執行全部項目
+    python -m benchmarks.suite -k converter       # 只執行名稱包含 converter 的項目
+    python -m benchmarks.suite --save             # 儲存基準值
+    python -m benchmarks.suite --compare          # 與基準值比較，退化時以狀態碼 1 結束
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+DEFAULT_BASELINE = Path(".cache/benchmarks/baseline.json")
+
+
+@dataclass
+class BenchmarkCase:
+    """基準測試項目
+
+    setup 回傳要量測的零參數函式；is_async 為 True 時該函式回傳 coroutine。
+    """
+
+    name: str
+    description: str
+    setup: Callable[[], Callable[[], Any]]
+    is_async: bool = False
+
+
+CASES: List[BenchmarkCase] = []
+
+
+def benchmark(name: str, description: str, is_async: bool = False):
+    """註冊基準測試項目的裝飾器"""
+    def decorator(setup: Callable[[], Callable[[], Any]]):
+        CASES.append(BenchmarkCase(name, description, setup, is_async))
+        return setup
+    return decorator
+
+
+def _payload(event_count: int = 5):
+    """建立已簽章的多事件 payload"""
+    from benchmarks.bench_webhook_ingest import build_payload, sign
+
+    body = build_payload(event_count)
+    return body, sign(body)
+
+
+def _event() -> Dict[str, Any]:
+    """取得單一文字訊息事件字典"""
+    body, _ = _payload(1)
+    return json.loads(body)["events"][0]
+
+
+@benchmark("signature.verify", "HMAC-SHA256 簽章驗證 (5 事件 payload)")
+def _signature_verify():
+    from benchmarks.bench_webhook_ingest import CHANNEL_SECRET
+    from linebot_module.infrastructure.webhook_parser import WebhookSignatureVerifier
+
+    body, signature = _payload()
+    verifier = WebhookSignatureVerifier(CHANNEL_SECRET)
+    return lambda: verifier.verify(body, signature)
+
+
+@benchmark("json.parse", "JSON 解析 (5 事件 payload，orjson 可用時使用 orjson)")
+def _json_parse():
+    from linebot_module.infrastructure.webhook_parser import json_loads
+
+    body, _ = _payload()
+    return lambda: json_loads(body)
+
+
+@benchmark("json.parse.stdlib", "JSON 解析 (5 事件 payload，標準函式庫)")
+def _json_parse_stdlib():
+    body, _ = _payload()
+    return lambda: json.loads(body)
+
+
+@benchmark("webhook.parse_events", "簽章驗證 + 解析 (5 事件 payload)")
+def _webhook_parse_events():
+    from benchmarks.bench_webhook_ingest import CHANNEL_SECRET
+    from linebot_module.infrastructure.webhook_parser import WebhookParser
+
+    body, signature = _payload()
+    parser = WebhookParser(CHANNEL_SECRET)
+    return lambda: parser.parse_events(body, signature)
+
+
+@benchmark("converter.from_line_message", "SDK MessageEvent 轉換為領域模型 (單一事件)")
+def _converter_from_line_message():
+    from linebot.models import MessageEvent
+    from linebot_module.infrastructure.line_api_service import MessageConverter
+
+    event = MessageEvent.new_from_json_dict(_event())
+    return lambda: MessageConverter.from_line_message(event)
+
+
+@benchmark("converter.from_webhook_event", "事件字典轉換為領域模型 (單一事件)")
+def _converter_from_webhook_event():
+    from linebot_module.infrastructure.line_api_service import MessageConverter
+
+    event = _event()
+    return lambda: MessageConverter.from_webhook_event(event)
+
+
+@benchmark("router.route_message", "路由分派到訊息處理器 (處理器直接回傳)", is_async=True)
+def _router_route_message():
+    from unittest.mock import MagicMock
+    from linebot_module.application.services.message_router import MessageRouterService
+    from linebot_module.domain.models import TextMessage
+    from linebot_module.interfaces.message_handler import IMessageHandler
+
+    class EchoHandler(IMessageHandler):
+        async def handle_text_message(self, message):
+            return message.text
+
+        async def handle_image_message(self, message):
+            return None
+
+    router = MessageRouterService(MagicMock())
+    handler = EchoHandler()
+    message = TextMessage(message_id="1", user_id="U0001", text="hello")
+    return lambda: router.route_message(message, handler)
+
+
+def _text_fields() -> Dict[str, Any]:
+    return {
+        "message_id": "100000",
+        "user_id": "U" + "0" * 32,
+        "timestamp": datetime.fromtimestamp(1700000000),
+        "raw_data": None,
+        "text": "這是一則用於效能測試的訊息",
+    }
+
+
+@benchmark("model.text_message", "TextMessage 建立 (pydantic 驗證)")
+def _model_text_message():
+    from linebot_module.domain.models import TextMessage
+
+    fields = _text_fields()
+    return lambda: TextMessage(**fields)
+
+
+@benchmark("model.text_message.trusted", "TextMessage 建立 (不經驗證)")
+def _model_text_message_trusted():
+    from linebot_module.domain.models import TextMessage
+    from linebot_module.infrastructure.line_api_service import MessageConverter
+
+    fields = dict(_text_fields(), message_type="text")
+    return lambda: MessageConverter._construct(TextMessage, fields)
+
+
+@benchmark("flex.build.naive", "Flex 收據 bubble 以字典常值建立 (20 品項)")
+def _flex_build_naive():
+    from benchmarks.bench_flex_template import naive_builder
+
+    build = naive_builder(20)
+    params = {"store": "Brown Store", "total": "1,234.00", "order_id": "1", "order_url": "https://x"}
+    return lambda: build(params)
+
+
+@benchmark("flex.render", "Flex 收據 bubble 以編譯範本渲染 (20 品項)")
+def _flex_render():
+    from benchmarks.bench_flex_template import build_template
+    from linebot_module.infrastructure.flex_template import FlexTemplate
+
+    template = FlexTemplate("receipt", "收據", build_template(20))
+    params = {"store": "Brown Store", "total": "1,234.00", "order_id": "1", "order_url": "https://x"}
+    return lambda: template.message(params)
+
+
+def _run_batch(case: BenchmarkCase, op: Callable[[], Any], number: int, loop) -> float:
+    """執行 number 次並回傳經過時間 (秒)"""
+    if case.is_async:
+        async def batch():
+            started = time.perf_counter()
+            for _ in range(number):
+                await op()
+            return time.perf_counter() - started
+        return loop.run_until_complete(batch())
+
+    started = time.perf_counter()
+    for _ in range(number):
+        op()
+    return time.perf_counter() - started
+
+
+def _calibrate(case: BenchmarkCase, op: Callable[[], Any], min_time: float, loop) -> int:
+    """找出單輪至少執行 min_time 秒所需的次數"""
+    number = 1
+    while True:
+        if _run_batch(case, op, number, loop) >= min_time:
+            return number
+        number *= 2
+
+
+def _peak_allocation(case: BenchmarkCase, op: Callable[[], Any], loop, samples: int = 25) -> float:
+    """回傳單次操作期間的記憶體配置峰值中位數 (bytes)"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            if case.is_async:
+                loop.run_until_complete(op())
+            else:
+                op()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.median(peaks)
+
+
+def run_case(case: BenchmarkCase, rounds: int, min_time: float, loop) -> Dict[str, float]:
+    """執行單一項目，回傳最佳與中位數的每秒操作數及配置峰值"""
+    op = case.setup()
+    number = _calibrate(case, op, min_time, loop)
+    per_op = [_run_batch(case, op, number, loop) / number for _ in range(rounds)]
+    return {
+        "ops_per_sec": 1 / min(per_op),
+        "median_ops_per_sec": 1 / statistics.median(per_op),
+        "peak_bytes": _peak_allocation(case, op, loop),
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold: float) -> bool:
+    """與基準值比較並輸出差異
+
+    Returns:
+        bool: 是否有項目退化超過 threshold
+    """
+    regressed = False
+    print(f"\n與基準值比較 ({baseline.get('created_at', '?')}, Python {baseline.get('python', '?')}):")
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"  {name:32s} 無基準值")
+            continue
+        ratio = result["ops_per_sec"] / base["ops_per_sec"]
+        flag = ""
+        if ratio < 1 - threshold:
+            flag = "  ⚠️ 退化"
+            regressed = True
+        print(f"  {name:32s} {ratio:6.2f}x{flag}")
+    return regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="keyword", default="", help="只執行名稱包含此字串的項目")
+    parser.add_argument("--rounds", type=int, default=5, help="每個項目的量測輪數")
+    parser.add_argument("--min-time", type=float, default=0.1, help="每輪最少執行秒數")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, type=Path,
+                        help=f"儲存基準值 (預設 {DEFAULT_BASELINE})")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, type=Path,
+                        help=f"與基準值比較 (預設 {DEFAULT_BASELINE})")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="視為退化的每秒操作數下降比例")
+    parser.add_argument("--list", action="store_true", help="列出所有項目")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for case in CASES:
+            print(f"{case.name:32s} {case.description}")
+        return 0
+
+    # 關閉日誌輸出與 SDK 棄用警告，避免干擾量測
+    logger.remove()
+    warnings.simplefilter("ignore")
+
+    loop = asyncio.new_event_loop()
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'項目':30s} {'ops/sec':>14s} {'中位數':>12s} {'配置峰值':>10s}")
+    try:
+        for case in CASES:
+            if args.keyword not in case.name:
+                continue
+            result = run_case(case, args.rounds, args.min_time, loop)
+            results[case.name] = result
+            print(
+                f"{case.name:32s} {result['ops_per_sec']:14,.0f} "
+                f"{result['median_ops_per_sec']:14,.0f} {result['peak_bytes']:10,.0f} B"
+            )
+    finally:
+        loop.close()
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }, indent=2))
+        print(f"\n💾 已儲存基準值: {args.save}")
+
+    if args.compare:
+        if not args.compare.exists():
+            print(f"\n找不到基準值: {args.compare}")
+            return 2
+        baseline = json.loads(args.compare.read_text())
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
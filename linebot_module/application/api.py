@@ -3,104 +3,344 @@
 定義所有的 API 端點和路由
 """
 
-from fastapi import APIRouter, Depends, Request, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
-from linebot import WebhookHandler
-from linebot.exceptions import InvalidSignatureError
-from linebot.models import MessageEvent
-from typing import Annotated
-from loguru import logger
+import asyncio
+import time
+import aiofiles
+from functools import partial
+from fastapi import APIRouter, Depends, FastAPI, Request, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from linebot.exceptions import InvalidSignatureError, LineBotApiError
+from starlette.background import BackgroundTask
+from typing import Annotated, Any, Dict, List, Optional, Tuple
 
 from linebot_module.config.settings import settings
+from linebot_module.config.logging_config import get_logger
 from linebot_module.interfaces.message_handler import IMessageHandler
 from linebot_module.infrastructure.line_api_service import LineApiService, MessageConverter
+from linebot_module.infrastructure.outbound_dispatcher import EndpointClass
+from linebot_module.infrastructure.webhook_parser import json_loads
+from linebot_module.infrastructure.webhook_spool import SpoolRecord, WebhookSpool
+from linebot_module.infrastructure.flex_template import FlexTemplateError
+from linebot_module.infrastructure.user_state_store import UserStateStore
+from linebot_module.infrastructure.media_store import (
+    MAX_ORIGINAL_BYTES, MediaStore, MediaStoreError
+)
+from linebot_module.infrastructure.metrics import conversion_duration, webhook_duration
 from linebot_module.application.services.message_router import MessageRouterService
+from linebot_module.application.services.event_deduplicator import EventDeduplicator
+from linebot_module.application.services.event_executor import (
+    EventExecutor, EventJob, conversation_key
+)
 from linebot_module.application.dependencies import (
-    get_line_api_service, get_message_converter
+    get_line_api_service, get_message_converter, get_message_router,
+    get_event_deduplicator, get_event_executor, get_webhook_spool,
+    get_channel_registry, get_media_store, get_user_state_store, get_default_message_handler
+)
+from linebot_module.application.services.channel_registry import ChannelRegistry
+from linebot_module.domain.models import (
+    MessageType, SendMessageRequest, SendMessageResponse,
+    BulkSendMessageRequest, BulkSendMessageResponse, ProfilePrefetchRequest,
+    MediaUploadResponse
 )
-from linebot_module.domain.models import SendMessageRequest, SendMessageResponse
+
+# 熱路徑日誌 (依 LOG_SAMPLE_RATES 取樣)
+logger = get_logger("webhook")
 
 # 建立路由器
 router = APIRouter()
 
-# LINE Webhook 處理器
-webhook_handler = WebhookHandler(settings.line_channel_secret)
-
-
 @router.post("/webhook")
+@router.post("/webhook/{channel_id}")
 async def line_webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
     message_handler: Annotated[IMessageHandler, Depends()],
-    line_api_service: Annotated[LineApiService, Depends(get_line_api_service)],
-    message_converter: Annotated[MessageConverter, Depends(get_message_converter)]
+    channel_registry: Annotated[ChannelRegistry, Depends(get_channel_registry)],
+    message_converter: Annotated[MessageConverter, Depends(get_message_converter)],
+    deduplicator: Annotated[Optional[EventDeduplicator], Depends(get_event_deduplicator)],
+    event_executor: Annotated[EventExecutor, Depends(get_event_executor)],
+    webhook_spool: Annotated[Optional[WebhookSpool], Depends(get_webhook_spool)],
+    channel_id: Optional[str] = None
 ):
     """LINE Webhook 端點
     
-    接收來自 LINE 平台的訊息事件
+    接收來自 LINE 平台的訊息事件，排入事件執行器後立即回應。
+    佇列已滿或伺服器關閉中時回應 503，由 LINE 稍後重送未能排入的事件。
+    啟用 webhook spool 時，驗證簽章並寫入磁碟後即回應，事件由背景消費端處理。
+    
+    多 channel 時由路徑中的 channel_id 或內容的 destination 決定 channel，
+    以該 channel 的 secret 驗證簽章，並交由該 channel 的處理器與路由器處理。
     """
+    started = time.perf_counter()
+    received_at = time.time()
     try:
+        # 關閉中不再排入事件，避免事件在清空佇列後才到達而遺失
+        if request.app.state.draining:
+            raise HTTPException(status_code=503, detail="Server is shutting down")
+        
         # 取得請求內容
         body = await request.body()
         signature = request.headers.get('X-Line-Signature', '')
         
-        # 驗證簽章
-        try:
-            webhook_handler.handle(body.decode('utf-8'), signature)
-        except InvalidSignatureError:
-            logger.error("❌ 無效的 LINE 簽章")
-            raise HTTPException(status_code=400, detail="Invalid signature")
-        
-        # 解析事件
-        events = webhook_handler.parser.parse(body.decode('utf-8'), signature)
-        
-        # 處理每個事件
-        for event in events:
-            if isinstance(event, MessageEvent):
-                # 在背景任務中處理訊息
-                background_tasks.add_task(
-                    process_message_event,
-                    event,
-                    message_handler,
-                    line_api_service,
-                    message_converter
-                )
+        # 決定 channel 並驗證簽章；簽章通過前不解析內容
+        if channel_id is not None or not channel_registry.routes_by_destination:
+            channel = (
+                channel_registry.default if channel_id is None
+                else channel_registry.get(channel_id)
+            )
+            if channel is None:
+                raise HTTPException(status_code=404, detail="Unknown channel")
+            try:
+                channel.parser.verify(body, signature)
+            except InvalidSignatureError:
+                logger.error("❌ 無效的 LINE 簽章: channel {}", channel.channel_id)
+                raise HTTPException(status_code=400, detail="Invalid signature")
+            payload = json_loads(body) if webhook_spool is None else None
+        else:
+            # 依 destination 分派：先找出簽章相符的 channel，
+            # 再確認 destination 正是該 channel 的 bot user ID
+            channel = channel_registry.for_signature(body, signature)
+            if channel is None:
+                logger.error("❌ 無效的 LINE 簽章")
+                raise HTTPException(status_code=400, detail="Invalid signature")
+            payload = json_loads(body)
+            destination = payload.get("destination")
+            target = channel_registry.for_destination(destination)
+            if target is None:
+                logger.error("❌ 未設定的 destination: {}", destination)
+                raise HTTPException(status_code=404, detail="Unknown destination")
+            if target is not channel:
+                logger.error("❌ 無效的 LINE 簽章: channel {}", target.channel_id)
+                raise HTTPException(status_code=400, detail="Invalid signature")
+        
+        if webhook_spool is not None:
+            await webhook_spool.append(body, received_at, channel.channel_id)
+            return JSONResponse(content={"status": "ok"})
+        
+        # 依對話排入事件執行器，同一對話的事件依序處理，
+        # reply token 最接近過期的事件優先
+        rejected = 0
+        for event, key, job, deadline in prepare_event_jobs(
+            payload.get("events", []),
+            received_at,
+            channel.message_handler or message_handler,
+            channel.line_api_service,
+            channel.message_router,
+            message_converter,
+            deduplicator
+        ):
+            if not event_executor.submit(key, job, deadline):
+                rejected += 1
+                if deduplicator is not None:
+                    deduplicator.forget(event)
+        
+        if rejected:
+            logger.warning("⚠️ 事件佇列已滿，{} 筆事件未排入", rejected)
+            raise HTTPException(status_code=503, detail="Event queue is full")
         
         return JSONResponse(content={"status": "ok"})
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"❌ 處理 webhook 時發生錯誤: {e}")
+        logger.error("❌ 處理 webhook 時發生錯誤: {}", e)
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        webhook_duration.observe(time.perf_counter() - started)
 
 
-async def process_message_event(
-    event: MessageEvent,
+def prepare_event_jobs(
+    events: List[Dict[str, Any]],
+    received_at: float,
     message_handler: IMessageHandler,
     line_api_service: LineApiService,
-    message_converter: MessageConverter
+    router_service: MessageRouterService,
+    message_converter: MessageConverter,
+    deduplicator: Optional[EventDeduplicator]
+) -> List[Tuple[Dict[str, Any], str, EventJob, float]]:
+    """建立需要排入事件執行器的工作
+    
+    丟棄重複與不支援的事件；加入好友或封鎖事件直接清除使用者資料快取。
+    
+    Args:
+        events: webhook 事件字典列表
+        received_at: webhook 接收時間 (epoch 秒)
+        message_handler: 訊息處理器
+        line_api_service: LINE API 服務
+        router_service: 訊息路由器
+        message_converter: 訊息轉換器
+        deduplicator: 事件去重器 (未啟用時為 None)
+        
+    Returns:
+        List[Tuple[Dict[str, Any], str, EventJob, float]]: (事件, 對話識別碼, 工作, 期限) 列表
+    """
+    jobs = []
+    for event in events:
+        # 丟棄重送或重試造成的重複事件
+        if deduplicator is not None and deduplicator.is_duplicate(event):
+            continue
+        
+        event_type = event.get("type")
+        if event_type == "message":
+            message_type = event.get("message", {}).get("type")
+            if not message_converter.supports(message_type):
+                logger.warning("⚠️ 略過不支援的訊息類型: {}", message_type)
+                continue
+            
+            deadline = reply_deadline(event, received_at)
+            job = partial(
+                process_message_event,
+                event,
+                message_handler,
+                router_service,
+                message_converter,
+                received_at,
+                deadline
+            )
+            jobs.append((event, conversation_key(event), job, deadline))
+        elif event_type in ("follow", "unfollow"):
+            # 加入好友或封鎖時清除使用者資料快取
+            user_id = event.get("source", {}).get("userId")
+            if user_id:
+                line_api_service.invalidate_user_profile(user_id)
+    return jobs
+
+
+async def consume_webhook_spool(app: FastAPI) -> None:
+    """webhook spool 消費端
+    
+    依附加順序取出 spool 中的 webhook，將事件排入事件執行器 (佇列已滿時等待)，
+    一筆 webhook 的所有事件處理完成後才標記為完成。
+    
+    Args:
+        app: FastAPI 應用程式實例
+    """
+    state = app.state
+    spool: WebhookSpool = state.webhook_spool
+    handler_factory = app.dependency_overrides.get(IMessageHandler, get_default_message_handler)
+    message_handler = handler_factory()
+    
+    while True:
+        record = await spool.get()
+        try:
+            events = json_loads(record.body).get("events", [])
+        except ValueError as e:
+            logger.error("❌ 無法解析 spool 中的 webhook: {}", e)
+            spool.complete(record)
+            continue
+        
+        channel = state.channel_registry.get(record.channel_id)
+        if channel is None:
+            logger.error("❌ spool 中的 webhook 屬於未設定的 channel: {}", record.channel_id)
+            spool.complete(record)
+            continue
+        
+        jobs = prepare_event_jobs(
+            events,
+            record.received_at,
+            channel.message_handler or message_handler,
+            channel.line_api_service,
+            channel.message_router,
+            state.message_converter,
+            state.event_deduplicator
+        )
+        if not jobs:
+            spool.complete(record)
+            continue
+        
+        record.pending = len(jobs)
+        for _, key, job, deadline in jobs:
+            await state.event_executor.put(
+                key, partial(run_spooled_job, job, spool, record), deadline
+            )
+
+
+async def run_spooled_job(job: EventJob, spool: WebhookSpool, record: SpoolRecord) -> None:
+    """執行 spool 紀錄中的一個事件，全部事件完成後標記紀錄完成
+    
+    事件因關閉而被取消時不標記完成，紀錄保留在 spool 中，下次啟動時重播。
+    """
+    try:
+        await job()
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        _finish_spooled_event(spool, record)
+        raise
+    _finish_spooled_event(spool, record)
+
+
+def _finish_spooled_event(spool: WebhookSpool, record: SpoolRecord) -> None:
+    record.pending -= 1
+    if record.pending == 0:
+        spool.complete(record)
+
+
+def reply_deadline(event: Dict[str, Any], received_at: float) -> float:
+    """計算事件 reply token 的期限
+    
+    以事件發生時間與 webhook 接收時間中較早者起算，避免時鐘誤差延後期限。
+    
+    Args:
+        event: webhook 事件字典
+        received_at: webhook 接收時間 (epoch 秒)
+        
+    Returns:
+        float: 期限 (epoch 秒)
+    """
+    event_time = event.get("timestamp", received_at * 1000) / 1000
+    return min(event_time, received_at) + settings.reply_token_ttl_seconds
+
+
+async def process_message_event(
+    event: Dict[str, Any],
+    message_handler: IMessageHandler,
+    router_service: MessageRouterService,
+    message_converter: MessageConverter,
+    received_at: Optional[float] = None,
+    deadline: Optional[float] = None
 ):
-    """處理訊息事件的背景任務"""
+    """處理訊息事件 (由事件執行器呼叫)"""
     try:
-        logger.info(f"📨 收到訊息事件: {event.message.type} from {event.source.user_id}")
+        logger.info(
+            "📨 收到訊息事件: {} from {}",
+            event["message"].get("type"),
+            event.get("source", {}).get("userId")
+        )
         
         # 轉換為領域模型
-        domain_message = message_converter.from_line_message(event)
+        started = time.perf_counter()
+        domain_message = message_converter.from_webhook_event(event, received_at)
+        conversion_duration.observe(time.perf_counter() - started)
         
         if domain_message:
-            # 建立訊息路由服務
-            router_service = MessageRouterService(line_api_service)
-            
             # 處理訊息並回覆
             await router_service.process_and_reply(
                 domain_message,
                 message_handler,
-                event.reply_token
+                event.get("replyToken"),
+                deadline
             )
         else:
             logger.warning("⚠️ 無法轉換訊息，可能是不支援的訊息類型")
             
     except Exception as e:
-        logger.error(f"❌ 處理訊息事件時發生錯誤: {e}")
+        logger.error("❌ 處理訊息事件時發生錯誤: {}", e)
+
+
+@router.get("/webhook/stats")
+async def get_webhook_stats(
+    deduplicator: Annotated[Optional[EventDeduplicator], Depends(get_event_deduplicator)],
+    event_executor: Annotated[EventExecutor, Depends(get_event_executor)],
+    router_service: Annotated[MessageRouterService, Depends(get_message_router)],
+    webhook_spool: Annotated[Optional[WebhookSpool], Depends(get_webhook_spool)]
+):
+    """取得 webhook 事件去重、執行器、回覆期限與 spool 統計資料端點"""
+    return {
+        "deduplication": deduplicator.stats() if deduplicator else {"enabled": False},
+        "executor": event_executor.stats(),
+        "replies": router_service.stats(),
+        "spool": webhook_spool.stats() if webhook_spool else {"enabled": False}
+    }
 
 
 @router.post("/send-message", response_model=SendMessageResponse)
@@ -110,17 +350,27 @@ async def send_message(
 ):
     """發送訊息端點
     
-    主動發送訊息給指定使用者
+    主動發送訊息給指定使用者，請求經由發送佇列限流與重試
     """
+    dispatcher = line_api_service.dispatcher
+    if dispatcher is not None and dispatcher.is_full(EndpointClass.PUSH):
+        raise HTTPException(status_code=503, detail="Outbound queue is full")
+    
     try:
-        logger.info(f"📤 發送訊息請求: {request.message_type} to {request.user_id}")
+        logger.info("📤 發送訊息請求: {} to {}", request.message_type, request.user_id)
         
         # 根據訊息類型發送
-        if request.message_type.value == "text":
+        if request.message_type == MessageType.TEXT:
             result = await line_api_service.send_text_message(
                 request.user_id,
                 request.content
             )
+        elif request.message_type == MessageType.FLEX:
+            try:
+                message = line_api_service.render_template(request)
+            except FlexTemplateError as e:
+                return SendMessageResponse(success=False, error_message=str(e))
+            result = await line_api_service.push_messages(request.user_id, [message])
         else:
             # 其他類型暫不支援
             result = SendMessageResponse(
@@ -131,13 +381,36 @@ async def send_message(
         return result
         
     except Exception as e:
-        logger.error(f"❌ 發送訊息時發生錯誤: {e}")
+        logger.error("❌ 發送訊息時發生錯誤: {}", e)
         return SendMessageResponse(
             success=False,
             error_message=f"發送失敗: {str(e)}"
         )
 
 
+@router.post("/send-message/batch", response_model=BulkSendMessageResponse)
+async def send_bulk_messages(
+    request: BulkSendMessageRequest,
+    line_api_service: Annotated[LineApiService, Depends(get_line_api_service)]
+):
+    """批次發送訊息端點
+    
+    內容相同的訊息合併為 multicast 呼叫，回傳每位收件者的發送結果
+    """
+    logger.info("📤 批次發送訊息請求: {} 筆", len(request.messages))
+    
+    results, api_calls = await line_api_service.send_bulk_messages(
+        request.messages,
+        concurrency=settings.bulk_send_concurrency
+    )
+    
+    return BulkSendMessageResponse(
+        success=all(result.success for result in results),
+        results=results,
+        api_calls=api_calls
+    )
+
+
 @router.get("/user/{user_id}")
 async def get_user_profile(
     user_id: str,
@@ -152,9 +425,262 @@ async def get_user_profile(
         else:
             raise HTTPException(status_code=404, detail="User not found")
             
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("❌ 取得使用者資料時發生錯誤: {}", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/users/prefetch")
+async def prefetch_user_profiles(
+    request: ProfilePrefetchRequest,
+    line_api_service: Annotated[LineApiService, Depends(get_line_api_service)]
+):
+    """預先載入使用者資料到快取端點"""
+    fetched = await line_api_service.prefetch_user_profiles(request.user_ids)
+    return {"requested": len(request.user_ids), "fetched": fetched}
+
+
+@router.get("/profile-cache/stats")
+async def get_profile_cache_stats(
+    line_api_service: Annotated[LineApiService, Depends(get_line_api_service)]
+):
+    """取得使用者資料快取統計資料端點"""
+    if line_api_service.profile_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **line_api_service.profile_cache.stats()}
+
+
+@router.get("/content/{message_id}")
+async def get_message_content(
+    message_id: str,
+    line_api_service: Annotated[LineApiService, Depends(get_line_api_service)]
+):
+    """取得訊息內容端點
+    
+    以串流方式轉送 LINE 上的圖片、語音、影片內容，不在記憶體中緩衝整個檔案；
+    啟用磁碟快取時直接由快取檔案回應
+    """
+    if line_api_service.media_cache is not None:
+        entry = await line_api_service.fetch_cached_content(message_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Message content unavailable")
+        return FileResponse(entry.path, media_type=entry.content_type)
+    
+    try:
+        stream = await line_api_service.open_message_content(message_id)
+    except LineBotApiError as e:
+        logger.error("❌ 取得訊息內容失敗: {}", e)
+        status_code = 404 if e.status_code == 404 else 502
+        raise HTTPException(status_code=status_code, detail="Message content unavailable")
     except Exception as e:
-        logger.error(f"❌ 取得使用者資料時發生錯誤: {e}")
+        logger.error("❌ 取得訊息內容時發生錯誤: {}", e)
         raise HTTPException(status_code=500, detail="Internal server error")
+    
+    headers = {}
+    if stream.content_length is not None:
+        headers["Content-Length"] = str(stream.content_length)
+    
+    return StreamingResponse(
+        stream,
+        media_type=stream.content_type or "application/octet-stream",
+        headers=headers,
+        background=BackgroundTask(stream.aclose)
+    )
+
+
+@router.get("/media-cache/stats")
+async def get_media_cache_stats(
+    line_api_service: Annotated[LineApiService, Depends(get_line_api_service)]
+):
+    """取得訊息內容快取統計資料端點"""
+    if line_api_service.media_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **line_api_service.media_cache.stats()}
+
+
+@router.post("/media", response_model=MediaUploadResponse)
+async def upload_media(
+    request: Request,
+    media_store: Annotated[Optional[MediaStore], Depends(get_media_store)]
+):
+    """上傳圖片端點
+    
+    請求內容為圖片原始內容 (JPEG 或 PNG)，依內容雜湊儲存並產生預覽圖，
+    回傳可直接用於圖片訊息的網址；相同內容不重複儲存。
+    """
+    if media_store is None:
+        raise HTTPException(status_code=404, detail="Media hosting disabled")
+    if not media_store.public_base_url:
+        raise HTTPException(status_code=503, detail="Media public URL not configured")
+    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_ORIGINAL_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+    
+    try:
+        asset = await media_store.store(await request.body())
+    except MediaStoreError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return MediaUploadResponse(
+        digest=asset.digest,
+        original_content_url=media_store.url_for(asset.original_name),
+        preview_image_url=media_store.url_for(asset.preview_name),
+        content_type=asset.content_type,
+        size=asset.size
+    )
+
+
+@router.get("/media/stats")
+async def get_media_store_stats(
+    media_store: Annotated[Optional[MediaStore], Depends(get_media_store)]
+):
+    """取得媒體託管統計資料端點"""
+    if media_store is None:
+        return {"enabled": False}
+    return {"enabled": True, **media_store.stats()}
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """解析單一區段的 Range 標頭
+    
+    Args:
+        header: Range 標頭內容
+        size: 檔案大小
+        
+    Returns:
+        Optional[Tuple[int, int]]: (起始位置, 結束位置 (含))，
+        格式不支援 (非 bytes 或多個區段) 時為 None，應回應完整內容
+        
+    Raises:
+        ValueError: 範圍無法滿足 (應回應 416)
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_text, sep, end_text = spec.strip().partition("-")
+    if not sep or not (start_text or end_text):
+        return None
+    if not (start_text or "0").isdigit() or not (end_text or "0").isdigit():
+        return None
+    
+    if not start_text:
+        # bytes=-N：最後 N bytes
+        length = int(end_text)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    
+    start = int(start_text)
+    end = min(int(end_text), size - 1) if end_text else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+async def iter_file_range(path: str, start: int, length: int, chunk_size: int = 64 * 1024):
+    """逐塊讀取檔案的指定範圍"""
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        while length > 0:
+            chunk = await f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@router.get("/media/{name}")
+async def get_media(
+    name: str,
+    request: Request,
+    media_store: Annotated[Optional[MediaStore], Depends(get_media_store)]
+):
+    """取得託管圖片端點
+    
+    檔名包含內容雜湊，內容不會改變：回應強 ETag 與長效快取標頭，
+    支援 If-None-Match (304) 與單一區段的 Range 請求 (206)。
+    """
+    path = media_store.path_for(name) if media_store is not None else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    
+    etag = f'"{name}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in if_none_match):
+        return Response(status_code=304, headers=headers)
+    
+    media_type = "image/png" if name.endswith(".png") else "image/jpeg"
+    size = path.stat().st_size
+    range_header = request.headers.get("range")
+    if range_header:
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except ValueError:
+            return Response(
+                status_code=416,
+                headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            return StreamingResponse(
+                iter_file_range(str(path), start, length),
+                status_code=206,
+                media_type=media_type,
+                headers={
+                    **headers,
+                    "Content-Range": f"bytes {start}-{end}/{size}",
+                    "Content-Length": str(length),
+                }
+            )
+    
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+@router.get("/user-state/stats")
+async def get_user_state_stats(
+    user_state_store: Annotated[Optional[UserStateStore], Depends(get_user_state_store)]
+):
+    """取得使用者對話狀態快取與批次寫入統計資料端點"""
+    if user_state_store is None:
+        return {"enabled": False}
+    return {"enabled": True, **user_state_store.stats()}
+
+
+@router.get("/flex-templates")
+async def get_flex_templates(
+    line_api_service: Annotated[LineApiService, Depends(get_line_api_service)]
+):
+    """取得已載入的 Flex 範本與其參數端點"""
+    if line_api_service.flex_templates is None:
+        return {}
+    return line_api_service.flex_templates.stats()
+
+
+@router.get("/outbound/stats")
+async def get_outbound_stats(
+    line_api_service: Annotated[LineApiService, Depends(get_line_api_service)]
+):
+    """取得 default channel 發送佇列與限流器狀態端點"""
+    if line_api_service.dispatcher is None:
+        return {"running": False}
+    return line_api_service.dispatcher.stats()
+
+
+@router.get("/channels/stats")
+async def get_channel_stats(
+    channel_registry: Annotated[ChannelRegistry, Depends(get_channel_registry)]
+):
+    """取得各 LINE channel 的設定摘要與發送佇列狀態端點"""
+    return channel_registry.stats()
 
 
 @router.get("/health")
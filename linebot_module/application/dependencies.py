@@ -3,29 +3,225 @@
 設定 FastAPI 的依賴注入系統，實現控制反轉
 """
 
-from fastapi import FastAPI, Depends
-from typing import Annotated
+import asyncio
+from fastapi import FastAPI, Request
+from typing import Optional
+from loguru import logger
 
+from linebot_module.config.settings import settings
 from linebot_module.interfaces.message_handler import IMessageHandler, IMessageRouter
 from linebot_module.infrastructure.line_api_service import LineApiService, MessageConverter
-from linebot_module.application.services.message_router import MessageRouterService
+from linebot_module.infrastructure.media_cache import MediaCache
+from linebot_module.infrastructure.media_store import MediaStore
+from linebot_module.infrastructure.flex_template import FlexTemplateRegistry
+from linebot_module.infrastructure.user_state_store import UserStateStore
+from linebot_module.infrastructure.profile_cache import ProfileCache
+from linebot_module.infrastructure.webhook_spool import WebhookSpool
+from linebot_module.infrastructure.metrics import (
+    event_busy_workers, event_queue_depth, outbound_in_flight, outbound_queue_depth,
+    spool_pending
+)
+from linebot_module.application.services.channel_registry import (
+    ChannelRegistry, create_channel_registry
+)
+from linebot_module.application.services.event_deduplicator import EventDeduplicator
+from linebot_module.application.services.event_executor import EventExecutor
 
 
-def get_line_api_service() -> LineApiService:
+async def startup_dependencies(app: FastAPI) -> None:
+    """建立應用程式生命週期內共用的服務實例
+
+    各 channel 的 LINE API 服務與訊息路由器只在啟動時建立一次，
+    同一 channel 的所有請求共用同一個連線池；
+    app.state.line_api_service 與 message_router 為 default channel 的服務。
+
+    Args:
+        app: FastAPI 應用程式實例
+    """
+    media_cache = None
+    if settings.media_cache_enabled:
+        media_cache = MediaCache(
+            settings.media_cache_dir,
+            settings.media_cache_max_bytes,
+            settings.media_cache_ttl_seconds
+        )
+
+    profile_cache = None
+    if settings.profile_cache_enabled:
+        profile_cache = ProfileCache(
+            settings.profile_cache_max_size,
+            settings.profile_cache_ttl_seconds,
+            settings.profile_cache_negative_ttl_seconds
+        )
+
+    media_store = None
+    if settings.media_store_enabled:
+        public_url = settings.media_public_base_url or settings.ngrok_url
+        media_store = MediaStore(
+            settings.media_store_dir,
+            f"{public_url.rstrip('/')}/api/v1/media" if public_url else None,
+            settings.media_preview_max_dimension,
+            settings.media_preview_workers
+        )
+        media_store.start()
+    app.state.media_store = media_store
+
+    flex_templates = FlexTemplateRegistry()
+    if settings.flex_template_dir:
+        flex_templates = FlexTemplateRegistry.from_directory(settings.flex_template_dir)
+
+    user_state_store = None
+    if settings.user_state_enabled:
+        if settings.server_workers > 1:
+            logger.warning(
+                "⚠️ 使用者狀態儲存只支援單一行程，SERVER_WORKERS > 1 時各 worker 的狀態互不可見"
+            )
+        user_state_store = UserStateStore(
+            settings.user_state_db_path,
+            settings.user_state_cache_size,
+            settings.user_state_flush_interval,
+            settings.user_state_flush_batch_size
+        )
+        await user_state_store.open()
+    app.state.user_state_store = user_state_store
+
+    # 每個 channel 各自的驗證器、連線池、發送佇列與路由器
+    channel_registry = create_channel_registry(
+        settings, media_cache, profile_cache, media_store, flex_templates, user_state_store
+    )
+    await channel_registry.start()
+    # 未設定 default channel 時，/send-message 等 API 使用第一個 channel
+    default_channel = channel_registry.default or next(iter(channel_registry))
+
+    app.state.draining = False
+    app.state.channel_registry = channel_registry
+    app.state.line_api_service = default_channel.line_api_service
+    app.state.message_converter = MessageConverter()
+    app.state.message_router = default_channel.message_router
+    app.state.event_deduplicator = None
+    if settings.webhook_dedup_enabled:
+        app.state.event_deduplicator = EventDeduplicator(
+            settings.webhook_dedup_window_seconds,
+            settings.webhook_dedup_max_entries
+        )
+
+    app.state.event_executor = EventExecutor(
+        settings.event_workers,
+        settings.event_queue_size
+    )
+    await app.state.event_executor.start()
+
+    # 消費端由 main 的生命週期在服務建立完成後啟動
+    app.state.webhook_spool = None
+    app.state.spool_consumer = None
+    if settings.webhook_spool_enabled:
+        app.state.webhook_spool = WebhookSpool(
+            settings.webhook_spool_dir,
+            settings.webhook_spool_segment_bytes,
+            settings.webhook_spool_commit_interval
+        )
+        await app.state.webhook_spool.open()
+        spool = app.state.webhook_spool
+        spool_pending.set_function(lambda: spool.pending)
+
+    # 背景工作量於輸出指標時即時計算
+    event_executor = app.state.event_executor
+    event_queue_depth.set_function(lambda: event_executor.queue_depth)
+    event_busy_workers.set_function(lambda: event_executor.busy_workers)
+    outbound_queue_depth.set_function(lambda: channel_registry.outbound_queue_depth)
+    outbound_in_flight.set_function(lambda: channel_registry.outbound_in_flight)
+
+    if settings.line_api_warmup_connections > 0:
+        await channel_registry.warm_up(settings.line_api_warmup_connections)
+
+
+async def shutdown_dependencies(app: FastAPI) -> None:
+    """停止接收 webhook、清空背景工作後釋放連線池
+
+    依序清空事件佇列 (處理器可能產生新的發送請求) 與發送佇列，
+    兩者共用 shutdown_drain_timeout_seconds 的期限，最後關閉連線池。
+
+    Args:
+        app: FastAPI 應用程式實例
+    """
+    # 之後收到的 webhook 回應 503，由 LINE 重送給其他 worker
+    app.state.draining = True
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.shutdown_drain_timeout_seconds
+
+    # 停止取出 spool 紀錄，尚未排入的紀錄於下次啟動時重播
+    spool_consumer = getattr(app.state, "spool_consumer", None)
+    if spool_consumer is not None:
+        spool_consumer.cancel()
+        await asyncio.gather(spool_consumer, return_exceptions=True)
+
+    event_executor = getattr(app.state, "event_executor", None)
+    if event_executor is not None:
+        logger.info(f"⏳ 清空事件佇列，剩餘 {event_executor.queue_depth} 筆")
+        await event_executor.stop(max(deadline - loop.time(), 0.0))
+
+    webhook_spool = getattr(app.state, "webhook_spool", None)
+    if webhook_spool is not None:
+        await webhook_spool.close()
+
+    # 處理器已全部結束，寫入剩餘的狀態變更
+    user_state_store = getattr(app.state, "user_state_store", None)
+    if user_state_store is not None:
+        await user_state_store.close()
+
+    channel_registry = getattr(app.state, "channel_registry", None)
+    if channel_registry is not None:
+        await channel_registry.stop(max(deadline - loop.time(), 0.0))
+        logger.info("🔌 LINE API 連線池已關閉")
+
+    media_store = getattr(app.state, "media_store", None)
+    if media_store is not None:
+        await asyncio.to_thread(media_store.close)
+
+
+def get_line_api_service(request: Request) -> LineApiService:
     """取得 LINE API 服務實例"""
-    return LineApiService()
+    return request.app.state.line_api_service
+
+
+def get_channel_registry(request: Request) -> ChannelRegistry:
+    """取得 LINE channel 登錄表"""
+    return request.app.state.channel_registry
 
 
-def get_message_converter() -> MessageConverter:
+def get_message_converter(request: Request) -> MessageConverter:
     """取得訊息轉換器實例"""
-    return MessageConverter()
+    return request.app.state.message_converter
 
 
-def get_message_router(
-    line_api_service: Annotated[LineApiService, Depends(get_line_api_service)]
-) -> IMessageRouter:
+def get_message_router(request: Request) -> IMessageRouter:
     """取得訊息路由器實例"""
-    return MessageRouterService(line_api_service)
+    return request.app.state.message_router
+
+
+def get_event_executor(request: Request) -> EventExecutor:
+    """取得事件執行器實例"""
+    return request.app.state.event_executor
+
+
+def get_webhook_spool(request: Request) -> Optional[WebhookSpool]:
+    """取得 webhook spool (未啟用時為 None)"""
+    return request.app.state.webhook_spool
+
+
+def get_media_store(request: Request) -> Optional[MediaStore]:
+    """取得媒體託管 (未啟用時為 None)"""
+    return request.app.state.media_store
+
+
+def get_user_state_store(request: Request) -> Optional[UserStateStore]:
+    """取得使用者對話狀態儲存 (未啟用時為 None)"""
+    return request.app.state.user_state_store
+
+
+def get_event_deduplicator(request: Request) -> Optional[EventDeduplicator]:
+    """取得 webhook 事件去重器 (未啟用時為 None)"""
+    return request.app.state.event_deduplicator
 
 
 class DefaultMessageHandler(IMessageHandler):
@@ -0,0 +1,354 @@
+"""LINE channel 登錄表
+
+讓單一行程服務多個 LINE channel：每個 channel 各自擁有預先計算金鑰的簽章驗證器、
+連線池、依端點限流的發送佇列、LINE API 服務、訊息路由器與訊息處理器；
+事件去重、事件執行器、訊息轉換器與快取則由所有 channel 共用。
+"""
+
+import asyncio
+import importlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from loguru import logger
+
+from linebot_module.config.settings import ChannelConfig, Settings, settings
+from linebot_module.interfaces.message_handler import IMessageHandler, IUserService
+from linebot_module.infrastructure.http_client import HttpxAsyncHttpClient, create_async_client
+from linebot_module.infrastructure.line_api_service import LineApiService
+from linebot_module.infrastructure.media_cache import MediaCache
+from linebot_module.infrastructure.media_store import MediaStore
+from linebot_module.infrastructure.flex_template import FlexTemplateRegistry
+from linebot_module.infrastructure.user_state_store import UserStateStore
+from linebot_module.infrastructure.outbound_dispatcher import (
+    EndpointClass, OutboundDispatcher, TokenBucket
+)
+from linebot_module.infrastructure.profile_cache import ProfileCache
+from linebot_module.infrastructure.token_manager import ChannelTokenManager
+from linebot_module.infrastructure.webhook_parser import WebhookParser
+from linebot_module.application.services.message_router import MessageRouterService
+
+
+# 以 LINE_CHANNEL_ACCESS_TOKEN / LINE_CHANNEL_SECRET 設定的 channel
+DEFAULT_CHANNEL_ID = "default"
+
+
+@dataclass
+class Channel:
+    """單一 LINE channel 的服務組合"""
+
+    channel_id: str
+    parser: WebhookParser
+    line_api_service: LineApiService
+    message_router: MessageRouterService
+    bot_user_id: Optional[str] = None
+    message_handler: Optional[IMessageHandler] = None  # None 時使用預設處理器
+    user_service: Optional[IUserService] = None  # 綁定此 channel 的使用者服務，未啟用狀態儲存時為 None
+
+    @property
+    def dispatcher(self) -> Optional[OutboundDispatcher]:
+        return self.line_api_service.dispatcher
+
+    @property
+    def token_manager(self) -> Optional[ChannelTokenManager]:
+        return self.line_api_service.token_manager
+
+
+def load_channel_configs(config: Settings = settings) -> List[ChannelConfig]:
+    """讀取 default channel 以外的 channel 設定
+
+    Args:
+        config: 應用程式設定
+
+    Returns:
+        List[ChannelConfig]: line_channels 與 line_channels_file 合併後的設定
+    """
+    channels = list(config.line_channels)
+    if config.line_channels_file:
+        data = json.loads(Path(config.line_channels_file).read_text(encoding="utf-8"))
+        channels.extend(ChannelConfig(**item) for item in data)
+    return channels
+
+
+def _import_object(path: str) -> Any:
+    """依 module:attr 格式的匯入路徑取得物件"""
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def load_message_handler(path: str) -> IMessageHandler:
+    """依匯入路徑建立訊息處理器
+
+    Args:
+        path: module:attr 格式的匯入路徑，attr 為處理器類別或回傳處理器的函式
+
+    Returns:
+        IMessageHandler: 訊息處理器實例
+
+    Raises:
+        TypeError: 建立的物件不是 IMessageHandler
+    """
+    handler = _import_object(path)()
+    if not isinstance(handler, IMessageHandler):
+        raise TypeError(f"{path} 不是 IMessageHandler")
+    return handler
+
+
+def create_channel(
+    config: ChannelConfig,
+    media_cache: Optional[MediaCache] = None,
+    profile_cache: Optional[ProfileCache] = None,
+    media_store: Optional[MediaStore] = None,
+    flex_templates: Optional[FlexTemplateRegistry] = None,
+    user_state_store: Optional[UserStateStore] = None
+) -> Channel:
+    """建立 channel 的驗證器、連線池、發送佇列與路由器
+
+    未在 ChannelConfig 指定的連線池與限流設定使用全域設定值。
+
+    Args:
+        config: channel 設定
+        media_cache: 共用的訊息內容快取
+        profile_cache: 共用的使用者資料快取
+        media_store: 共用的媒體託管
+        flex_templates: 共用的 Flex 範本
+        user_state_store: 共用的使用者對話狀態儲存
+
+    Returns:
+        Channel: 尚未啟動發送佇列的 channel
+
+    Raises:
+        ValueError: 未設定 channel secret (以空字串為金鑰的簽章任何人都能產生)
+    """
+    if not config.secret:
+        raise ValueError(f"channel {config.channel_id} 未設定 secret")
+
+    def _pick(value, default):
+        return default if value is None else value
+
+    dispatcher = OutboundDispatcher(
+        limiters={
+            EndpointClass.PUSH: TokenBucket(_pick(config.push_rate, settings.outbound_push_rate)),
+            EndpointClass.REPLY: TokenBucket(_pick(config.reply_rate, settings.outbound_reply_rate)),
+            EndpointClass.MULTICAST: TokenBucket(
+                _pick(config.multicast_rate, settings.outbound_multicast_rate)
+            ),
+        },
+        workers=settings.outbound_workers,
+        queue_size=settings.outbound_queue_size,
+        max_retries=settings.outbound_max_retries,
+        retry_base_delay=settings.outbound_retry_base_delay,
+        retry_max_delay=settings.outbound_retry_max_delay
+    )
+    http_client = HttpxAsyncHttpClient(create_async_client(
+        max_connections=config.max_connections,
+        max_keepalive_connections=config.max_keepalive_connections
+    ))
+
+    # 非 static 模式由 token 管理器以同一連線池取得並更新 token
+    token_manager = None
+    token_mode = config.token_mode or settings.line_token_mode
+    if token_mode != "static":
+        assertion = config.token_assertion or settings.line_token_assertion
+        token_manager = ChannelTokenManager(
+            http_client.client,
+            settings.line_api_endpoint,
+            token_mode,
+            config.line_channel_id,
+            config.secret,
+            _import_object(assertion) if assertion else None,
+            settings.line_token_refresh_margin,
+            settings.line_token_refresh_jitter
+        )
+
+    line_api_service = LineApiService(
+        http_client,
+        media_cache,
+        dispatcher,
+        profile_cache,
+        access_token=config.access_token,
+        token_manager=token_manager,
+        media_store=media_store,
+        flex_templates=flex_templates
+    )
+    return Channel(
+        channel_id=config.channel_id,
+        parser=WebhookParser(config.secret),
+        line_api_service=line_api_service,
+        message_router=MessageRouterService(
+            line_api_service, user_state_store=user_state_store, channel_id=config.channel_id
+        ),
+        bot_user_id=config.bot_user_id,
+        message_handler=load_message_handler(config.handler) if config.handler else None,
+        user_service=user_state_store.for_channel(config.channel_id) if user_state_store else None
+    )
+
+
+class ChannelRegistry:
+    """以 channel ID 與 bot user ID 查找 channel"""
+
+    def __init__(self):
+        self._channels: Dict[str, Channel] = {}
+        self._by_destination: Dict[str, Channel] = {}
+
+    def register(self, channel: Channel) -> None:
+        """登錄 channel
+
+        Raises:
+            ValueError: channel ID 或 bot user ID 重複
+        """
+        if channel.channel_id in self._channels:
+            raise ValueError(f"channel {channel.channel_id} 重複設定")
+        if channel.bot_user_id:
+            if channel.bot_user_id in self._by_destination:
+                raise ValueError(f"bot user ID {channel.bot_user_id} 重複設定")
+            self._by_destination[channel.bot_user_id] = channel
+        self._channels[channel.channel_id] = channel
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def __iter__(self) -> Iterator[Channel]:
+        return iter(self._channels.values())
+
+    @property
+    def default(self) -> Optional[Channel]:
+        """default channel (未設定 LINE_CHANNEL_SECRET 時為 None)"""
+        return self._channels.get(DEFAULT_CHANNEL_ID)
+
+    @property
+    def routes_by_destination(self) -> bool:
+        """/webhook 是否需要依 destination 決定 channel (只有 default channel 時不需要)"""
+        return self.default is None or (bool(self._by_destination) and len(self._channels) > 1)
+
+    def get(self, channel_id: str) -> Optional[Channel]:
+        """依 channel ID 取得 channel"""
+        return self._channels.get(channel_id)
+
+    def for_destination(self, destination: Optional[str]) -> Optional[Channel]:
+        """依 webhook 的 destination 取得 channel，未設定該 bot user ID 時回傳 None"""
+        return self._by_destination.get(destination) if destination else None
+
+    def for_signature(self, body: bytes, signature: str) -> Optional[Channel]:
+        """找出簽章相符的 channel (內容尚未驗證前不解析，因此以各 channel 的 secret 逐一驗證)
+
+        Args:
+            body: 請求原始內容
+            signature: X-Line-Signature 標頭值
+
+        Returns:
+            Optional[Channel]: 簽章相符的 channel，皆不相符時回傳 None
+        """
+        for channel in self:
+            if channel.parser.verifier.verify(body, signature):
+                return channel
+        return None
+
+    async def start(self) -> None:
+        """取得各 channel 的 access token 並啟動發送佇列"""
+        await asyncio.gather(*(
+            channel.token_manager.start() for channel in self if channel.token_manager
+        ))
+        await asyncio.gather(*(channel.dispatcher.start() for channel in self))
+        logger.info(f"📡 已啟動 {len(self)} 個 LINE channel")
+
+    async def warm_up(self, connections: int) -> None:
+        """預熱各 channel 的連線池 (略過未設定 access token 的 channel)
+
+        Args:
+            connections: 每個 channel 預先建立的連線數
+        """
+        await asyncio.gather(*(
+            channel.line_api_service.warm_up(connections)
+            for channel in self
+            if channel.line_api_service.access_token
+        ))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """清空各 channel 的發送佇列後關閉連線池
+
+        Args:
+            timeout: 等待發送佇列清空的時間上限 (秒)，所有 channel 同時清空
+        """
+        await asyncio.gather(*(
+            channel.dispatcher.stop(timeout) for channel in self if channel.dispatcher
+        ))
+        await asyncio.gather(*(
+            channel.token_manager.stop() for channel in self if channel.token_manager
+        ))
+        await asyncio.gather(*(channel.line_api_service.close() for channel in self))
+
+    @property
+    def outbound_queue_depth(self) -> int:
+        """所有 channel 發送佇列等待中的請求數"""
+        return sum(channel.dispatcher.queue_depth for channel in self if channel.dispatcher)
+
+    @property
+    def outbound_in_flight(self) -> int:
+        """所有 channel 發送佇列處理中的請求數"""
+        return sum(channel.dispatcher.in_flight for channel in self if channel.dispatcher)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得各 channel 的設定摘要與發送佇列統計資料"""
+        return {
+            channel.channel_id: {
+                "bot_user_id": channel.bot_user_id,
+                "custom_handler": channel.message_handler is not None,
+                "outbound": channel.dispatcher.stats() if channel.dispatcher else None,
+                "token": channel.token_manager.stats() if channel.token_manager else {"mode": "static"},
+            }
+            for channel in self
+        }
+
+
+def create_channel_registry(
+    config: Settings = settings,
+    media_cache: Optional[MediaCache] = None,
+    profile_cache: Optional[ProfileCache] = None,
+    media_store: Optional[MediaStore] = None,
+    flex_templates: Optional[FlexTemplateRegistry] = None,
+    user_state_store: Optional[UserStateStore] = None
+) -> ChannelRegistry:
+    """依設定建立 channel 登錄表
+
+    Args:
+        config: 應用程式設定
+        media_cache: 共用的訊息內容快取
+        profile_cache: 共用的使用者資料快取
+        media_store: 共用的媒體託管
+        flex_templates: 共用的 Flex 範本
+        user_state_store: 共用的使用者對話狀態儲存
+
+    Returns:
+        ChannelRegistry: 包含 default channel 與設定中所有 channel 的登錄表
+        (未設定 LINE_CHANNEL_SECRET 時不建立 default channel)
+
+    Raises:
+        ValueError: 沒有任何設定 secret 的 channel，或 channel 設定錯誤
+    """
+    registry = ChannelRegistry()
+    channel_configs = load_channel_configs(config)
+    if config.line_channel_secret:
+        channel_configs.insert(0, ChannelConfig(
+            channel_id=DEFAULT_CHANNEL_ID,
+            access_token=config.line_channel_access_token,
+            secret=config.line_channel_secret,
+            line_channel_id=config.line_channel_id,
+            token_mode=config.line_token_mode,
+            token_assertion=config.line_token_assertion
+        ))
+    else:
+        logger.warning("⚠️ 未設定 LINE_CHANNEL_SECRET，不建立 default channel")
+    if not channel_configs:
+        raise ValueError("未設定任何 LINE channel (LINE_CHANNEL_SECRET 或 LINE_CHANNELS)")
+
+    for channel_config in channel_configs:
+        registry.register(
+            create_channel(
+                channel_config, media_cache, profile_cache, media_store, flex_templates,
+                user_state_store
+            )
+        )
+    return registry
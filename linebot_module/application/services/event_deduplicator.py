@@ -0,0 +1,123 @@
+"""Webhook 事件去重服務
+
+以環狀佇列加雜湊表記錄時間窗內看過的 webhookEventId，
+在事件進入處理流程前丟棄 LINE 重送或負載平衡器重試造成的重複事件
+"""
+
+import itertools
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class EventDeduplicator:
+    """時間窗內的事件去重器
+
+    記憶體用量以 max_entries 為上限：超過時間窗或數量上限的最舊紀錄會被移除。
+    每筆紀錄有遞增的序號，forget 後重新記錄的 ID 不會因舊紀錄到期而被移除。
+    """
+
+    def __init__(self, window_seconds: float, max_entries: int):
+        """初始化去重器
+
+        Args:
+            window_seconds: 記錄事件 ID 的時間窗 (秒)
+            max_entries: 最多記錄的事件 ID 數
+        """
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+
+        # (到期時間, 序號, 事件 ID)；_seen 保存事件 ID 目前有效紀錄的序號
+        self._order: Deque[Tuple[float, int, str]] = deque()
+        self._seen: Dict[str, int] = {}
+        self._serial = itertools.count()
+
+        self.checked = 0
+        self.duplicates = 0
+        self.redeliveries = 0
+        self.redeliveries_dropped = 0
+
+    @staticmethod
+    def event_id(event: Dict[str, Any]) -> Optional[str]:
+        """取得事件的唯一識別碼
+
+        Args:
+            event: webhook 事件字典
+
+        Returns:
+            Optional[str]: webhookEventId，舊格式事件退回使用訊息 ID
+        """
+        webhook_event_id = event.get("webhookEventId")
+        if webhook_event_id:
+            return webhook_event_id
+
+        message = event.get("message")
+        if message and message.get("id"):
+            return f"message:{message['id']}"
+        return None
+
+    def _expire(self, now: float) -> None:
+        """移除超出時間窗或數量上限的最舊紀錄"""
+        order = self._order
+        while order and (order[0][0] <= now or len(order) > self.max_entries):
+            _, serial, event_id = order.popleft()
+            if self._seen.get(event_id) == serial:
+                del self._seen[event_id]
+
+    def is_duplicate(self, event: Dict[str, Any]) -> bool:
+        """檢查事件是否重複，未重複時記錄其 ID
+
+        Args:
+            event: webhook 事件字典
+
+        Returns:
+            bool: 是否為時間窗內已處理過的事件
+        """
+        self.checked += 1
+        is_redelivery = bool(event.get("deliveryContext", {}).get("isRedelivery"))
+        if is_redelivery:
+            self.redeliveries += 1
+
+        event_id = self.event_id(event)
+        if event_id is None:
+            return False
+
+        now = time.monotonic()
+        self._expire(now)
+
+        if event_id in self._seen:
+            self.duplicates += 1
+            if is_redelivery:
+                self.redeliveries_dropped += 1
+            return True
+
+        serial = next(self._serial)
+        self._seen[event_id] = serial
+        self._order.append((now + self.window_seconds, serial, event_id))
+        if len(self._order) > self.max_entries:
+            self._expire(now)
+        return False
+
+    def forget(self, event: Dict[str, Any]) -> None:
+        """移除事件 ID 的紀錄，讓之後的重送可以再次處理
+
+        事件因背壓未能排入處理時呼叫。環狀佇列中的舊紀錄留待到期時略過。
+
+        Args:
+            event: webhook 事件字典
+        """
+        event_id = self.event_id(event)
+        if event_id is not None:
+            self._seen.pop(event_id, None)
+
+    def stats(self) -> dict:
+        """取得去重統計資料"""
+        return {
+            "checked": self.checked,
+            "duplicates_dropped": self.duplicates,
+            "redeliveries": self.redeliveries,
+            "redeliveries_dropped": self.redeliveries_dropped,
+            "tracked_ids": len(self._seen),
+            "max_entries": self.max_entries,
+            "window_seconds": self.window_seconds,
+        }
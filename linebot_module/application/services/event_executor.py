@@ -0,0 +1,195 @@
+"""Webhook 事件執行器
+
+以固定數量的 asyncio worker 處理 webhook 事件，依對話 (使用者、群組、聊天室)
+分片：同一對話的事件依序執行，不同對話的事件平行執行，
+各分片佇列有容量上限，佇列已滿時由呼叫端回應背壓。
+分片佇列依截止時間排序，reply token 最接近過期的事件優先執行
+"""
+
+import asyncio
+import itertools
+import math
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+EventJob = Callable[[], Awaitable[Any]]
+
+
+def conversation_key(event: Dict[str, Any]) -> str:
+    """取得事件所屬對話的識別碼
+
+    Args:
+        event: webhook 事件字典
+
+    Returns:
+        str: 群組 ID、聊天室 ID 或使用者 ID
+    """
+    source = event.get("source", {})
+    return source.get("groupId") or source.get("roomId") or source.get("userId") or ""
+
+
+class EventExecutor:
+    """依對話分片、有容量上限的事件執行器
+
+    分片內以 (截止時間, 排入順序) 排序。同一對話的截止時間隨事件時間遞增，
+    因此對話內仍維持先後順序；未指定截止時間的事件排在最後並依排入順序執行。
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        """初始化執行器
+
+        Args:
+            workers: worker (分片) 數量
+            queue_size: 每個分片的佇列容量
+        """
+        self.worker_count = workers
+        self.queue_size = queue_size
+
+        self._queues: List[asyncio.PriorityQueue] = []
+        self._sequence = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._busy: List[bool] = [False] * workers
+        self._busy_time = 0.0
+        self._started_at: Optional[float] = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        """是否已啟動"""
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        """啟動 worker"""
+        if self.running:
+            return
+        self._queues = [
+            asyncio.PriorityQueue(maxsize=self.queue_size) for _ in range(self.worker_count)
+        ]
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"event-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        self._started_at = time.monotonic()
+        logger.info(f"🧵 事件執行器已啟動，worker 數: {self.worker_count}")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """等待佇列清空後停止 worker
+
+        Args:
+            timeout: 等待清空的時間上限 (秒)，逾時後捨棄剩餘事件
+        """
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ 事件佇列未在 {timeout} 秒內清空，剩餘 {self.queue_depth} 筆")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _shard(self, key: str) -> int:
+        """依對話識別碼決定分片"""
+        return zlib.crc32(key.encode("utf-8")) % self.worker_count
+
+    def submit(self, key: str, job: EventJob, deadline: Optional[float] = None) -> bool:
+        """將事件排入對話所屬分片的佇列
+
+        Args:
+            key: 對話識別碼
+            job: 處理事件的函式
+            deadline: 截止時間 (epoch 秒)，越早的事件越先執行
+
+        Returns:
+            bool: 是否成功排入，佇列已滿時回傳 False
+        """
+        if not self.running:
+            raise RuntimeError("EventExecutor 尚未啟動")
+
+        try:
+            self._queues[self._shard(key)].put_nowait(
+                (math.inf if deadline is None else deadline, next(self._sequence), job)
+            )
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+        self.submitted += 1
+        return True
+
+    async def put(self, key: str, job: EventJob, deadline: Optional[float] = None) -> None:
+        """將事件排入對話所屬分片的佇列，佇列已滿時等待空間
+
+        用於事件已持久化、不能以背壓拒絕的來源 (webhook spool)。
+
+        Args:
+            key: 對話識別碼
+            job: 處理事件的函式
+            deadline: 截止時間 (epoch 秒)，越早的事件越先執行
+        """
+        if not self.running:
+            raise RuntimeError("EventExecutor 尚未啟動")
+
+        await self._queues[self._shard(key)].put(
+            (math.inf if deadline is None else deadline, next(self._sequence), job)
+        )
+        self.submitted += 1
+
+    async def _worker(self, index: int) -> None:
+        """worker 主迴圈：依序處理所屬分片的事件"""
+        queue = self._queues[index]
+        while True:
+            _, _, job = await queue.get()
+            self._busy[index] = True
+            started = time.monotonic()
+            try:
+                await job()
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"❌ 事件處理時發生錯誤: {e}")
+            finally:
+                self._busy_time += time.monotonic() - started
+                self._busy[index] = False
+                queue.task_done()
+
+    @property
+    def busy_workers(self) -> int:
+        """處理中的 worker 數"""
+        return sum(self._busy)
+
+    @property
+    def queue_depth(self) -> int:
+        """所有分片等待中的事件數"""
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得佇列深度與 worker 使用率"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        capacity = elapsed * self.worker_count
+        return {
+            "running": self.running,
+            "workers": self.worker_count,
+            "busy_workers": self.busy_workers,
+            "utilization": round(self._busy_time / capacity, 4) if capacity else 0.0,
+            "queue_depth": self.queue_depth,
+            "max_shard_depth": max((queue.qsize() for queue in self._queues), default=0),
+            "shard_queue_size": self.queue_size,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
@@ -3,33 +3,98 @@
 實作訊息路由邏輯，將不同類型的訊息分發到對應的處理器
 """
 
-from typing import Optional
-from loguru import logger
+import asyncio
+import time
+from typing import Dict, List, Optional
 
 from linebot_module.interfaces.message_handler import IMessageRouter, IMessageHandler
 from linebot_module.infrastructure.line_api_service import LineApiService
+from linebot_module.infrastructure.outbound_dispatcher import DEADLINE_EXCEEDED
+from linebot_module.infrastructure.user_state_store import UserStateStore
+from linebot_module.config.settings import settings
+from linebot_module.config.logging_config import get_logger
+from linebot_module.infrastructure.metrics import (
+    handler_duration, handler_timeouts, replies_missed, reply_fallbacks
+)
 from linebot_module.domain.models import (
-    BaseMessage, TextMessage, ImageMessage, AudioMessage, 
-    VideoMessage, LocationMessage, StickerMessage, MessageType
+    BaseMessage, MessageType, HandlerResponse, OutboundMessage, OutboundTextMessage
 )
 
 
+logger = get_logger("router")
+
+
+# 訊息類型對應的處理器方法名稱
+DEFAULT_HANDLER_METHODS: Dict[str, str] = {
+    MessageType.TEXT.value: "handle_text_message",
+    MessageType.IMAGE.value: "handle_image_message",
+    MessageType.AUDIO.value: "handle_audio_message",
+    MessageType.VIDEO.value: "handle_video_message",
+    MessageType.FILE.value: "handle_file_message",
+    MessageType.LOCATION.value: "handle_location_message",
+    MessageType.STICKER.value: "handle_sticker_message",
+}
+
+# LINE 對過期或已使用的 reply token 回傳的錯誤訊息
+INVALID_REPLY_TOKEN = "Invalid reply token"
+# 表示 reply token 已無法使用、應改以 push 發送的錯誤訊息 (含發送佇列重試超過期限)
+REPLY_TOKEN_EXPIRED = (INVALID_REPLY_TOKEN, DEADLINE_EXCEEDED)
+
+
 class MessageRouterService(IMessageRouter):
-    """訊息路由服務實作"""
+    """訊息路由服務實作
+    
+    以訊息類型為鍵的分派表查找處理器方法，未註冊的類型交由 handle_unknown_message。
+    處理器有執行時間上限；錯過 reply token 期限的回覆依設定改以 push 發送或捨棄。
+    設定狀態儲存時，處理器執行前載入 message.user_state，執行後寫回有變更的狀態；
+    載入到寫回之間獨占該使用者在此 channel 的狀態，沒有使用者 ID 的事件不載入狀態。
+    """
     
-    def __init__(self, line_api_service: LineApiService):
+    def __init__(
+        self,
+        line_api_service: LineApiService,
+        handler_timeout: Optional[float] = None,
+        fallback_policy: Optional[str] = None,
+        user_state_store: Optional[UserStateStore] = None,
+        channel_id: str = "default"
+    ):
         """初始化訊息路由服務
         
         Args:
             line_api_service: LINE API 服務實例
+            handler_timeout: 處理器執行時間上限 (秒)，None 時使用設定值
+            fallback_policy: 錯過回覆期限時的處理方式 (push 或 drop)，None 時使用設定值
+            user_state_store: 使用者對話狀態儲存，None 時不載入狀態
+            channel_id: 所屬 channel，對話狀態依 channel 區分
         """
         self.line_api_service = line_api_service
+        self.handler_timeout = (
+            settings.handler_timeout_seconds if handler_timeout is None else handler_timeout
+        )
+        self.fallback_policy = fallback_policy or settings.reply_fallback_policy
+        self.user_state_store = user_state_store
+        self.channel_id = channel_id
+        self._handler_methods: Dict[str, str] = dict(DEFAULT_HANDLER_METHODS)
+        
+        self.handler_timeouts = 0
+        self.missed_replies = 0
+        self.fallback_pushes = 0
+        self.dropped_replies = 0
+    
+    def register_handler(self, message_type: str, method_name: str) -> None:
+        """註冊訊息類型對應的處理器方法 (可覆寫既有類型)
+        
+        Args:
+            message_type: 訊息類型字串
+            method_name: 訊息處理器上的方法名稱，例如 "handle_beacon_message"
+        """
+        self._handler_methods[message_type] = method_name
     
     async def route_message(
         self, 
         message: BaseMessage, 
         message_handler: IMessageHandler
-    ) -> Optional[str]:
+    ) -> Optional[HandlerResponse]:
         """路由訊息到對應的處理器
         
         Args:
@@ -37,43 +102,47 @@ class MessageRouterService(IMessageRouter):
             message_handler: 訊息處理器
             
         Returns:
-            Optional[str]: 處理結果，None 表示不回應
+            Optional[HandlerResponse]: 處理結果，None 表示不回應
         """
         try:
-            logger.info(f"📨 路由訊息: {message.message_type} from {message.user_id}")
-            
-            # 根據訊息類型路由到對應的處理器
-            if message.message_type == MessageType.TEXT and isinstance(message, TextMessage):
-                return await message_handler.handle_text_message(message)
+            logger.info("📨 路由訊息: {} from {}", message.message_type, message.user_id)
             
-            elif message.message_type == MessageType.IMAGE and isinstance(message, ImageMessage):
-                return await message_handler.handle_image_message(message)
+            # 根據訊息類型查表路由到對應的處理器
+            method_name = self._handler_methods.get(message.message_type)
+            handle = getattr(message_handler, method_name, None) if method_name else None
+            if handle is None:
+                logger.warning("⚠️ 未知的訊息類型: {}", message.message_type)
+                handle = message_handler.handle_unknown_message
             
-            elif message.message_type == MessageType.AUDIO and isinstance(message, AudioMessage):
-                return await message_handler.handle_audio_message(message)
+            store = self.user_state_store
+            if store is None or not message.user_id:
+                return await self._run_handler(handle, message)
             
-            elif message.message_type == MessageType.VIDEO and isinstance(message, VideoMessage):
-                return await message_handler.handle_video_message(message)
-            
-            elif message.message_type == MessageType.LOCATION and isinstance(message, LocationMessage):
-                return await message_handler.handle_location_message(message)
-            
-            elif message.message_type == MessageType.STICKER and isinstance(message, StickerMessage):
-                return await message_handler.handle_sticker_message(message)
-            
-            else:
-                logger.warning(f"⚠️ 未知的訊息類型: {message.message_type}")
-                return await message_handler.handle_unknown_message(message)
+            async with store.hold(message.user_id, channel_id=self.channel_id) as state:
+                message.user_state = state
+                return await self._run_handler(handle, message)
                 
         except Exception as e:
-            logger.error(f"❌ 路由訊息時發生錯誤: {e}")
+            logger.error("❌ 路由訊息時發生錯誤: {}", e)
             return "抱歉，處理您的訊息時發生錯誤，請稍後再試。"
     
+    @staticmethod
+    async def _run_handler(handle, message: BaseMessage) -> Optional[HandlerResponse]:
+        """執行處理器並記錄執行時間"""
+        started = time.perf_counter()
+        try:
+            return await handle(message)
+        finally:
+            handler_duration.labels(str(message.message_type)).observe(
+                time.perf_counter() - started
+            )
+    
     async def process_and_reply(
         self, 
         message: BaseMessage, 
         message_handler: IMessageHandler,
-        reply_token: str
+        reply_token: str,
+        deadline: Optional[float] = None
     ) -> bool:
         """處理訊息並自動回覆
         
@@ -81,25 +150,106 @@ class MessageRouterService(IMessageRouter):
             message: 訊息物件
             message_handler: 訊息處理器
             reply_token: 回覆 token
+            deadline: reply token 的期限 (epoch 秒)，None 表示不檢查
             
         Returns:
             bool: 處理是否成功
         """
         try:
-            # 路由訊息並取得回應內容
-            response_content = await self.route_message(message, message_handler)
+            # 路由訊息並取得回應內容 (處理器有執行時間上限)
+            try:
+                response_content = await asyncio.wait_for(
+                    self.route_message(message, message_handler),
+                    self.handler_timeout
+                )
+            except asyncio.TimeoutError:
+                self.handler_timeouts += 1
+                handler_timeouts.inc()
+                logger.warning("⏱️ 訊息處理器逾時 ({} 秒): {}", self.handler_timeout, message.message_id)
+                return False
+            
+            messages = self.normalize_response(response_content)
             
             # 如果有回應內容，則發送回覆
-            if response_content:
-                result = await self.line_api_service.reply_message(
-                    reply_token, 
-                    response_content
-                )
-                return result.success
-            else:
+            if not messages:
                 logger.info("📤 沒有回應內容，不發送回覆")
                 return True
+            
+            # 前五則以 reply token 回覆，超出部分以 push 補送
+            limit = self.line_api_service.MAX_MESSAGES_PER_CALL
+            success = True
+            pending = messages
+            if deadline is None or time.time() < deadline:
+                result = await self.line_api_service.reply_messages(
+                    reply_token,
+                    messages[:limit],
+                    deadline=deadline
+                )
+                error_message = result.error_message or ""
+                if result.success or not any(m in error_message for m in REPLY_TOKEN_EXPIRED):
+                    success = result.success
+                    pending = messages[limit:]
+            
+            if pending is messages:
+                # 錯過回覆期限
+                self.missed_replies += 1
+                replies_missed.inc()
+                reply_fallbacks.labels(self.fallback_policy).inc()
+                if self.fallback_policy == "drop":
+                    self.dropped_replies += 1
+                    logger.warning("⚠️ 已錯過回覆期限，捨棄回覆: {}", message.message_id)
+                    return False
+                self.fallback_pushes += 1
+                logger.warning("⚠️ 已錯過回覆期限，改以 push 發送: {}", message.message_id)
+            
+            if pending:
+                if len(pending) > limit:
+                    logger.warning("⚠️ 回應內容共 {} 則，需要多次 push 補送", len(messages))
+                # 群組與聊天室的回應送回群組，而不是私訊發言者
+                target = message.conversation_id or message.user_id
+                for i in range(0, len(pending), limit):
+                    push_result = await self.line_api_service.push_messages(
+                        target,
+                        pending[i:i + limit]
+                    )
+                    success = success and push_result.success
+            
+            return success
                 
         except Exception as e:
-            logger.error(f"❌ 處理並回覆訊息時發生錯誤: {e}")
-            return False
\ No newline at end of file
+            logger.error("❌ 處理並回覆訊息時發生錯誤: {}", e)
+            return False
+    
+    def stats(self) -> dict:
+        """取得處理器逾時與回覆期限統計資料"""
+        return {
+            "handler_timeout_seconds": self.handler_timeout,
+            "fallback_policy": self.fallback_policy,
+            "handler_timeouts": self.handler_timeouts,
+            "missed_replies": self.missed_replies,
+            "fallback_pushes": self.fallback_pushes,
+            "dropped_replies": self.dropped_replies,
+        }
+    
+    @staticmethod
+    def normalize_response(response: Optional[HandlerResponse]) -> List[OutboundMessage]:
+        """將處理器的回應內容轉換為發送訊息列表
+        
+        Args:
+            response: 處理器回傳的文字、發送訊息或其列表
+            
+        Returns:
+            List[OutboundMessage]: 發送訊息列表，空字串與 None 會被略過
+        """
+        if response is None:
+            return []
+        
+        items = response if isinstance(response, list) else [response]
+        messages = []
+        for item in items:
+            if isinstance(item, str):
+                if item:
+                    messages.append(OutboundTextMessage(text=item))
+            elif item is not None:
+                messages.append(item)
+        return messages
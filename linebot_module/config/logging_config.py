@@ -0,0 +1,134 @@
+"""日誌設定
+
+依 Settings 設定 loguru 的輸出：可選擇經由佇列在背景執行緒寫出、
+輸出結構化 JSON，並依類別對 INFO 以下的成功日誌取樣。
+WARNING 以上的日誌一律記錄。
+
+熱路徑模組以 get_logger(類別) 取得日誌物件，並以 loguru 的 {} 參數格式記錄訊息，
+未被取樣的日誌不會進行字串格式化。
+"""
+
+import json
+import random
+import sys
+from typing import Any, Dict, Optional, TextIO
+
+from loguru import logger
+
+from linebot_module.config.settings import Settings, settings
+
+
+# 各類別的取樣比例，由 setup_logging 設定
+_sample_rates: Dict[str, float] = {}
+_default_sample_rate = 1.0
+
+
+class SampledLogger:
+    """依類別取樣的日誌物件
+
+    debug、info、success 依取樣比例決定是否記錄；warning 以上一律記錄。
+    """
+
+    __slots__ = ("category", "_logger")
+
+    def __init__(self, category: str):
+        """初始化日誌物件
+
+        Args:
+            category: 日誌類別，對應 Settings.log_sample_rates 的鍵
+        """
+        self.category = category
+        self._logger = logger.bind(category=category).opt(depth=1)
+
+    def _sampled(self) -> bool:
+        """是否記錄此筆成功日誌"""
+        rate = _sample_rates.get(self.category, _default_sample_rate)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+    def debug(self, message: str, *args: Any, **kwargs: Any) -> None:
+        if self._sampled():
+            self._logger.debug(message, *args, **kwargs)
+
+    def info(self, message: str, *args: Any, **kwargs: Any) -> None:
+        if self._sampled():
+            self._logger.info(message, *args, **kwargs)
+
+    def success(self, message: str, *args: Any, **kwargs: Any) -> None:
+        if self._sampled():
+            self._logger.success(message, *args, **kwargs)
+
+    def warning(self, message: str, *args: Any, **kwargs: Any) -> None:
+        self._logger.warning(message, *args, **kwargs)
+
+    def error(self, message: str, *args: Any, **kwargs: Any) -> None:
+        self._logger.error(message, *args, **kwargs)
+
+    def exception(self, message: str, *args: Any, **kwargs: Any) -> None:
+        self._logger.opt(depth=1, exception=True).error(message, *args, **kwargs)
+
+    def critical(self, message: str, *args: Any, **kwargs: Any) -> None:
+        self._logger.critical(message, *args, **kwargs)
+
+
+def get_logger(category: str) -> SampledLogger:
+    """取得指定類別的日誌物件
+
+    Args:
+        category: 日誌類別 (例如 webhook、router、line_api)
+
+    Returns:
+        SampledLogger: 依類別取樣的日誌物件
+    """
+    return SampledLogger(category)
+
+
+def _json_sink(stream: TextIO):
+    """建立輸出單行 JSON 的 sink"""
+    def sink(message) -> None:
+        record = message.record
+        payload = {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "message": record["message"],
+            "logger": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+        }
+        payload.update(record["extra"])
+        if record["exception"] is not None:
+            exception = record["exception"]
+            payload["exception"] = f"{exception.type.__name__}: {exception.value}"
+        stream.write(json.dumps(payload, ensure_ascii=False, default=str) + "\n")
+        stream.flush()
+    return sink
+
+
+def setup_logging(config: Settings = settings, stream: Optional[TextIO] = None) -> None:
+    """依設定重新設定 loguru 的輸出
+
+    Args:
+        config: 應用程式設定
+        stream: 輸出目標，None 時使用 stderr
+    """
+    global _default_sample_rate
+
+    _sample_rates.clear()
+    _sample_rates.update(config.log_sample_rates)
+    _default_sample_rate = config.log_default_sample_rate
+
+    stream = stream or sys.stderr
+    logger.remove()
+    if config.log_format == "json":
+        logger.add(
+            _json_sink(stream),
+            level=config.log_level.upper(),
+            enqueue=config.log_enqueue,
+            catch=True
+        )
+    else:
+        logger.add(
+            stream,
+            level=config.log_level.upper(),
+            enqueue=config.log_enqueue,
+            catch=True
+        )
@@ -3,12 +3,79 @@
 使用 Pydantic Settings 管理環境變數和設定
 """
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 import os
 
 
+class ChannelConfig(BaseModel):
+    """單一 LINE channel 的設定 (多 channel 模式)"""
+
+    channel_id: str = Field(
+        description="channel 識別碼，對應 /api/v1/webhook/{channel_id}"
+    )
+
+    access_token: str = Field(
+        default="",
+        description="LINE Channel Access Token (token_mode 為 static 時使用)"
+    )
+
+    secret: str = Field(
+        description="LINE Channel Secret"
+    )
+
+    line_channel_id: str = Field(
+        default="",
+        description="LINE channel ID (自動取得 access token 時使用)"
+    )
+
+    token_mode: Optional[Literal["static", "stateless", "short_lived", "jwt"]] = Field(
+        default=None,
+        description="access token 取得方式，None 時使用 LINE_TOKEN_MODE"
+    )
+
+    token_assertion: Optional[str] = Field(
+        default=None,
+        description="產生 JWT assertion 的函式匯入路徑 (module:attr)"
+    )
+
+    bot_user_id: Optional[str] = Field(
+        default=None,
+        description="bot 的 user ID，對應 webhook 內容的 destination"
+    )
+
+    handler: Optional[str] = Field(
+        default=None,
+        description="訊息處理器的匯入路徑 (module:attr)，None 時使用預設處理器"
+    )
+
+    max_connections: Optional[int] = Field(
+        default=None,
+        description="此 channel 連線池的最大連線數，None 時使用 LINE_API_MAX_CONNECTIONS"
+    )
+
+    max_keepalive_connections: Optional[int] = Field(
+        default=None,
+        description="此 channel 連線池保留的 keep-alive 連線數"
+    )
+
+    push_rate: Optional[float] = Field(
+        default=None,
+        description="此 channel push 端點每秒請求上限，None 時使用 OUTBOUND_PUSH_RATE"
+    )
+
+    reply_rate: Optional[float] = Field(
+        default=None,
+        description="此 channel reply 端點每秒請求上限"
+    )
+
+    multicast_rate: Optional[float] = Field(
+        default=None,
+        description="此 channel multicast 端點每秒請求上限"
+    )
+
+
 class Settings(BaseSettings):
     """應用程式設定類別"""
     
@@ -23,6 +90,314 @@ class Settings(BaseSettings):
         description="LINE Channel Secret"
     )
     
+    line_channel_id: str = Field(
+        default="",
+        description="LINE Channel ID (自動取得 access token 時使用)"
+    )
+
+    # Channel access token 設定
+    line_token_mode: Literal["static", "stateless", "short_lived", "jwt"] = Field(
+        default="static",
+        description="access token 取得方式：static 使用設定的長期 token，其餘由 channel ID/secret 或 JWT 自動取得"
+    )
+
+    line_token_assertion: Optional[str] = Field(
+        default=None,
+        description="產生 JWT assertion 的函式匯入路徑 (module:attr)，jwt 模式必須設定"
+    )
+
+    line_token_refresh_margin: float = Field(
+        default=0.25,
+        gt=0.0,
+        lt=1.0,
+        description="剩餘有效期佔總有效期的比例低於此值時於背景更新 token"
+    )
+
+    line_token_refresh_jitter: float = Field(
+        default=0.1,
+        ge=0.0,
+        lt=1.0,
+        description="更新時間隨機提前的範圍 (佔總有效期的比例)，避免多個行程同時更新"
+    )
+
+    # 多 channel 設定 (LINE_CHANNEL_ACCESS_TOKEN / SECRET 為 default channel)
+    line_channels: List[ChannelConfig] = Field(
+        default_factory=list,
+        description="其他 LINE channel 的設定 (JSON 陣列)"
+    )
+
+    line_channels_file: Optional[str] = Field(
+        default=None,
+        description="LINE channel 設定檔路徑 (JSON 陣列)，與 line_channels 合併"
+    )
+
+    # LINE API 連線設定
+    line_api_endpoint: str = Field(
+        default="https://api.line.me",
+        description="LINE Messaging API 基底網址 (壓力測試時可指向模擬伺服器)"
+    )
+
+    line_api_data_endpoint: str = Field(
+        default="https://api-data.line.me",
+        description="LINE 訊息內容 API 基底網址"
+    )
+
+    line_api_timeout: float = Field(
+        default=10.0,
+        description="LINE API 請求逾時 (秒)"
+    )
+
+    line_api_connect_timeout: float = Field(
+        default=5.0,
+        description="LINE API 連線逾時 (秒)"
+    )
+
+    line_api_max_connections: int = Field(
+        default=100,
+        description="LINE API 連線池最大連線數"
+    )
+
+    line_api_max_keepalive_connections: int = Field(
+        default=20,
+        description="LINE API 連線池保留的 keep-alive 連線數"
+    )
+
+    line_api_keepalive_expiry: float = Field(
+        default=30.0,
+        description="keep-alive 連線閒置逾時 (秒)"
+    )
+
+    line_api_http2: bool = Field(
+        default=True,
+        description="是否啟用 HTTP/2 (需安裝 h2 套件)"
+    )
+
+    line_api_warmup_connections: int = Field(
+        default=2,
+        description="啟動時預先建立的 LINE API 連線數 (0 表示不預熱)"
+    )
+
+    # 訊息內容快取設定
+    media_cache_enabled: bool = Field(
+        default=False,
+        description="是否啟用訊息內容磁碟快取"
+    )
+
+    media_cache_dir: str = Field(
+        default=".cache/media",
+        description="訊息內容快取目錄"
+    )
+
+    media_cache_max_bytes: int = Field(
+        default=1024 * 1024 * 1024,
+        description="訊息內容快取容量上限 (bytes)"
+    )
+
+    media_cache_ttl_seconds: int = Field(
+        default=7 * 24 * 60 * 60,
+        description="訊息內容快取存活時間 (秒)，對應 LINE 內容保存期限"
+    )
+
+    # 使用者對話狀態設定
+    user_state_enabled: bool = Field(
+        default=False,
+        description="是否啟用使用者對話狀態儲存 (處理器可由 message.user_state 讀寫)"
+    )
+
+    user_state_db_path: str = Field(
+        default=".cache/user_state.sqlite3",
+        description="使用者對話狀態的 SQLite 資料庫路徑"
+    )
+
+    user_state_cache_size: int = Field(
+        default=10000,
+        description="使用者對話狀態 LRU 快取的使用者數上限"
+    )
+
+    user_state_flush_interval: float = Field(
+        default=1.0,
+        description="使用者對話狀態批次寫入的時間間隔 (秒)，當機時最多遺失此期間的變更"
+    )
+
+    user_state_flush_batch_size: int = Field(
+        default=500,
+        description="待寫入的使用者數達到此值時提前批次寫入"
+    )
+
+    # Flex 範本設定
+    flex_template_dir: Optional[str] = Field(
+        default=None,
+        description="Flex 訊息範本目錄 (*.json)，啟動時載入並驗證"
+    )
+
+    # 媒體託管設定
+    media_store_enabled: bool = Field(
+        default=False,
+        description="是否啟用媒體託管 (/api/v1/media)，發送圖片時可直接傳入內容或路徑"
+    )
+
+    media_store_dir: str = Field(
+        default=".cache/hosted",
+        description="託管圖片與預覽圖的儲存目錄"
+    )
+
+    media_public_base_url: Optional[str] = Field(
+        default=None,
+        description="服務的公開網址 (HTTPS)，None 時使用 ngrok_url"
+    )
+
+    media_preview_max_dimension: int = Field(
+        default=240,
+        description="預覽圖最長邊 (像素)"
+    )
+
+    media_preview_workers: int = Field(
+        default=2,
+        description="產生預覽圖的行程數"
+    )
+
+    # 發送佇列設定
+    outbound_workers: int = Field(
+        default=8,
+        description="每個端點類別 (push、reply、multicast) 的發送 worker 數量"
+    )
+
+    outbound_queue_size: int = Field(
+        default=10000,
+        description="每個端點類別的發送佇列容量"
+    )
+
+    outbound_push_rate: float = Field(
+        default=2000,
+        description="push 端點每秒請求上限"
+    )
+
+    outbound_reply_rate: float = Field(
+        default=2000,
+        description="reply 端點每秒請求上限"
+    )
+
+    outbound_multicast_rate: float = Field(
+        default=200,
+        description="multicast 端點每秒請求上限"
+    )
+
+    outbound_max_retries: int = Field(
+        default=3,
+        description="發送失敗最多重試次數"
+    )
+
+    outbound_retry_base_delay: float = Field(
+        default=0.5,
+        description="重試指數退避的基礎延遲 (秒)"
+    )
+
+    outbound_retry_max_delay: float = Field(
+        default=30.0,
+        description="重試延遲上限 (秒)"
+    )
+
+    bulk_send_concurrency: int = Field(
+        default=10,
+        description="批次發送時同時進行的 LINE API 呼叫上限"
+    )
+
+    # 使用者資料快取設定
+    profile_cache_enabled: bool = Field(
+        default=True,
+        description="是否啟用使用者資料快取"
+    )
+
+    profile_cache_max_size: int = Field(
+        default=10000,
+        description="最多快取的使用者數"
+    )
+
+    profile_cache_ttl_seconds: int = Field(
+        default=3600,
+        description="使用者資料快取存活時間 (秒)"
+    )
+
+    profile_cache_negative_ttl_seconds: int = Field(
+        default=300,
+        description="查無使用者結果的快取存活時間 (秒)"
+    )
+
+    # Webhook 去重設定
+    webhook_dedup_enabled: bool = Field(
+        default=True,
+        description="是否丟棄重複的 webhook 事件"
+    )
+
+    webhook_dedup_window_seconds: int = Field(
+        default=600,
+        description="記錄已處理事件 ID 的時間窗 (秒)"
+    )
+
+    webhook_dedup_max_entries: int = Field(
+        default=100000,
+        description="最多記錄的事件 ID 數"
+    )
+
+    # Webhook 預寫日誌設定
+    webhook_spool_enabled: bool = Field(
+        default=False,
+        description="是否先將 webhook 寫入本機 spool 再回應，由背景消費端處理"
+    )
+
+    webhook_spool_dir: str = Field(
+        default=".cache/spool",
+        description="webhook spool 分段檔目錄 (單一寫入者，每個 worker 行程需使用不同目錄)"
+    )
+
+    webhook_spool_segment_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        description="單一 spool 分段檔大小上限 (bytes)"
+    )
+
+    webhook_spool_commit_interval: float = Field(
+        default=0.0,
+        description="群組提交前額外等待的時間 (秒)，提高每次 fsync 合併的請求數"
+    )
+
+    # 訊息模型設定
+    message_lean_mode: bool = Field(
+        default=False,
+        description="以 model_construct 略過驗證建立領域模型 (payload 已通過簽章驗證)"
+    )
+
+    message_retain_raw_data: bool = Field(
+        default=True,
+        description="是否在領域模型保留原始事件資料 (raw_data)"
+    )
+
+    # 事件執行器設定
+    event_workers: int = Field(
+        default=16,
+        description="事件處理 worker (對話分片) 數量"
+    )
+
+    event_queue_size: int = Field(
+        default=1000,
+        description="每個分片的事件佇列容量"
+    )
+
+    # 回覆期限設定
+    reply_token_ttl_seconds: float = Field(
+        default=50.0,
+        description="reply token 視為有效的秒數 (由事件時間起算，保留安全餘裕)"
+    )
+
+    handler_timeout_seconds: float = Field(
+        default=20.0,
+        description="訊息處理器的執行時間上限 (秒)"
+    )
+
+    reply_fallback_policy: Literal["push", "drop"] = Field(
+        default="push",
+        description="錯過回覆期限時的處理方式：push 改以 push 發送，drop 捨棄"
+    )
+
     # 伺服器設定
     host: str = Field(
         default="0.0.0.0", 
@@ -38,6 +413,47 @@ class Settings(BaseSettings):
         default=True, 
         description="偵錯模式"
     )
+
+    server_workers: int = Field(
+        default=1,
+        ge=1,
+        description="伺服器 worker 行程數 (大於 1 時停用自動重新載入)"
+    )
+
+    server_loop: Literal["auto", "asyncio", "uvloop"] = Field(
+        default="auto",
+        description="事件迴圈實作，auto 在已安裝 uvloop 時使用 uvloop"
+    )
+
+    server_http: Literal["auto", "h11", "httptools"] = Field(
+        default="auto",
+        description="HTTP 解析器實作，auto 在已安裝 httptools 時使用 httptools"
+    )
+
+    server_backlog: int = Field(
+        default=2048,
+        description="等待 accept 的連線佇列長度"
+    )
+
+    server_keepalive_timeout: int = Field(
+        default=75,
+        description="keep-alive 連線閒置逾時 (秒)，應大於前端負載平衡器的閒置逾時"
+    )
+
+    server_limit_concurrency: Optional[int] = Field(
+        default=None,
+        description="每個 worker 同時處理的連線與請求上限，超過時回應 503 (None 表示不限制)"
+    )
+
+    server_graceful_shutdown_seconds: int = Field(
+        default=30,
+        description="關閉時等待進行中請求完成的時間上限 (秒)"
+    )
+
+    shutdown_drain_timeout_seconds: float = Field(
+        default=25.0,
+        description="關閉時清空事件佇列與發送佇列的時間上限 (秒)，應小於部署平台的終止寬限期"
+    )
     
     # ngrok 設定 (開發用)
     ngrok_url: Optional[str] = Field(
@@ -50,6 +466,28 @@ class Settings(BaseSettings):
         default="INFO", 
         description="日誌等級"
     )
+
+    log_format: Literal["text", "json"] = Field(
+        default="text",
+        description="日誌格式：text 或 json (結構化輸出)"
+    )
+
+    log_enqueue: bool = Field(
+        default=False,
+        description="是否經由佇列在背景執行緒寫出日誌，避免阻塞事件迴圈"
+    )
+
+    log_sample_rates: Dict[str, float] = Field(
+        default_factory=dict,
+        description="各類別 INFO 以下日誌的取樣比例，例如 {\"webhook\": 0.01}；WARNING 以上一律記錄"
+    )
+
+    log_default_sample_rate: float = Field(
+        default=1.0,
+        ge=0.0,
+        le=1.0,
+        description="未指定類別的日誌取樣比例"
+    )
     
     class Config:
         """設定"""
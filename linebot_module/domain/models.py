@@ -7,7 +7,7 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
 from enum import Enum
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List, Union
 from pydantic import BaseModel, Field
 
 
@@ -20,6 +20,17 @@ class MessageType(str, Enum):
     FILE = "file"          # 檔案訊息
     LOCATION = "location"  # 位置訊息
     STICKER = "sticker"    # 貼圖訊息
+    FLEX = "flex"          # Flex 訊息 (僅用於發送)
+
+
+class UserState(BaseModel):
+    """使用者對話狀態模型"""
+    
+    channel_id: str = Field(default="default", description="channel ID")
+    user_id: str = Field(..., description="使用者 ID")
+    status: Optional[str] = Field(default=None, description="對話狀態")
+    data: Dict[str, Any] = Field(default_factory=dict, description="對話資料 (可序列化為 JSON)")
+    updated_at: Optional[datetime] = Field(default=None, description="最後更新時間")
 
 
 class BaseMessage(BaseModel, ABC):
@@ -27,9 +38,16 @@ class BaseMessage(BaseModel, ABC):
     
     message_id: str = Field(..., description="訊息唯一識別碼")
     user_id: str = Field(..., description="使用者 ID")
+    conversation_id: str = Field(
+        default="", description="對話 ID (群組 ID、聊天室 ID 或使用者 ID)，push 回應的對象"
+    )
     timestamp: datetime = Field(default_factory=datetime.now, description="訊息時間戳記")
+    received_at: Optional[datetime] = Field(default=None, description="webhook 接收時間")
     message_type: MessageType = Field(..., description="訊息類型")
     raw_data: Optional[Dict[str, Any]] = Field(default=None, description="原始訊息資料")
+    user_state: Optional[UserState] = Field(
+        default=None, description="使用者對話狀態 (啟用狀態儲存時由路由器載入)"
+    )
     
     class Config:
         """Pydantic 設定"""
@@ -85,6 +103,17 @@ class VideoMessage(BaseMessage):
         return f"VideoMessage(user_id={self.user_id}, duration={self.duration}ms)"
 
 
+class FileMessage(BaseMessage):
+    """檔案訊息模型"""
+    
+    message_type: MessageType = Field(default=MessageType.FILE, description="訊息類型")
+    file_name: Optional[str] = Field(default=None, description="檔案名稱")
+    file_size: Optional[int] = Field(default=None, ge=0, description="檔案大小 (bytes)")
+    
+    def __str__(self) -> str:
+        return f"FileMessage(user_id={self.user_id}, file_name='{self.file_name}')"
+
+
 class LocationMessage(BaseMessage):
     """位置訊息模型 (預留擴展)"""
     
@@ -109,6 +138,55 @@ class StickerMessage(BaseMessage):
         return f"StickerMessage(user_id={self.user_id}, package_id={self.package_id}, sticker_id={self.sticker_id})"
 
 
+class OutboundMessage(BaseModel):
+    """發送訊息基底類別
+    
+    訊息處理器可回傳此類別的子類別 (或其列表) 作為回應內容
+    """
+    
+    message_type: MessageType = Field(..., description="訊息類型")
+    quick_reply: Optional[Dict[str, Any]] = Field(default=None, description="快速回覆選項")
+    
+    class Config:
+        """Pydantic 設定"""
+        use_enum_values = True
+
+
+class OutboundTextMessage(OutboundMessage):
+    """發送文字訊息模型"""
+    
+    message_type: MessageType = Field(default=MessageType.TEXT, description="訊息類型")
+    text: str = Field(..., min_length=1, max_length=5000, description="訊息文字內容")
+
+
+class OutboundImageMessage(OutboundMessage):
+    """發送圖片訊息模型"""
+    
+    message_type: MessageType = Field(default=MessageType.IMAGE, description="訊息類型")
+    original_content_url: str = Field(..., description="原始圖片網址 (HTTPS)")
+    preview_image_url: str = Field(..., description="預覽圖片網址 (HTTPS)")
+
+
+class OutboundStickerMessage(OutboundMessage):
+    """發送貼圖訊息模型"""
+    
+    message_type: MessageType = Field(default=MessageType.STICKER, description="訊息類型")
+    package_id: str = Field(..., description="貼圖包 ID")
+    sticker_id: str = Field(..., description="貼圖 ID")
+
+
+class OutboundFlexMessage(OutboundMessage):
+    """發送 Flex 訊息模型"""
+    
+    message_type: MessageType = Field(default=MessageType.FLEX, description="訊息類型")
+    alt_text: str = Field(..., min_length=1, max_length=400, description="替代文字")
+    contents: Dict[str, Any] = Field(..., description="Flex 容器 (bubble 或 carousel)")
+
+
+# 訊息處理器的回應內容：文字、單一發送訊息或多則訊息列表
+HandlerResponse = Union[str, OutboundMessage, List[Union[str, OutboundMessage]]]
+
+
 class User(BaseModel):
     """使用者模型"""
     
@@ -127,7 +205,9 @@ class SendMessageRequest(BaseModel):
     
     user_id: str = Field(..., description="目標使用者 ID")
     message_type: MessageType = Field(..., description="訊息類型")
-    content: str = Field(..., description="訊息內容")
+    content: str = Field(default="", description="訊息內容 (文字訊息)")
+    template: Optional[str] = Field(default=None, description="Flex 範本名稱 (Flex 訊息)")
+    params: Optional[Dict[str, Any]] = Field(default=None, description="Flex 範本參數")
     quick_reply: Optional[Dict[str, Any]] = Field(default=None, description="快速回覆選項")
     
     class Config:
@@ -147,4 +227,49 @@ class SendMessageResponse(BaseModel):
         """Pydantic 設定"""
         json_encoders = {
             datetime: lambda v: v.isoformat()
-        }
\ No newline at end of file
+        }
+
+
+class RecipientSendResult(BaseModel):
+    """單一收件者的發送結果"""
+    
+    user_id: str = Field(..., description="目標使用者 ID")
+    success: bool = Field(..., description="發送是否成功")
+    error_message: Optional[str] = Field(default=None, description="錯誤訊息")
+
+
+class BulkSendMessageRequest(BaseModel):
+    """批次發送訊息請求模型"""
+    
+    messages: List[SendMessageRequest] = Field(..., min_length=1, description="發送項目列表")
+
+
+class BulkSendMessageResponse(BaseModel):
+    """批次發送訊息回應模型"""
+    
+    success: bool = Field(..., description="是否全部發送成功")
+    results: List[RecipientSendResult] = Field(default_factory=list, description="各收件者發送結果")
+    api_calls: int = Field(default=0, description="實際呼叫 LINE API 的次數")
+    timestamp: datetime = Field(default_factory=datetime.now, description="回應時間戳記")
+    
+    class Config:
+        """Pydantic 設定"""
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
+
+
+class ProfilePrefetchRequest(BaseModel):
+    """預先載入使用者資料請求模型"""
+    
+    user_ids: List[str] = Field(..., min_length=1, description="使用者 ID 列表")
+
+
+class MediaUploadResponse(BaseModel):
+    """媒體上傳回應模型"""
+    
+    digest: str = Field(..., description="內容雜湊 (SHA-256)")
+    original_content_url: str = Field(..., description="原始圖片網址")
+    preview_image_url: str = Field(..., description="預覽圖片網址")
+    content_type: str = Field(..., description="內容類型")
+    size: int = Field(..., description="原始圖片大小 (bytes)")
@@ -0,0 +1,316 @@
+"""Flex 訊息範本
+
+Flex JSON 範本只在載入時驗證一次，並編譯為渲染計畫：
+不含參數的子樹為靜態片段，渲染時直接共用 (不複製、不重新驗證)；
+只有包含 {{ 參數 }} 的節點會在渲染時重新建立。
+
+參數語法：
+- 整個字串為 "{{ name }}" 時以參數值原樣取代 (可為數字、物件或列表)
+- 字串中的 "{{ name }}" 以 str(參數值) 內插
+
+範本檔案格式：
+    {"altText": "訂單 {{ order_id }}", "contents": {"type": "bubble", ...}}
+
+渲染結果中的靜態子樹為範本共用的物件，呼叫端不可修改。
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Set
+
+from linebot.models import QuickReply, SendMessage
+from loguru import logger
+
+from linebot_module.domain.models import OutboundFlexMessage
+
+
+# 渲染函式：由參數產生節點內容
+Renderer = Callable[[Mapping[str, Any]], Any]
+
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+# LINE Flex 訊息限制
+MAX_ALT_TEXT_LENGTH = 400
+MAX_CAROUSEL_BUBBLES = 12
+MAX_CONTENTS_BYTES = 50 * 1024
+
+CONTAINER_TYPES = {"bubble", "carousel"}
+COMPONENT_TYPES = {
+    "box", "button", "image", "video", "icon", "text", "span", "separator", "filler", "spacer",
+}
+ACTION_TYPES = {
+    "postback", "message", "uri", "datetimepicker", "camera", "cameraRoll", "location",
+    "richmenuswitch", "clipboard",
+}
+OTHER_TYPES = {"linearGradient"}
+
+# 各元件必要的欄位
+REQUIRED_FIELDS = {
+    "box": ("layout", "contents"),
+    "button": ("action",),
+    "image": ("url",),
+    "icon": ("url",),
+    "video": ("url", "previewUrl", "altContent"),
+    "span": ("text",),
+}
+
+
+class FlexTemplateError(Exception):
+    """Flex 範本格式錯誤、找不到範本或缺少渲染參數"""
+
+
+class PrebuiltFlexSendMessage(SendMessage):
+    """內容已是 JSON 字典的 Flex 訊息
+
+    LINE SDK 的 FlexSendMessage 會將內容轉換為 SDK 物件，
+    送出時再轉回字典；已渲染的範本內容直接送出即可。
+    """
+
+    def __init__(
+        self,
+        alt_text: str,
+        contents: Dict[str, Any],
+        quick_reply: Optional[QuickReply] = None,
+        **kwargs
+    ):
+        super().__init__(quick_reply=quick_reply, **kwargs)
+        self.type = "flex"
+        self.alt_text = alt_text
+        self.contents = contents
+
+
+def _compile(node: Any, parameters: Set[str]) -> Optional[Renderer]:
+    """編譯節點，不含參數的節點回傳 None (靜態片段)
+
+    Args:
+        node: JSON 節點
+        parameters: 收集節點中出現的參數名稱
+
+    Returns:
+        Optional[Renderer]: 節點的渲染函式
+    """
+    if isinstance(node, str):
+        parts = PLACEHOLDER.split(node)
+        if len(parts) == 1:
+            return None
+        names = parts[1::2]
+        parameters.update(names)
+        if len(parts) == 3 and not parts[0] and not parts[2]:
+            name = names[0]
+            return lambda params: params[name]
+        literals = parts[0::2]
+
+        def render_string(params: Mapping[str, Any]) -> str:
+            pieces = [literals[0]]
+            for name, literal in zip(names, literals[1:]):
+                pieces.append(str(params[name]))
+                pieces.append(literal)
+            return "".join(pieces)
+        return render_string
+
+    if isinstance(node, dict):
+        dynamic = []
+        for key, value in node.items():
+            renderer = _compile(value, parameters)
+            if renderer is not None:
+                dynamic.append((key, renderer))
+        if not dynamic:
+            return None
+        dynamic_keys = {key for key, _ in dynamic}
+        static = {key: value for key, value in node.items() if key not in dynamic_keys}
+
+        def render_dict(params: Mapping[str, Any]) -> Dict[str, Any]:
+            result = static.copy()
+            for key, renderer in dynamic:
+                result[key] = renderer(params)
+            return result
+        return render_dict
+
+    if isinstance(node, list):
+        items = [(value, _compile(value, parameters)) for value in node]
+        if all(renderer is None for _, renderer in items):
+            return None
+
+        def render_list(params: Mapping[str, Any]) -> List[Any]:
+            return [value if renderer is None else renderer(params) for value, renderer in items]
+        return render_list
+
+    return None
+
+
+def _validate(node: Any, path: str = "contents") -> None:
+    """檢查元件類型與必要欄位 (含參數的欄位視為已提供)
+
+    Raises:
+        FlexTemplateError: 格式不符合 Flex 訊息規格
+    """
+    if isinstance(node, list):
+        for i, item in enumerate(node):
+            _validate(item, f"{path}[{i}]")
+        return
+    if not isinstance(node, dict):
+        return
+
+    node_type = node.get("type")
+    if isinstance(node_type, str) and not PLACEHOLDER.search(node_type):
+        if node_type not in CONTAINER_TYPES | COMPONENT_TYPES | ACTION_TYPES | OTHER_TYPES:
+            raise FlexTemplateError(f"{path}: 不支援的類型 {node_type}")
+        missing = [name for name in REQUIRED_FIELDS.get(node_type, ()) if name not in node]
+        if node_type == "text" and "text" not in node and "contents" not in node:
+            missing.append("text")
+        if missing:
+            raise FlexTemplateError(f"{path}: {node_type} 缺少欄位 {', '.join(missing)}")
+        if node_type == "carousel":
+            bubbles = node.get("contents")
+            if isinstance(bubbles, list) and len(bubbles) > MAX_CAROUSEL_BUBBLES:
+                raise FlexTemplateError(f"{path}: carousel 最多 {MAX_CAROUSEL_BUBBLES} 個 bubble")
+
+    for key, value in node.items():
+        _validate(value, f"{path}.{key}")
+
+
+class FlexTemplate:
+    """已驗證並編譯的 Flex 訊息範本"""
+
+    def __init__(self, name: str, alt_text: str, contents: Dict[str, Any]):
+        """驗證並編譯範本
+
+        Args:
+            name: 範本名稱
+            alt_text: 替代文字範本 (通知與不支援 Flex 的裝置顯示)
+            contents: Flex 容器 (bubble 或 carousel)
+
+        Raises:
+            FlexTemplateError: 範本格式錯誤
+        """
+        if not isinstance(contents, dict) or contents.get("type") not in CONTAINER_TYPES:
+            raise FlexTemplateError(f"範本 {name} 的 contents 必須是 bubble 或 carousel")
+        if not alt_text or len(PLACEHOLDER.sub("", alt_text)) > MAX_ALT_TEXT_LENGTH:
+            raise FlexTemplateError(f"範本 {name} 的 altText 必須為 1 到 {MAX_ALT_TEXT_LENGTH} 字")
+        try:
+            _validate(contents)
+        except FlexTemplateError as e:
+            raise FlexTemplateError(f"範本 {name}: {e}") from None
+        size = len(json.dumps(contents, ensure_ascii=False).encode("utf-8"))
+        if size > MAX_CONTENTS_BYTES:
+            raise FlexTemplateError(f"範本 {name} 超過 {MAX_CONTENTS_BYTES} bytes")
+
+        parameters: Set[str] = set()
+        self.name = name
+        self.alt_text = alt_text
+        self.contents = contents
+        self._render_contents = _compile(contents, parameters)
+        self._render_alt_text = _compile(alt_text, parameters)
+        self.parameters: FrozenSet[str] = frozenset(parameters)
+
+    @classmethod
+    def from_file(cls, path: str) -> "FlexTemplate":
+        """由 JSON 檔案載入範本，名稱為檔名 (不含副檔名)
+
+        Raises:
+            FlexTemplateError: 檔案無法解析或格式錯誤
+        """
+        file = Path(path)
+        try:
+            data = json.loads(file.read_text(encoding="utf-8"))
+            return cls(file.stem, data["altText"], data["contents"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise FlexTemplateError(f"無法載入範本 {file}: {e}") from e
+
+    def _check(self, params: Mapping[str, Any]) -> None:
+        missing = self.parameters - params.keys()
+        if missing:
+            raise FlexTemplateError(f"範本 {self.name} 缺少參數: {', '.join(sorted(missing))}")
+
+    def render(self, params: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+        """渲染 Flex 容器
+
+        Args:
+            params: 參數值
+
+        Returns:
+            Dict[str, Any]: Flex 容器內容 (靜態子樹與範本共用，不可修改)
+
+        Raises:
+            FlexTemplateError: 缺少參數
+        """
+        params = params or {}
+        self._check(params)
+        if self._render_contents is None:
+            return self.contents
+        return self._render_contents(params)
+
+    def message(
+        self,
+        params: Optional[Mapping[str, Any]] = None,
+        quick_reply: Optional[Dict[str, Any]] = None
+    ) -> OutboundFlexMessage:
+        """渲染為可由訊息處理器回傳或發送的 Flex 訊息
+
+        Args:
+            params: 參數值
+            quick_reply: 快速回覆選項
+
+        Returns:
+            OutboundFlexMessage: 不經 pydantic 驗證建立的發送訊息
+
+        Raises:
+            FlexTemplateError: 缺少參數
+        """
+        params = params or {}
+        contents = self.render(params)
+        alt_text = self.alt_text if self._render_alt_text is None else self._render_alt_text(params)
+        return OutboundFlexMessage.model_construct(
+            alt_text=alt_text,
+            contents=contents,
+            quick_reply=quick_reply
+        )
+
+
+class FlexTemplateRegistry:
+    """依名稱取得 Flex 範本"""
+
+    def __init__(self):
+        self._templates: Dict[str, FlexTemplate] = {}
+
+    @classmethod
+    def from_directory(cls, directory: str) -> "FlexTemplateRegistry":
+        """載入目錄中所有 *.json 範本
+
+        Raises:
+            FlexTemplateError: 任一範本格式錯誤 (啟動時即失敗)
+        """
+        registry = cls()
+        for path in sorted(Path(directory).glob("*.json")):
+            registry.register(FlexTemplate.from_file(str(path)))
+        logger.info(f"🧩 已載入 {len(registry)} 個 Flex 範本: {directory}")
+        return registry
+
+    def register(self, template: FlexTemplate) -> None:
+        """登錄範本 (同名範本會被取代)"""
+        self._templates[template.name] = template
+
+    def get(self, name: str) -> FlexTemplate:
+        """依名稱取得範本
+
+        Raises:
+            FlexTemplateError: 找不到範本
+        """
+        template = self._templates.get(name)
+        if template is None:
+            raise FlexTemplateError(f"找不到 Flex 範本: {name}")
+        return template
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得各範本的參數列表"""
+        return {
+            name: sorted(template.parameters)
+            for name, template in sorted(self._templates.items())
+        }
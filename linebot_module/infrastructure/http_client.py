@@ -0,0 +1,202 @@
+"""非同步 HTTP 客戶端實作
+
+以 httpx.AsyncClient 實作 LINE SDK 的 AsyncHttpClient 介面，
+提供連線池、keep-alive 與 HTTP/2 (若環境支援) 的非阻塞呼叫
+"""
+
+from typing import Any, AsyncIterator, Optional, Tuple, Union
+
+import httpx
+from linebot import AsyncHttpClient, AsyncHttpResponse
+
+from linebot_module.config.settings import settings
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - 視安裝環境而定
+    HTTP2_AVAILABLE = False
+
+
+TimeoutType = Optional[Union[float, Tuple[float, float]]]
+
+
+def _to_httpx_timeout(timeout: TimeoutType) -> Optional[httpx.Timeout]:
+    """將 LINE SDK 的逾時格式轉換為 httpx.Timeout
+
+    Args:
+        timeout: 單一秒數，或 (連線逾時, 讀取逾時) 的 tuple
+
+    Returns:
+        Optional[httpx.Timeout]: httpx 逾時設定，None 表示使用客戶端預設值
+    """
+    if timeout is None:
+        return None
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+def create_async_client(
+    max_connections: Optional[int] = None,
+    max_keepalive_connections: Optional[int] = None,
+    keepalive_expiry: Optional[float] = None,
+    timeout: Optional[float] = None,
+    connect_timeout: Optional[float] = None,
+    http2: Optional[bool] = None
+) -> httpx.AsyncClient:
+    """建立共用連線池的 httpx.AsyncClient
+
+    未指定的參數以 settings 中的設定值為準。
+
+    Returns:
+        httpx.AsyncClient: 已設定連線池與逾時的客戶端
+    """
+    def _pick(value, default):
+        return default if value is None else value
+
+    limits = httpx.Limits(
+        max_connections=_pick(max_connections, settings.line_api_max_connections),
+        max_keepalive_connections=_pick(
+            max_keepalive_connections, settings.line_api_max_keepalive_connections
+        ),
+        keepalive_expiry=_pick(keepalive_expiry, settings.line_api_keepalive_expiry)
+    )
+    client_timeout = httpx.Timeout(
+        _pick(timeout, settings.line_api_timeout),
+        connect=_pick(connect_timeout, settings.line_api_connect_timeout)
+    )
+    use_http2 = _pick(http2, settings.line_api_http2)
+
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=client_timeout,
+        http2=use_http2 and HTTP2_AVAILABLE
+    )
+
+
+class HttpxAsyncHttpClient(AsyncHttpClient):
+    """以 httpx 實作的 LINE SDK 非同步 HTTP 客戶端"""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        """初始化 HTTP 客戶端
+
+        Args:
+            client: 外部提供的 httpx.AsyncClient，None 時自行建立
+        """
+        super().__init__(timeout=None)
+        self.client = client or create_async_client()
+
+    async def get(self, url, headers=None, params=None, timeout=None):
+        """GET 請求"""
+        response = await self.client.get(
+            url, headers=headers, params=params, **self._timeout_kwargs(timeout)
+        )
+        return HttpxAsyncHttpResponse(response)
+
+    async def post(self, url, headers=None, data=None, timeout=None):
+        """POST 請求"""
+        response = await self.client.post(
+            url, headers=headers, **self._body_kwargs(data), **self._timeout_kwargs(timeout)
+        )
+        return HttpxAsyncHttpResponse(response)
+
+    async def delete(self, url, headers=None, data=None, timeout=None):
+        """DELETE 請求"""
+        response = await self.client.request(
+            "DELETE", url, headers=headers,
+            **self._body_kwargs(data), **self._timeout_kwargs(timeout)
+        )
+        return HttpxAsyncHttpResponse(response)
+
+    async def put(self, url, headers=None, data=None, timeout=None):
+        """PUT 請求"""
+        response = await self.client.put(
+            url, headers=headers, **self._body_kwargs(data), **self._timeout_kwargs(timeout)
+        )
+        return HttpxAsyncHttpResponse(response)
+
+    async def stream(self, method, url, headers=None, params=None, timeout=None):
+        """以串流模式送出請求，回應內容不預先讀入記憶體
+
+        呼叫端負責讀完內容或呼叫 HttpxAsyncHttpResponse.aclose() 釋放連線。
+
+        Returns:
+            HttpxAsyncHttpResponse: 尚未讀取內容的回應
+        """
+        request = self.client.build_request(
+            method, url, headers=headers, params=params, **self._timeout_kwargs(timeout)
+        )
+        response = await self.client.send(request, stream=True)
+        return HttpxAsyncHttpResponse(response)
+
+    async def aclose(self) -> None:
+        """關閉底層連線池"""
+        await self.client.aclose()
+
+    @staticmethod
+    def _timeout_kwargs(timeout: TimeoutType) -> dict:
+        """僅在呼叫端指定逾時時覆寫客戶端預設值"""
+        httpx_timeout = _to_httpx_timeout(timeout)
+        return {} if httpx_timeout is None else {"timeout": httpx_timeout}
+
+    @staticmethod
+    def _body_kwargs(data: Any) -> dict:
+        """SDK 傳入的 JSON 字串或二進位內容以 content 送出，字典以表單送出"""
+        if data is None:
+            return {}
+        if isinstance(data, dict):
+            return {"data": data}
+        return {"content": data}
+
+
+class HttpxAsyncHttpResponse(AsyncHttpResponse):
+    """以 httpx.Response 實作的 LINE SDK 非同步 HTTP 回應"""
+
+    def __init__(self, response: httpx.Response):
+        """初始化回應物件
+
+        Args:
+            response: httpx 回應
+        """
+        self.response = response
+
+    @property
+    def status_code(self):
+        """取得狀態碼"""
+        return self.response.status_code
+
+    @property
+    def headers(self):
+        """取得回應標頭"""
+        return self.response.headers
+
+    @property
+    async def text(self):
+        """取得文字內容"""
+        await self.response.aread()
+        return self.response.text
+
+    @property
+    async def content(self):
+        """取得二進位內容"""
+        return await self.response.aread()
+
+    @property
+    async def json(self):
+        """取得 JSON 內容"""
+        await self.response.aread()
+        return self.response.json()
+
+    def iter_content(self, chunk_size=1024) -> AsyncIterator[bytes]:
+        """以非同步迭代器取得內容
+
+        Args:
+            chunk_size: 每個區塊的大小
+        """
+        return self.response.aiter_bytes(chunk_size)
+
+    async def aclose(self) -> None:
+        """釋放串流回應佔用的連線"""
+        await self.response.aclose()
@@ -3,29 +3,259 @@
 實作與 LINE 平台的實際通訊功能
 """
 
+import asyncio
+import json
+import os
+import time
 import aiofiles
-from typing import Optional, Union, BinaryIO
-from linebot import LineBotApi
+from datetime import datetime
+from functools import partial
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Type, Union, BinaryIO
+)
+from linebot import AsyncLineBotApi
 from linebot.models import (
-    TextSendMessage, ImageSendMessage, MessageEvent,
-    TextMessage as LineTextMessage, ImageMessage as LineImageMessage
+    TextSendMessage, ImageSendMessage, StickerSendMessage, SendMessage,
+    MessageEvent, Error, QuickReply
 )
 from linebot.exceptions import LineBotApiError
-from loguru import logger
 
 from linebot_module.config.settings import settings
+from linebot_module.config.logging_config import get_logger
+from linebot_module.infrastructure.http_client import (
+    HttpxAsyncHttpClient, HttpxAsyncHttpResponse
+)
+from linebot_module.infrastructure.media_cache import MediaCache, MediaCacheEntry
+from linebot_module.infrastructure.media_store import MediaSource, MediaStore, MediaStoreError
+from linebot_module.infrastructure.flex_template import (
+    FlexTemplateError, FlexTemplateRegistry, PrebuiltFlexSendMessage
+)
+from linebot_module.infrastructure.profile_cache import ProfileCache
+from linebot_module.infrastructure.token_manager import ChannelTokenManager
+from linebot_module.infrastructure.metrics import line_api_calls, line_api_duration
+from linebot_module.infrastructure.outbound_dispatcher import (
+    EndpointClass, OutboundDeadlineError, OutboundDispatcher, new_retry_key
+)
 from linebot_module.domain.models import (
-    BaseMessage, TextMessage, ImageMessage, SendMessageRequest, 
-    SendMessageResponse, MessageType, User
+    BaseMessage, TextMessage, ImageMessage, AudioMessage, VideoMessage, FileMessage,
+    LocationMessage, StickerMessage, SendMessageRequest, 
+    SendMessageResponse, MessageType, User, RecipientSendResult,
+    OutboundMessage, OutboundTextMessage, OutboundImageMessage, OutboundStickerMessage,
+    OutboundFlexMessage
 )
 
 
+logger = get_logger("line_api")
+
+
+# 未指定 HTTP 客戶端時共用的連線池
+_shared_http_client: Optional[HttpxAsyncHttpClient] = None
+
+
+def get_shared_http_client() -> HttpxAsyncHttpClient:
+    """取得行程內共用的 HTTP 客戶端 (延遲建立)"""
+    global _shared_http_client
+    if _shared_http_client is None:
+        _shared_http_client = HttpxAsyncHttpClient()
+    return _shared_http_client
+
+
+class MessageContentStream:
+    """訊息內容串流
+    
+    包裝尚未讀取內容的 HTTP 回應，以非同步迭代逐塊取得內容，
+    迭代結束或中斷時釋放連線。
+    """
+    
+    def __init__(self, response: HttpxAsyncHttpResponse, chunk_size: int):
+        """初始化內容串流
+        
+        Args:
+            response: 串流模式的 HTTP 回應
+            chunk_size: 每個區塊的大小
+        """
+        self.response = response
+        self.chunk_size = chunk_size
+    
+    @property
+    def content_type(self) -> Optional[str]:
+        """內容類型 (MIME type)"""
+        return self.response.headers.get("content-type")
+    
+    @property
+    def content_length(self) -> Optional[int]:
+        """解碼後的內容大小 (bytes)，LINE 未提供或內容經過壓縮編碼時為 None
+        
+        迭代取得的是解碼後的內容，壓縮編碼時標頭中的大小與實際內容不符。
+        """
+        encoding = self.response.headers.get("content-encoding", "identity")
+        if encoding.strip().lower() != "identity":
+            return None
+        length = self.response.headers.get("content-length")
+        return int(length) if length is not None else None
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self.response.iter_content(self.chunk_size):
+                yield chunk
+        finally:
+            await self.aclose()
+    
+    async def aclose(self) -> None:
+        """釋放連線"""
+        await self.response.aclose()
+
+
 class LineApiService:
     """LINE Bot API 服務類別"""
     
-    def __init__(self):
-        """初始化 LINE Bot API 客戶端"""
-        self.line_bot_api = LineBotApi(settings.line_channel_access_token)
+    # LINE multicast 單次呼叫的收件者上限
+    MULTICAST_MAX_RECIPIENTS = 500
+    
+    # LINE reply / push 單次呼叫的訊息數上限
+    MAX_MESSAGES_PER_CALL = 5
+    
+    def __init__(
+        self,
+        http_client: Optional[HttpxAsyncHttpClient] = None,
+        media_cache: Optional[MediaCache] = None,
+        dispatcher: Optional[OutboundDispatcher] = None,
+        profile_cache: Optional[ProfileCache] = None,
+        access_token: Optional[str] = None,
+        token_manager: Optional[ChannelTokenManager] = None,
+        media_store: Optional[MediaStore] = None,
+        flex_templates: Optional[FlexTemplateRegistry] = None
+    ):
+        """初始化 LINE Bot API 客戶端
+        
+        Args:
+            http_client: 非同步 HTTP 客戶端，None 時使用共用連線池
+            media_cache: 訊息內容磁碟快取，None 時不快取
+            dispatcher: 發送佇列，None 時直接送出請求
+            profile_cache: 使用者資料快取，None 時不快取
+            access_token: Channel Access Token，None 時使用設定值
+            token_manager: access token 管理器，指定時改用其取得並更新的 token
+            media_store: 媒體託管，指定時發送圖片可直接傳入內容或路徑
+            flex_templates: Flex 範本，發送請求可指定範本名稱與參數
+        """
+        self.http_client = http_client or get_shared_http_client()
+        self.media_cache = media_cache
+        self.dispatcher = dispatcher
+        self.profile_cache = profile_cache
+        self.media_store = media_store
+        self.flex_templates = flex_templates
+        self.access_token = (
+            settings.line_channel_access_token if access_token is None else access_token
+        )
+        self.line_bot_api = AsyncLineBotApi(
+            self.access_token,
+            self.http_client,
+            endpoint=settings.line_api_endpoint,
+            data_endpoint=settings.line_api_data_endpoint
+        )
+        self.token_manager = token_manager
+        if token_manager is not None:
+            token_manager.add_listener(self._set_access_token)
+    
+    def _set_access_token(self, token: str) -> None:
+        """更新 token，之後送出的請求立即使用新的 token"""
+        self.access_token = token
+        self.line_bot_api.headers["Authorization"] = f"Bearer {token}"
+    
+    async def warm_up(self, connections: int = 1) -> None:
+        """預先建立連線池中的連線
+        
+        以查詢 bot 資訊的輕量請求完成 TCP/TLS 交握，
+        避免第一批請求承擔連線建立的延遲。失敗時僅記錄警告。
+        
+        Args:
+            connections: 預先建立的連線數
+        """
+        results = await asyncio.gather(
+            *(
+                self._observe("bot_info", self.line_bot_api.get_bot_info())
+                for _ in range(connections)
+            ),
+            return_exceptions=True
+        )
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            logger.warning(f"⚠️ 連線池預熱失敗: {failures[0]}")
+        else:
+            logger.info("🔥 已預熱 {} 條 LINE API 連線", connections)
+    
+    @staticmethod
+    async def _observe(endpoint: str, call: Awaitable[Any]) -> Any:
+        """執行 LINE API 呼叫並記錄延遲與結果
+        
+        Args:
+            endpoint: 端點名稱 (指標標籤)
+            call: LINE API 呼叫
+            
+        Returns:
+            Any: 呼叫的回傳值
+        """
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            return await call
+        except LineBotApiError as e:
+            status = str(e.status_code)
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            line_api_duration.labels(endpoint).observe(time.perf_counter() - started)
+            line_api_calls.labels(endpoint, status).inc()
+    
+    async def _dispatch(
+        self,
+        endpoint_class: EndpointClass,
+        send: Callable[[], Awaitable[Any]],
+        retry_key: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Any:
+        """經由發送佇列送出請求 (未設定佇列時直接送出)
+        
+        Args:
+            endpoint_class: 端點類別，決定套用的限流器
+            send: 實際送出請求的函式
+            retry_key: send 帶的 X-Line-Retry-Key (push 與 multicast)，重試時沿用
+            deadline: 送出期限 (epoch 秒)，超過時不再重試
+            
+        Returns:
+            Any: send 的回傳值
+        """
+        if self.token_manager is not None:
+            send = partial(self._retry_on_unauthorized, send)
+        if self.dispatcher is None or not self.dispatcher.running:
+            return await send()
+        return await self.dispatcher.submit(
+            endpoint_class, send, retry_key=retry_key, deadline=deadline
+        )
+    
+    async def _retry_on_unauthorized(self, send: Callable[[], Awaitable[Any]]) -> Any:
+        """LINE 回應 401 時重新取得 token 後重試一次
+        
+        Args:
+            send: 實際送出請求的函式
+            
+        Returns:
+            Any: send 的回傳值
+        """
+        token = self.access_token
+        try:
+            return await send()
+        except LineBotApiError as e:
+            if e.status_code != 401:
+                raise
+        await self.token_manager.invalidate(token)
+        return await send()
+    
+    async def close(self) -> None:
+        """關閉 HTTP 連線池"""
+        await self.http_client.aclose()
     
     async def send_text_message(self, user_id: str, text: str) -> SendMessageResponse:
         """發送文字訊息
@@ -39,9 +269,16 @@ class LineApiService:
         """
         try:
             message = TextSendMessage(text=text)
-            self.line_bot_api.push_message(user_id, message)
+            retry_key = new_retry_key()
+            await self._dispatch(
+                EndpointClass.PUSH,
+                lambda: self._observe(
+                    "push", self.line_bot_api.push_message(user_id, message, retry_key=retry_key)
+                ),
+                retry_key
+            )
             
-            logger.info(f"✅ 成功發送文字訊息到使用者 {user_id}")
+            logger.info("✅ 成功發送文字訊息到使用者 {}", user_id)
             return SendMessageResponse(
                 success=True,
                 message_id=None  # LINE API 不回傳 message_id
@@ -63,27 +300,55 @@ class LineApiService:
     async def send_image_message(
         self, 
         user_id: str, 
-        original_content_url: str, 
-        preview_image_url: str
+        original_content_url: Optional[str] = None, 
+        preview_image_url: Optional[str] = None,
+        image: Optional[MediaSource] = None
     ) -> SendMessageResponse:
         """發送圖片訊息
         
+        傳入 image 時先交由媒體託管儲存並產生預覽圖，未指定的網址以託管網址補上。
+        
         Args:
             user_id: 目標使用者 ID
             original_content_url: 原始圖片網址
             preview_image_url: 預覽圖片網址
+            image: 圖片內容或檔案路徑 (需要設定媒體託管)
             
         Returns:
             SendMessageResponse: 發送結果
         """
+        if image is not None:
+            if self.media_store is None:
+                return SendMessageResponse(success=False, error_message="未啟用媒體託管")
+            try:
+                asset = await self.media_store.store(image)
+                original_content_url = original_content_url or self.media_store.url_for(
+                    asset.original_name
+                )
+                preview_image_url = preview_image_url or self.media_store.url_for(
+                    asset.preview_name
+                )
+            except (MediaStoreError, OSError) as e:
+                logger.error(f"❌ 託管圖片失敗: {e}")
+                return SendMessageResponse(success=False, error_message=str(e))
+        if not original_content_url or not preview_image_url:
+            return SendMessageResponse(success=False, error_message="需要圖片網址或圖片內容")
+        
         try:
             message = ImageSendMessage(
                 original_content_url=original_content_url,
                 preview_image_url=preview_image_url
             )
-            self.line_bot_api.push_message(user_id, message)
+            retry_key = new_retry_key()
+            await self._dispatch(
+                EndpointClass.PUSH,
+                lambda: self._observe(
+                    "push", self.line_bot_api.push_message(user_id, message, retry_key=retry_key)
+                ),
+                retry_key
+            )
             
-            logger.info(f"✅ 成功發送圖片訊息到使用者 {user_id}")
+            logger.info("✅ 成功發送圖片訊息到使用者 {}", user_id)
             return SendMessageResponse(
                 success=True,
                 message_id=None
@@ -114,9 +379,14 @@ class LineApiService:
         """
         try:
             message = TextSendMessage(text=text)
-            self.line_bot_api.reply_message(reply_token, message)
+            await self._dispatch(
+                EndpointClass.REPLY,
+                lambda: self._observe(
+                    "reply", self.line_bot_api.reply_message(reply_token, message)
+                )
+            )
             
-            logger.info(f"✅ 成功回覆訊息")
+            logger.info("✅ 成功回覆訊息")
             return SendMessageResponse(
                 success=True,
                 message_id=None
@@ -135,9 +405,248 @@ class LineApiService:
                 error_message=f"未知錯誤: {str(e)}"
             )
     
+    async def reply_messages(
+        self,
+        reply_token: str,
+        messages: List[OutboundMessage],
+        deadline: Optional[float] = None
+    ) -> SendMessageResponse:
+        """以單一 reply token 回覆多則訊息 (最多五則)
+        
+        Args:
+            reply_token: 回覆 token
+            messages: 發送訊息列表
+            deadline: reply token 的期限 (epoch 秒)，被限流時不會重試到期限之後
+            
+        Returns:
+            SendMessageResponse: 發送結果
+        """
+        try:
+            send_messages = [MessageConverter.to_line_send_message(m) for m in messages]
+            await self._dispatch(
+                EndpointClass.REPLY,
+                lambda: self._observe(
+                    "reply", self.line_bot_api.reply_message(reply_token, send_messages)
+                ),
+                deadline=deadline
+            )
+            
+            logger.info("✅ 成功回覆 {} 則訊息", len(send_messages))
+            return SendMessageResponse(success=True, message_id=None)
+            
+        except OutboundDeadlineError as e:
+            logger.warning("⚠️ 回覆期限前無法送出: {}", e)
+            return SendMessageResponse(success=False, error_message=str(e))
+        except LineBotApiError as e:
+            logger.error(f"❌ 回覆訊息失敗: {e}")
+            return SendMessageResponse(success=False, error_message=str(e))
+        except Exception as e:
+            logger.error(f"❌ 回覆訊息時發生未知錯誤: {e}")
+            return SendMessageResponse(success=False, error_message=f"未知錯誤: {str(e)}")
+    
+    async def push_messages(
+        self,
+        user_id: str,
+        messages: List[OutboundMessage]
+    ) -> SendMessageResponse:
+        """推播多則訊息給指定使用者 (最多五則)
+        
+        Args:
+            user_id: 目標使用者 ID
+            messages: 發送訊息列表
+            
+        Returns:
+            SendMessageResponse: 發送結果
+        """
+        try:
+            send_messages = [MessageConverter.to_line_send_message(m) for m in messages]
+            retry_key = new_retry_key()
+            await self._dispatch(
+                EndpointClass.PUSH,
+                lambda: self._observe(
+                    "push",
+                    self.line_bot_api.push_message(user_id, send_messages, retry_key=retry_key)
+                ),
+                retry_key
+            )
+            
+            logger.info("✅ 成功推播 {} 則訊息到使用者 {}", len(send_messages), user_id)
+            return SendMessageResponse(success=True, message_id=None)
+            
+        except LineBotApiError as e:
+            logger.error(f"❌ 推播訊息失敗: {e}")
+            return SendMessageResponse(success=False, error_message=str(e))
+        except Exception as e:
+            logger.error(f"❌ 推播訊息時發生未知錯誤: {e}")
+            return SendMessageResponse(success=False, error_message=f"未知錯誤: {str(e)}")
+    
+    async def send_bulk_messages(
+        self,
+        requests: List[SendMessageRequest],
+        concurrency: int = 10
+    ) -> Tuple[List[RecipientSendResult], int]:
+        """批次發送訊息
+        
+        內容相同的訊息合併為 multicast 呼叫 (每次最多 500 位收件者)，
+        各呼叫在並行上限內同時送出。
+        
+        Args:
+            requests: 發送項目列表
+            concurrency: 同時進行的 LINE API 呼叫上限
+            
+        Returns:
+            Tuple[List[RecipientSendResult], int]: 依輸入順序排列的各收件者結果，
+            以及實際呼叫 LINE API 的次數
+        """
+        groups: Dict[str, Tuple[SendMessageRequest, List[str]]] = {}
+        outcomes: Dict[Tuple[str, str], RecipientSendResult] = {}
+        
+        for request in requests:
+            if request.message_type not in (MessageType.TEXT, MessageType.FLEX):
+                outcomes[(request.user_id, self._payload_key(request))] = RecipientSendResult(
+                    user_id=request.user_id,
+                    success=False,
+                    error_message=f"不支援的訊息類型: {request.message_type}"
+                )
+                continue
+            
+            key = self._payload_key(request)
+            _, recipients = groups.setdefault(key, (request, []))
+            if (request.user_id, key) not in outcomes:
+                outcomes[(request.user_id, key)] = None
+                recipients.append(request.user_id)
+        
+        batches = [
+            (key, request, recipients[i:i + self.MULTICAST_MAX_RECIPIENTS])
+            for key, (request, recipients) in groups.items()
+            for i in range(0, len(recipients), self.MULTICAST_MAX_RECIPIENTS)
+        ]
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def send_batch(key: str, request: SendMessageRequest, user_ids: List[str]) -> None:
+            async with semaphore:
+                try:
+                    message = self._build_send_message(request)
+                    retry_key = new_retry_key()
+                    if len(user_ids) == 1:
+                        await self._dispatch(
+                            EndpointClass.PUSH,
+                            lambda: self._observe(
+                                "push",
+                                self.line_bot_api.push_message(
+                                    user_ids[0], message, retry_key=retry_key
+                                )
+                            ),
+                            retry_key
+                        )
+                    else:
+                        await self._dispatch(
+                            EndpointClass.MULTICAST,
+                            lambda: self._observe(
+                                "multicast",
+                                self.line_bot_api.multicast(user_ids, message, retry_key=retry_key)
+                            ),
+                            retry_key
+                        )
+                    error_message = None
+                except FlexTemplateError as e:
+                    error_message = str(e)
+                except LineBotApiError as e:
+                    logger.error(f"❌ 批次發送訊息失敗 ({len(user_ids)} 位收件者): {e}")
+                    error_message = str(e)
+                except Exception as e:
+                    logger.error(f"❌ 批次發送訊息時發生未知錯誤: {e}")
+                    error_message = f"未知錯誤: {str(e)}"
+            
+            for user_id in user_ids:
+                outcomes[(user_id, key)] = RecipientSendResult(
+                    user_id=user_id,
+                    success=error_message is None,
+                    error_message=error_message
+                )
+        
+        await asyncio.gather(*(send_batch(*batch) for batch in batches))
+        
+        logger.info("✅ 批次發送完成: {} 筆請求，{} 次 API 呼叫", len(requests), len(batches))
+        results = [
+            outcomes[(request.user_id, self._payload_key(request))]
+            for request in requests
+        ]
+        return results, len(batches)
+    
+    @staticmethod
+    def _payload_key(request: SendMessageRequest) -> str:
+        """以訊息內容產生分組鍵，內容相同的請求可合併發送"""
+        return json.dumps(
+            [
+                request.message_type, request.content, request.template, request.params,
+                request.quick_reply
+            ],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+    
+    def render_template(self, request: SendMessageRequest) -> OutboundFlexMessage:
+        """以發送請求指定的範本與參數渲染 Flex 訊息
+        
+        Raises:
+            FlexTemplateError: 未載入範本、找不到範本或缺少參數
+        """
+        if self.flex_templates is None or not request.template:
+            raise FlexTemplateError("Flex 訊息需要指定已載入的範本")
+        return self.flex_templates.get(request.template).message(
+            request.params, quick_reply=request.quick_reply
+        )
+    
+    def _build_send_message(self, request: SendMessageRequest) -> SendMessage:
+        """由發送請求建立 LINE 文字或 Flex 訊息
+        
+        Raises:
+            FlexTemplateError: Flex 範本無法渲染
+        """
+        if request.message_type == MessageType.FLEX:
+            return MessageConverter.to_line_send_message(self.render_template(request))
+        quick_reply = None
+        if request.quick_reply:
+            quick_reply = QuickReply.new_from_json_dict(request.quick_reply)
+        return TextSendMessage(text=request.content, quick_reply=quick_reply)
+    
+    async def _load_user_profile(self, user_id: str) -> Optional[User]:
+        """向 LINE 查詢使用者資料
+        
+        Returns:
+            Optional[User]: 使用者物件，查無使用者 (404) 時回傳 None
+            
+        Raises:
+            LineBotApiError: 404 以外的 LINE API 錯誤
+        """
+        def load():
+            return self._observe("profile", self.line_bot_api.get_profile(user_id))
+        
+        try:
+            if self.token_manager is not None:
+                profile = await self._retry_on_unauthorized(load)
+            else:
+                profile = await load()
+        except LineBotApiError as e:
+            if e.status_code == 404:
+                return None
+            raise
+        
+        return User(
+            user_id=user_id,
+            display_name=profile.display_name,
+            picture_url=profile.picture_url,
+            status_message=profile.status_message,
+            language=getattr(profile, 'language', None)
+        )
+    
     async def get_user_profile(self, user_id: str) -> Optional[User]:
         """取得使用者資料
         
+        啟用使用者資料快取時優先由快取回應，並合併同一使用者的並行查詢。
+        
         Args:
             user_id: 使用者 ID
             
@@ -145,15 +654,9 @@ class LineApiService:
             Optional[User]: 使用者物件，失敗時回傳 None
         """
         try:
-            profile = self.line_bot_api.get_profile(user_id)
-            
-            return User(
-                user_id=user_id,
-                display_name=profile.display_name,
-                picture_url=profile.picture_url,
-                status_message=profile.status_message,
-                language=getattr(profile, 'language', None)
-            )
+            if self.profile_cache is not None:
+                return await self.profile_cache.get(user_id, self._load_user_profile)
+            return await self._load_user_profile(user_id)
             
         except LineBotApiError as e:
             logger.error(f"❌ 取得使用者資料失敗: {e}")
@@ -162,9 +665,196 @@ class LineApiService:
             logger.error(f"❌ 取得使用者資料時發生未知錯誤: {e}")
             return None
     
+    async def prefetch_user_profiles(
+        self,
+        user_ids: List[str],
+        concurrency: int = 10
+    ) -> int:
+        """預先載入多位使用者的資料到快取
+        
+        Args:
+            user_ids: 使用者 ID 列表
+            concurrency: 同時進行的查詢上限
+            
+        Returns:
+            int: 實際向 LINE 查詢的使用者數 (已在快取中者略過)
+        """
+        if self.profile_cache is None:
+            return 0
+        
+        pending = [
+            user_id for user_id in dict.fromkeys(user_ids)
+            if not self.profile_cache.peek(user_id)[0]
+        ]
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def load(user_id: str) -> None:
+            async with semaphore:
+                await self.get_user_profile(user_id)
+        
+        await asyncio.gather(*(load(user_id) for user_id in pending))
+        logger.info("✅ 預先載入 {} 位使用者資料", len(pending))
+        return len(pending)
+    
+    def invalidate_user_profile(self, user_id: str) -> None:
+        """移除指定使用者的快取資料 (加入好友、封鎖時呼叫)
+        
+        Args:
+            user_id: 使用者 ID
+        """
+        if self.profile_cache is not None:
+            self.profile_cache.invalidate(user_id)
+    
+    async def open_message_content(
+        self,
+        message_id: str,
+        chunk_size: int = 64 * 1024
+    ) -> MessageContentStream:
+        """開啟訊息內容串流 (主要用於圖片、語音、影片等)
+        
+        Args:
+            message_id: 訊息 ID
+            chunk_size: 每個區塊的大小
+            
+        Returns:
+            MessageContentStream: 尚未讀取內容的串流
+            
+        Raises:
+            LineBotApiError: LINE API 回傳錯誤
+        """
+        url = f"{self.line_bot_api.data_endpoint}/v2/bot/message/{message_id}/content"
+        started = time.perf_counter()
+        try:
+            response = await self.http_client.stream(
+                "GET", url, headers=self.line_bot_api.headers
+            )
+        except Exception:
+            line_api_calls.labels("content", "error").inc()
+            raise
+        finally:
+            line_api_duration.labels("content").observe(time.perf_counter() - started)
+        
+        ok = 200 <= response.status_code < 300
+        line_api_calls.labels("content", "ok" if ok else str(response.status_code)).inc()
+        if not ok:
+            try:
+                raise LineBotApiError(
+                    status_code=response.status_code,
+                    headers=dict(response.headers.items()),
+                    request_id=response.headers.get("X-Line-Request-Id"),
+                    accepted_request_id=response.headers.get("X-Line-Accepted-Request-Id"),
+                    error=await self._error_from_response(response)
+                )
+            finally:
+                await response.aclose()
+        
+        return MessageContentStream(response, chunk_size)
+    
+    @staticmethod
+    async def _error_from_response(response: HttpxAsyncHttpResponse) -> Error:
+        """由錯誤回應建立 LINE API 錯誤內容 (內容不是 JSON 時以狀態碼與文字代替)"""
+        try:
+            return Error.new_from_json_dict(await response.json)
+        except (ValueError, TypeError):
+            text = (await response.text)[:200]
+            return Error(message=f"HTTP {response.status_code}: {text}")
+    
+    async def iter_message_content(
+        self,
+        message_id: str,
+        chunk_size: int = 64 * 1024
+    ) -> AsyncIterator[bytes]:
+        """逐塊取得訊息內容，不將整個檔案載入記憶體
+        
+        Args:
+            message_id: 訊息 ID
+            chunk_size: 每個區塊的大小
+            
+        Yields:
+            bytes: 內容區塊
+            
+        Raises:
+            LineBotApiError: LINE API 回傳錯誤
+        """
+        stream = await self.open_message_content(message_id, chunk_size)
+        async for chunk in stream:
+            yield chunk
+    
+    async def _write_message_content(
+        self,
+        message_id: str,
+        path: Union[str, os.PathLike],
+        chunk_size: int = 64 * 1024
+    ) -> Optional[str]:
+        """將訊息內容串流寫入指定路徑
+        
+        Returns:
+            Optional[str]: 內容類型 (MIME type)
+            
+        Raises:
+            LineBotApiError: LINE API 回傳錯誤
+        """
+        stream = await self.open_message_content(message_id, chunk_size)
+        async with aiofiles.open(path, "wb") as f:
+            async for chunk in stream:
+                await f.write(chunk)
+        return stream.content_type
+    
+    async def save_message_content(
+        self,
+        message_id: str,
+        path: Union[str, os.PathLike],
+        chunk_size: int = 64 * 1024
+    ) -> Optional[int]:
+        """將訊息內容串流寫入檔案
+        
+        先寫入暫存檔，完成後再改名，避免留下不完整的檔案。
+        
+        Args:
+            message_id: 訊息 ID
+            path: 目標檔案路徑
+            chunk_size: 每個區塊的大小
+            
+        Returns:
+            Optional[int]: 寫入的位元組數，失敗時回傳 None
+        """
+        tmp_path = f"{os.fspath(path)}.part"
+        try:
+            await self._write_message_content(message_id, tmp_path, chunk_size)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+            
+            logger.info("✅ 成功儲存訊息內容到 {}，大小: {} bytes", path, size)
+            return size
+            
+        except LineBotApiError as e:
+            logger.error(f"❌ 取得訊息內容失敗: {e}")
+        except Exception as e:
+            logger.error(f"❌ 儲存訊息內容時發生未知錯誤: {e}")
+        
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    
+    async def fetch_cached_content(self, message_id: str) -> Optional[MediaCacheEntry]:
+        """透過磁碟快取取得訊息內容
+        
+        Args:
+            message_id: 訊息 ID
+            
+        Returns:
+            Optional[MediaCacheEntry]: 快取項目，未啟用快取或下載失敗時回傳 None
+        """
+        if self.media_cache is None:
+            return None
+        return await self.media_cache.fetch(message_id, self._write_message_content)
+    
     async def get_message_content(self, message_id: str) -> Optional[bytes]:
         """取得訊息內容 (主要用於圖片、語音等)
         
+        啟用磁碟快取時，重複取得同一則訊息內容不會再向 LINE 下載。
+        大型檔案請改用 iter_message_content 或 save_message_content。
+        
         Args:
             message_id: 訊息 ID
             
@@ -172,14 +862,14 @@ class LineApiService:
             Optional[bytes]: 訊息內容的二進位資料，失敗時回傳 None
         """
         try:
-            message_content = self.line_bot_api.get_message_content(message_id)
+            if self.media_cache is not None:
+                entry = await self.fetch_cached_content(message_id)
+                return entry.read_bytes() if entry else None
             
-            # 讀取所有內容到記憶體中
-            content = b''
-            for chunk in message_content.iter_content():
-                content += chunk
+            chunks = [chunk async for chunk in self.iter_message_content(message_id)]
+            content = b''.join(chunks)
             
-            logger.info(f"✅ 成功取得訊息內容，大小: {len(content)} bytes")
+            logger.info("✅ 成功取得訊息內容，大小: {} bytes", len(content))
             return content
             
         except LineBotApiError as e:
@@ -190,45 +880,241 @@ class LineApiService:
             return None
 
 
+# 欄位擷取函式：由 webhook 的 message 物件取出領域模型專屬欄位
+FieldExtractor = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def _content_provider(message: Dict[str, Any]) -> Dict[str, Any]:
+    """取得媒體訊息的內容提供者資訊"""
+    return message.get("contentProvider") or {}
+
+
+def _text_fields(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {"text": message["text"]}
+
+
+def _image_fields(message: Dict[str, Any]) -> Dict[str, Any]:
+    content_provider = _content_provider(message)
+    return {
+        "image_url": content_provider.get("originalContentUrl"),
+        "preview_url": content_provider.get("previewImageUrl"),
+        "content_type": content_provider.get("type"),
+    }
+
+
+def _audio_fields(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "audio_url": _content_provider(message).get("originalContentUrl"),
+        "duration": message.get("duration"),
+    }
+
+
+def _video_fields(message: Dict[str, Any]) -> Dict[str, Any]:
+    content_provider = _content_provider(message)
+    return {
+        "video_url": content_provider.get("originalContentUrl"),
+        "preview_url": content_provider.get("previewImageUrl"),
+        "duration": message.get("duration"),
+    }
+
+
+def _file_fields(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "file_name": message.get("fileName"),
+        "file_size": message.get("fileSize"),
+    }
+
+
+def _location_fields(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": message.get("title"),
+        "address": message.get("address"),
+        "latitude": message.get("latitude"),
+        "longitude": message.get("longitude"),
+    }
+
+
+def _sticker_fields(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "package_id": message.get("packageId"),
+        "sticker_id": message.get("stickerId"),
+    }
+
+
+# 精簡模式建立模型時使用的各模型欄位預設值
+_MODEL_DEFAULTS: Dict[Type[BaseMessage], Dict[str, Any]] = {}
+
+
 class MessageConverter:
-    """訊息轉換器 - 將 LINE SDK 訊息轉換為領域模型"""
+    """訊息轉換器 - 將 LINE 訊息事件轉換為領域模型
+    
+    以訊息類型為鍵的登錄表決定領域模型與欄位擷取方式，
+    可透過 register 為新的訊息類型註冊轉換方式。
+    
+    精簡模式 (lean_mode) 下不經 pydantic 驗證直接建立模型 (同 model_construct)，
+    raw_data 直接參照解析後的事件字典而不複製；retain_raw_data 為 False 時不保留。
+    """
+    
+    lean_mode: bool = settings.message_lean_mode
+    retain_raw_data: bool = settings.message_retain_raw_data
+    
+    _registry: Dict[str, Tuple[Type[BaseMessage], FieldExtractor]] = {
+        MessageType.TEXT.value: (TextMessage, _text_fields),
+        MessageType.IMAGE.value: (ImageMessage, _image_fields),
+        MessageType.AUDIO.value: (AudioMessage, _audio_fields),
+        MessageType.VIDEO.value: (VideoMessage, _video_fields),
+        MessageType.FILE.value: (FileMessage, _file_fields),
+        MessageType.LOCATION.value: (LocationMessage, _location_fields),
+        MessageType.STICKER.value: (StickerMessage, _sticker_fields),
+    }
+    
+    @classmethod
+    def register(
+        cls,
+        message_type: str,
+        model: Type[BaseMessage],
+        extractor: FieldExtractor
+    ) -> None:
+        """註冊訊息類型的轉換方式 (可覆寫既有類型)
+        
+        Args:
+            message_type: webhook 中的訊息類型字串
+            model: 對應的領域模型類別
+            extractor: 由 webhook message 物件取出模型欄位的函式
+        """
+        cls._registry[message_type] = (model, extractor)
     
     @staticmethod
-    def from_line_message(event: MessageEvent) -> Optional[BaseMessage]:
-        """將 LINE 訊息事件轉換為領域模型
+    def _construct(model: Type[BaseMessage], fields: Dict[str, Any]) -> BaseMessage:
+        """不經驗證直接建立模型
+        
+        效果等同 model_construct，但以快取的預設值取代其逐欄位的 Python 迴圈。
+        fields 必須包含所有必填欄位與 default_factory 欄位。
+        """
+        defaults = _MODEL_DEFAULTS.get(model)
+        if defaults is None:
+            defaults = _MODEL_DEFAULTS[model] = {
+                name: field.default
+                for name, field in model.model_fields.items()
+                if not field.is_required() and field.default_factory is None
+            }
+        
+        values = dict(defaults)
+        values.update(fields)
+        instance = model.__new__(model)
+        object.__setattr__(instance, "__dict__", values)
+        object.__setattr__(instance, "__pydantic_fields_set__", set(fields))
+        object.__setattr__(instance, "__pydantic_extra__", None)
+        object.__setattr__(instance, "__pydantic_private__", None)
+        return instance
+    
+    @classmethod
+    def supports(cls, message_type: Optional[str]) -> bool:
+        """是否支援指定的訊息類型"""
+        return message_type in cls._registry
+    
+    @staticmethod
+    def to_line_send_message(message: OutboundMessage) -> SendMessage:
+        """將發送訊息模型轉換為 LINE SDK 訊息
         
         Args:
-            event: LINE 訊息事件
+            message: 發送訊息模型
+            
+        Returns:
+            SendMessage: LINE SDK 發送訊息
+            
+        Raises:
+            ValueError: 不支援的發送訊息類型
+        """
+        quick_reply = None
+        if message.quick_reply:
+            quick_reply = QuickReply.new_from_json_dict(message.quick_reply)
+        
+        if isinstance(message, OutboundTextMessage):
+            return TextSendMessage(text=message.text, quick_reply=quick_reply)
+        
+        elif isinstance(message, OutboundImageMessage):
+            return ImageSendMessage(
+                original_content_url=message.original_content_url,
+                preview_image_url=message.preview_image_url,
+                quick_reply=quick_reply
+            )
+        
+        elif isinstance(message, OutboundStickerMessage):
+            return StickerSendMessage(
+                package_id=message.package_id,
+                sticker_id=message.sticker_id,
+                quick_reply=quick_reply
+            )
+        
+        elif isinstance(message, OutboundFlexMessage):
+            # 範本渲染結果已是 JSON 字典，不再轉換為 SDK 物件
+            return PrebuiltFlexSendMessage(
+                alt_text=message.alt_text,
+                contents=message.contents,
+                quick_reply=quick_reply
+            )
+        
+        raise ValueError(f"不支援的發送訊息類型: {type(message).__name__}")
+    
+    @classmethod
+    def from_webhook_event(
+        cls,
+        event: Dict[str, Any],
+        received_at: Optional[float] = None
+    ) -> Optional[BaseMessage]:
+        """將已解析的 webhook 事件字典直接轉換為領域模型
+        
+        不建立 SDK 物件，raw_data 直接使用解析後的事件字典。
+        不支援的訊息類型在建立模型前即被拒絕。
+        payload 須已通過簽章驗證，精簡模式不再驗證欄位。
+        
+        Args:
+            event: webhook payload 中的單一事件字典
+            received_at: webhook 接收時間 (epoch 秒)
             
         Returns:
             Optional[BaseMessage]: 轉換後的領域模型，不支援的類型回傳 None
         """
         try:
-            base_data = {
-                "message_id": event.message.id,
-                "user_id": event.source.user_id,
-                "raw_data": event.as_dict()
-            }
+            message = event["message"]
+            message_type = message.get("type")
             
-            # 文字訊息
-            if isinstance(event.message, LineTextMessage):
-                return TextMessage(
-                    text=event.message.text,
-                    **base_data
-                )
+            entry = cls._registry.get(message_type)
+            if entry is None:
+                logger.warning(f"⚠️ 不支援的訊息類型: {message_type}")
+                return None
             
-            # 圖片訊息
-            elif isinstance(event.message, LineImageMessage):
-                return ImageMessage(
-                    content_type=getattr(event.message, 'content_provider', {}).get('type'),
-                    **base_data
-                )
+            model, extractor = entry
+            fields = extractor(message)
+            fields["message_id"] = message["id"]
+            source = event.get("source", {})
+            fields["user_id"] = source.get("userId", "")
+            fields["conversation_id"] = (
+                source.get("groupId") or source.get("roomId") or fields["user_id"]
+            )
+            fields["timestamp"] = datetime.fromtimestamp(event["timestamp"] / 1000)
+            if received_at is not None:
+                fields["received_at"] = datetime.fromtimestamp(received_at)
+            fields["raw_data"] = event if cls.retain_raw_data else None
             
-            # 其他類型暫不支援，但可以擴展
-            else:
-                logger.warning(f"⚠️ 不支援的訊息類型: {type(event.message)}")
-                return None
+            if cls.lean_mode:
+                fields["message_type"] = message_type
+                return cls._construct(model, fields)
+            return model(**fields)
                 
         except Exception as e:
             logger.error(f"❌ 轉換訊息時發生錯誤: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    @classmethod
+    def from_line_message(cls, event: MessageEvent) -> Optional[BaseMessage]:
+        """將 LINE 訊息事件轉換為領域模型
+        
+        Args:
+            event: LINE 訊息事件
+            
+        Returns:
+            Optional[BaseMessage]: 轉換後的領域模型，不支援的類型回傳 None
+        """
+        return cls.from_webhook_event(event.as_json_dict())
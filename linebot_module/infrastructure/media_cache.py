@@ -0,0 +1,225 @@
+"""訊息內容磁碟快取
+
+以 message_id 為鍵，將 LINE 上的圖片、語音、影片內容快取在本機磁碟，
+提供容量上限、LRU 淘汰、TTL 到期與同一 message_id 的單一下載
+"""
+
+import asyncio
+import mimetypes
+import mmap
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterator, Optional
+from urllib.parse import quote, unquote
+
+from loguru import logger
+
+
+@dataclass
+class MediaCacheEntry:
+    """快取項目"""
+
+    message_id: str
+    path: Path
+    size: int
+    created_at: float
+
+    @property
+    def content_type(self) -> str:
+        """依副檔名推斷內容類型"""
+        return mimetypes.guess_type(self.path.name)[0] or "application/octet-stream"
+
+    @contextmanager
+    def open_mmap(self) -> Iterator[memoryview]:
+        """以記憶體映射方式開啟快取檔案
+
+        Yields:
+            memoryview: 唯讀的檔案內容視圖，離開區塊後失效
+        """
+        with open(self.path, "rb") as f:
+            if self.size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def read_bytes(self) -> bytes:
+        """讀取快取檔案的完整內容"""
+        with self.open_mmap() as view:
+            return bytes(view)
+
+
+# 下載函式：將內容寫入指定的暫存路徑並回傳內容類型
+Downloader = Callable[[str, Path], Awaitable[Optional[str]]]
+
+
+def _encode_id(message_id: str) -> str:
+    """將 message_id 編碼為不含路徑分隔與副檔名符號的檔名"""
+    return quote(message_id, safe="").replace(".", "%2E")
+
+
+class MediaCache:
+    """有容量上限的訊息內容磁碟快取"""
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: float):
+        """初始化快取
+
+        Args:
+            directory: 快取目錄
+            max_bytes: 快取總容量上限 (bytes)
+            ttl_seconds: 快取項目存活時間 (秒)
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[str, MediaCacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self) -> None:
+        """重新載入目錄中既有的快取檔案，依修改時間排列 LRU 順序"""
+        files = []
+        for path in self.directory.iterdir():
+            if not path.is_file():
+                continue
+            if path.name.endswith(".part"):
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            files.append((stat.st_mtime, path, stat.st_size))
+
+        for mtime, path, size in sorted(files):
+            message_id = unquote(path.name.split(".", 1)[0])
+            self._add_entry(MediaCacheEntry(message_id, path, size, mtime))
+
+        self._evict()
+
+    def _file_path(self, message_id: str, content_type: Optional[str]) -> Path:
+        """依 message_id 與內容類型決定檔案路徑"""
+        extension = ""
+        if content_type:
+            extension = mimetypes.guess_extension(content_type.split(";")[0].strip()) or ""
+        return self.directory / f"{_encode_id(message_id)}{extension}"
+
+    def _add_entry(self, entry: MediaCacheEntry) -> None:
+        self._entries[entry.message_id] = entry
+        self._total_bytes += entry.size
+
+    def _remove_entry(self, message_id: str) -> None:
+        entry = self._entries.pop(message_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+            entry.path.unlink(missing_ok=True)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """淘汰最久未使用的項目直到總容量低於上限
+
+        Args:
+            keep: 不淘汰的 message_id (剛下載完成、即將回傳的項目)
+        """
+        while self._total_bytes > self.max_bytes and len(self._entries) > (1 if keep else 0):
+            message_id = next(iter(self._entries))
+            if message_id == keep:
+                self._entries.move_to_end(message_id)
+                continue
+            self._remove_entry(message_id)
+            self.evictions += 1
+
+    def get(self, message_id: str) -> Optional[MediaCacheEntry]:
+        """查詢快取，命中時更新 LRU 順序
+
+        Args:
+            message_id: 訊息 ID
+
+        Returns:
+            Optional[MediaCacheEntry]: 快取項目，未命中或已過期時回傳 None
+        """
+        entry = self._entries.get(message_id)
+        if entry is None:
+            return None
+
+        if time.time() - entry.created_at > self.ttl_seconds or not entry.path.exists():
+            self._remove_entry(message_id)
+            self.expirations += 1
+            return None
+
+        self._entries.move_to_end(message_id)
+        return entry
+
+    async def fetch(self, message_id: str, downloader: Downloader) -> Optional[MediaCacheEntry]:
+        """取得快取項目，未命中時下載
+
+        同一 message_id 的並行未命中只會觸發一次下載。
+
+        Args:
+            message_id: 訊息 ID
+            downloader: 將內容寫入指定路徑並回傳內容類型的函式
+
+        Returns:
+            Optional[MediaCacheEntry]: 快取項目，下載失敗時回傳 None
+        """
+        entry = self.get(message_id)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        task = self._inflight.get(message_id)
+        if task is None:
+            task = asyncio.create_task(self._download(message_id, downloader))
+            self._inflight[message_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(message_id, None))
+
+        return await asyncio.shield(task)
+
+    async def _download(self, message_id: str, downloader: Downloader) -> Optional[MediaCacheEntry]:
+        """下載內容並加入快取"""
+        tmp_path = self.directory / f"{_encode_id(message_id)}.part"
+        try:
+            content_type = await downloader(message_id, tmp_path)
+            self._remove_entry(message_id)
+            path = self._file_path(message_id, content_type)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"❌ 快取訊息內容失敗: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return None
+
+        entry = MediaCacheEntry(message_id, path, path.stat().st_size, time.time())
+        self._add_entry(entry)
+        self._evict(keep=message_id)
+        return entry
+
+    def invalidate(self, message_id: str) -> None:
+        """移除指定的快取項目"""
+        self._remove_entry(message_id)
+
+    def stats(self) -> dict:
+        """取得快取統計資料"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+        }
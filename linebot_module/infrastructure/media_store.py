@@ -0,0 +1,278 @@
+"""媒體託管
+
+將要發送的圖片依內容雜湊 (SHA-256) 儲存在本機，並產生符合 LINE 限制的預覽圖，
+由 /api/v1/media/{name} 提供公開網址；相同內容只儲存與產生預覽圖一次。
+
+預覽圖在 ProcessPoolExecutor 中以 Pillow 產生，不佔用事件迴圈；
+未安裝 Pillow 時，不超過預覽圖大小上限的原圖直接作為預覽圖。
+"""
+
+import asyncio
+import hashlib
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from loguru import logger
+
+try:
+    from PIL import Image
+    PILLOW_AVAILABLE = True
+    # 無法解碼 (UnidentifiedImageError 為 OSError 的子類別) 或像素數過多的圖片
+    _PREVIEW_ERRORS = (OSError, Image.DecompressionBombError)
+except ImportError:  # pragma: no cover - 視安裝環境而定
+    PILLOW_AVAILABLE = False
+    _PREVIEW_ERRORS = (OSError,)
+
+
+# LINE 圖片訊息限制：JPEG / PNG，原圖 10 MB、預覽圖 1 MB
+MAX_ORIGINAL_BYTES = 10 * 1024 * 1024
+MAX_PREVIEW_BYTES = 1024 * 1024
+
+_SIGNATURES = {
+    b"\xff\xd8\xff": ("jpg", "image/jpeg"),
+    b"\x89PNG\r\n\x1a\n": ("png", "image/png"),
+}
+
+MediaSource = Union[bytes, str, os.PathLike]
+
+
+class MediaStoreError(Exception):
+    """媒體內容不符合 LINE 限制或無法產生預覽圖"""
+
+
+@dataclass
+class MediaAsset:
+    """已託管的圖片"""
+
+    digest: str
+    content_type: str
+    original_name: str
+    preview_name: str
+    size: int
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest}"'
+
+
+def sniff_image_type(data: bytes):
+    """依檔頭判斷圖片格式
+
+    Returns:
+        Optional[Tuple[str, str]]: (副檔名, 內容類型)，不是 JPEG / PNG 時為 None
+    """
+    for signature, image_type in _SIGNATURES.items():
+        if data.startswith(signature):
+            return image_type
+    return None
+
+
+def render_preview(source: str, target: str, max_dimension: int, max_bytes: int) -> None:
+    """產生 JPEG 預覽圖 (在 worker 行程中執行)
+
+    依最長邊縮小到 max_dimension，超過 max_bytes 時逐步降低品質。
+
+    Args:
+        source: 原圖路徑
+        target: 預覽圖路徑
+        max_dimension: 預覽圖最長邊 (像素)
+        max_bytes: 預覽圖大小上限
+
+    Raises:
+        MediaStoreError: 無法壓縮到大小上限內
+    """
+    import io
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image.thumbnail((max_dimension, max_dimension))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        for quality in (85, 70, 50, 30):
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=quality, optimize=True)
+            if buffer.tell() <= max_bytes:
+                break
+        else:
+            raise MediaStoreError("預覽圖超過大小上限")
+
+    temp = f"{target}.tmp"
+    with open(temp, "wb") as f:
+        f.write(buffer.getvalue())
+    os.replace(temp, target)
+
+
+class MediaStore:
+    """以內容雜湊定址的圖片儲存與預覽圖產生"""
+
+    def __init__(
+        self,
+        directory: str,
+        public_base_url: Optional[str] = None,
+        preview_max_dimension: int = 240,
+        workers: int = 2,
+        executor: Optional[Executor] = None
+    ):
+        """初始化媒體儲存
+
+        Args:
+            directory: 儲存目錄
+            public_base_url: 託管檔案的公開網址前綴 (例如 https://example.com/api/v1/media)
+            preview_max_dimension: 預覽圖最長邊 (像素)
+            workers: 產生預覽圖的行程數 (未指定 executor 且已安裝 Pillow 時使用)
+            executor: 產生預覽圖的 executor，None 時於 start 建立 ProcessPoolExecutor
+        """
+        self.directory = Path(directory)
+        self.public_base_url = public_base_url.rstrip("/") if public_base_url else None
+        self.preview_max_dimension = preview_max_dimension
+        self.workers = workers
+
+        self._executor = executor
+        self._owns_executor = False
+        self._assets: Dict[str, MediaAsset] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.stored = 0
+        self.deduplicated = 0
+        self.previews_rendered = 0
+
+    def start(self) -> None:
+        """建立目錄與預覽圖行程池"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._executor is None and PILLOW_AVAILABLE:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            self._owns_executor = True
+        if not PILLOW_AVAILABLE and self._executor is None:
+            logger.warning("⚠️ 未安裝 Pillow，只能託管 1 MB 以下的圖片 (原圖兼作預覽圖)")
+
+    def close(self) -> None:
+        """關閉預覽圖行程池"""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            self._owns_executor = False
+
+    def _restart_executor(self) -> None:
+        """行程池中的行程異常結束 (例如記憶體不足) 後，重新建立自己的行程池"""
+        if not self._owns_executor:
+            return
+        logger.error("❌ 預覽圖行程池已損壞，重新建立")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def path_for(self, name: str) -> Optional[Path]:
+        """取得已託管檔案的路徑 (名稱不合法或檔案不存在時為 None)"""
+        if not name or "/" in name or "\\" in name or name.startswith("."):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    def url_for(self, name: str) -> str:
+        """取得託管檔案的公開網址
+
+        Raises:
+            MediaStoreError: 未設定公開網址
+        """
+        if not self.public_base_url:
+            raise MediaStoreError("未設定媒體託管的公開網址")
+        return f"{self.public_base_url}/{name}"
+
+    async def store(self, source: MediaSource) -> MediaAsset:
+        """儲存圖片並產生預覽圖，相同內容直接回傳既有結果
+
+        Args:
+            source: 圖片內容或檔案路徑
+
+        Returns:
+            MediaAsset: 已託管的圖片
+
+        Raises:
+            MediaStoreError: 不是 JPEG / PNG、超過大小上限或無法產生預覽圖
+        """
+        if isinstance(source, bytes):
+            data = source
+        else:
+            data = await asyncio.to_thread(Path(source).read_bytes)
+
+        if len(data) > MAX_ORIGINAL_BYTES:
+            raise MediaStoreError(f"圖片超過 {MAX_ORIGINAL_BYTES} bytes 上限")
+        image_type = sniff_image_type(data)
+        if image_type is None:
+            raise MediaStoreError("只支援 JPEG 或 PNG 圖片")
+
+        digest = await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+        asset = self._assets.get(digest)
+        if asset is not None:
+            self.deduplicated += 1
+            return asset
+
+        # 同一內容的並行上傳共用同一次儲存
+        task = self._inflight.get(digest)
+        if task is None:
+            task = asyncio.create_task(self._store(digest, data, *image_type))
+            self._inflight[digest] = task
+            task.add_done_callback(lambda _: self._inflight.pop(digest, None))
+        else:
+            self.deduplicated += 1
+        return await asyncio.shield(task)
+
+    async def _store(self, digest: str, data: bytes, extension: str, content_type: str) -> MediaAsset:
+        """寫入原圖並產生預覽圖 (已存在的檔案不重新產生)"""
+        original = self.directory / f"{digest}.{extension}"
+        preview = self.directory / f"{digest}.preview.jpg"
+
+        if not original.exists():
+            await asyncio.to_thread(self._write_atomic, original, data)
+            self.stored += 1
+        else:
+            self.deduplicated += 1
+
+        if preview.exists():
+            preview_name = preview.name
+        elif self._executor is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(
+                    self._executor,
+                    render_preview,
+                    str(original),
+                    str(preview),
+                    self.preview_max_dimension,
+                    MAX_PREVIEW_BYTES
+                )
+            except BrokenProcessPool:
+                self._restart_executor()
+                raise MediaStoreError("產生預覽圖的行程異常結束") from None
+            except _PREVIEW_ERRORS as e:
+                raise MediaStoreError(f"無法產生預覽圖: {e}") from e
+            self.previews_rendered += 1
+            preview_name = preview.name
+        elif len(data) <= MAX_PREVIEW_BYTES:
+            preview_name = original.name
+        else:
+            raise MediaStoreError("圖片超過預覽圖大小上限，需要安裝 Pillow 產生預覽圖")
+
+        asset = MediaAsset(digest, content_type, original.name, preview_name, len(data))
+        self._assets[digest] = asset
+        return asset
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        temp = path.with_name(f"{path.name}.tmp")
+        temp.write_bytes(data)
+        os.replace(temp, path)
+
+    def stats(self) -> Dict[str, int]:
+        """取得媒體儲存統計資料"""
+        return {
+            "assets": len(self._assets),
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "previews_rendered": self.previews_rendered,
+            "pillow_available": PILLOW_AVAILABLE,
+        }
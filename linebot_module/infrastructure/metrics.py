@@ -0,0 +1,318 @@
+"""行程內指標登錄表
+
+提供 Counter、Gauge、Histogram 三種指標並輸出 Prometheus 文字格式。
+所有記錄都在事件迴圈執行緒上進行，因此不使用鎖；
+每次記錄僅是一次字典查詢加上數值累加，可以在正式環境常駐開啟。
+"""
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# 預設的延遲分桶 (秒)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _escape(value: str) -> str:
+    """跳脫標籤值中的特殊字元"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """組合標籤字串，例如 {endpoint="push",status="ok"}"""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    """輸出數值，整數不帶小數點"""
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """指標基底類別：以標籤值為鍵管理子指標"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """取得指定標籤值的子指標 (不存在時建立)
+
+        Args:
+            *values: 依 labelnames 順序的標籤值
+
+        Raises:
+            ValueError: 標籤值數量不符
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"指標 {self.name} 需要 {len(self.labelnames)} 個標籤值，收到 {len(values)} 個"
+                )
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """輸出 Prometheus 文字格式"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    """只增不減的計數器"""
+
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """累加無標籤的計數器"""
+        self.labels().inc(amount)
+
+    def _samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_total{labels} {_format_value(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        """改由函式在輸出時計算數值 (None 時恢復手動設定的值)"""
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    """可增可減的量測值"""
+
+    type_name = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        self.labels().set_function(function)
+
+    def _samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}{labels} {_format_value(child.get())}"
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """以固定分桶統計分布的直方圖"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """記錄無標籤直方圖的觀測值"""
+        self.labels().observe(value)
+
+    def _samples(self) -> Iterator[str]:
+        bounds = [repr(bound) for bound in self.buckets] + ["+Inf"]
+        bucket_labelnames = self.labelnames + ("le",)
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(bounds, child.counts):
+                cumulative += count
+                labels = _format_labels(bucket_labelnames, values + (bound,))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class MetricsRegistry:
+    """指標登錄表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"指標 {metric.name} 已以不同的型別或標籤註冊")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """註冊計數器 (同名指標已存在時回傳既有指標)"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """註冊量測值 (同名指標已存在時回傳既有指標)"""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """註冊直方圖 (同名指標已存在時回傳既有指標)"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """輸出所有指標的 Prometheus 文字格式"""
+        blocks: List[str] = [metric.render() for metric in self._metrics.values()]
+        return "\n".join(blocks) + "\n"
+
+
+# 應用程式共用的指標登錄表與指標
+metrics = MetricsRegistry()
+
+webhook_duration = metrics.histogram(
+    "linebot_webhook_duration_seconds",
+    "Webhook 請求處理時間 (簽章驗證、解析與排入佇列)"
+)
+conversion_duration = metrics.histogram(
+    "linebot_message_conversion_duration_seconds",
+    "webhook 事件轉換為領域模型的時間",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005)
+)
+handler_duration = metrics.histogram(
+    "linebot_handler_duration_seconds",
+    "訊息處理器執行時間",
+    ("message_type",)
+)
+line_api_duration = metrics.histogram(
+    "linebot_line_api_duration_seconds",
+    "LINE API 呼叫延遲",
+    ("endpoint",)
+)
+line_api_calls = metrics.counter(
+    "linebot_line_api_calls",
+    "LINE API 呼叫次數，status 為 ok、HTTP 狀態碼或 error (連線錯誤等)",
+    ("endpoint", "status")
+)
+handler_timeouts = metrics.counter(
+    "linebot_handler_timeouts",
+    "訊息處理器逾時次數"
+)
+replies_missed = metrics.counter(
+    "linebot_replies_missed",
+    "錯過 reply token 期限的回覆數"
+)
+reply_fallbacks = metrics.counter(
+    "linebot_reply_fallbacks",
+    "錯過回覆期限後的處理次數，policy 為 push 或 drop",
+    ("policy",)
+)
+event_queue_depth = metrics.gauge(
+    "linebot_event_queue_depth",
+    "事件執行器等待中的事件數"
+)
+event_busy_workers = metrics.gauge(
+    "linebot_event_busy_workers",
+    "事件執行器處理中的 worker 數"
+)
+outbound_queue_depth = metrics.gauge(
+    "linebot_outbound_queue_depth",
+    "發送佇列等待中的請求數"
+)
+outbound_in_flight = metrics.gauge(
+    "linebot_outbound_in_flight",
+    "發送佇列處理中的請求數"
+)
+spool_commit_duration = metrics.histogram(
+    "linebot_spool_commit_duration_seconds",
+    "webhook spool 群組提交 (寫入與 fsync) 時間"
+)
+spool_pending = metrics.gauge(
+    "linebot_spool_pending",
+    "webhook spool 已寫入但尚未處理完成的紀錄數"
+)
+user_state_flush_duration = metrics.histogram(
+    "linebot_user_state_flush_duration_seconds",
+    "使用者狀態批次寫入 SQLite 的時間"
+)
@@ -0,0 +1,429 @@
+"""訊息發送佇列
+
+每個端點類別 (push、reply、multicast) 各自擁有 asyncio 佇列、發送 worker
+與 token bucket 限流器，push 被限流時不會讓 reply 排在後面等待。
+遇到 429 或暫時性錯誤時以指數退避加抖動重試，並遵守 Retry-After。
+
+429 表示請求未被受理，一律可以重試；5xx 與連線錯誤時請求可能已送達，
+只有帶 X-Line-Retry-Key 的工作 (push、multicast) 才重試，
+LINE 以相同的 retry key 判斷重複，不會重複發送。
+reply 不支援 retry key，因此 5xx 與連線錯誤不重試。
+帶期限的工作 (reply token 的期限) 在期限前無法完成重試時不再重試，
+以 OutboundDeadlineError 失敗，由呼叫端改以其他方式發送。
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from linebot.exceptions import LineBotApiError
+from loguru import logger
+
+
+class EndpointClass(str, Enum):
+    """LINE API 端點類別 (各自獨立限流)"""
+    PUSH = "push"
+    REPLY = "reply"
+    MULTICAST = "multicast"
+
+
+class OutboundQueueFullError(Exception):
+    """發送佇列已滿"""
+
+
+# OutboundDeadlineError 的錯誤訊息
+DEADLINE_EXCEEDED = "Send deadline exceeded"
+
+
+class OutboundDeadlineError(Exception):
+    """工作無法在期限前送出"""
+
+    def __init__(self, message: str = DEADLINE_EXCEEDED):
+        super().__init__(message)
+
+
+def new_retry_key() -> str:
+    """產生 X-Line-Retry-Key (每個邏輯發送工作一個，重試時沿用)"""
+    return str(uuid.uuid4())
+
+
+class TokenBucket:
+    """Token bucket 限流器"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """初始化限流器
+
+        Args:
+            rate: 每秒補充的 token 數
+            capacity: bucket 容量 (允許的瞬間突發量)，預設與 rate 相同
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def pause(self, seconds: float) -> None:
+        """暫停發放 token (收到 Retry-After 時使用)
+
+        Args:
+            seconds: 暫停秒數
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        """取得一個 token，不足時等待"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def state(self) -> Dict[str, float]:
+        """取得限流器狀態"""
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(self._tokens, 3),
+            "paused_for": round(max(0.0, self._paused_until - now), 3),
+        }
+
+
+@dataclass
+class OutboundJob:
+    """發送工作"""
+
+    endpoint_class: EndpointClass
+    send: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    retryable: bool = True
+    retry_key: Optional[str] = None
+    deadline: Optional[float] = None  # epoch 秒，None 表示不限
+    attempts: int = field(default=0)
+
+
+class OutboundDispatcher:
+    """LINE API 發送佇列與 worker pool (每個端點類別各一組)"""
+
+    # 請求未被受理，可直接重試
+    REJECTED_STATUS = {429}
+    # 請求可能已被受理，需要 retry key 才能安全重試
+    TRANSIENT_STATUS = {500, 502, 503, 504}
+    # 帶 retry key 的請求已被受理
+    ACCEPTED_STATUS = 409
+
+    def __init__(
+        self,
+        limiters: Dict[EndpointClass, TokenBucket],
+        workers: int = 8,
+        queue_size: int = 10000,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 30.0
+    ):
+        """初始化發送佇列
+
+        Args:
+            limiters: 各端點類別的限流器
+            workers: 每個端點類別的發送 worker 數量
+            queue_size: 每個端點類別的佇列容量
+            max_retries: 最多重試次數
+            retry_base_delay: 指數退避的基礎延遲 (秒)
+            retry_max_delay: 退避延遲上限 (秒)
+        """
+        self.limiters = limiters
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self._queues: Dict[EndpointClass, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+        self._pending_retries: Dict[asyncio.TimerHandle, OutboundJob] = {}
+        self._in_flight = 0
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    @property
+    def running(self) -> bool:
+        """是否已啟動"""
+        return bool(self._workers)
+
+    def is_full(self, endpoint_class: EndpointClass) -> bool:
+        """端點類別的佇列是否已滿"""
+        queue = self._queues.get(endpoint_class)
+        return queue is not None and queue.full()
+
+    @property
+    def queue_depth(self) -> int:
+        """等待中的請求數"""
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    @property
+    def in_flight(self) -> int:
+        """處理中的請求數"""
+        return self._in_flight
+
+    async def start(self) -> None:
+        """啟動發送 worker"""
+        if self.running:
+            return
+        self._queues = {
+            endpoint_class: asyncio.Queue(maxsize=self.queue_size)
+            for endpoint_class in EndpointClass
+        }
+        self._workers = [
+            asyncio.create_task(
+                self._worker(queue), name=f"outbound-worker-{endpoint_class.value}-{i}"
+            )
+            for endpoint_class, queue in self._queues.items()
+            for i in range(self.worker_count)
+        ]
+        logger.info(f"📮 發送佇列已啟動，每個端點類別的 worker 數: {self.worker_count}")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """等待佇列清空後停止 worker
+
+        Args:
+            timeout: 等待清空的時間上限 (秒)，逾時後取消剩餘工作
+        """
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ 發送佇列未在 {timeout} 秒內清空，剩餘 {self.queue_depth} 筆")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        for handle, job in list(self._pending_retries.items()):
+            handle.cancel()
+            job.future.cancel()
+        self._pending_retries.clear()
+
+        for queue in self._queues.values():
+            while not queue.empty():
+                queue.get_nowait().future.cancel()
+
+    async def _drain(self) -> None:
+        """等待佇列與延遲重試全部完成"""
+        while True:
+            await asyncio.gather(*(queue.join() for queue in self._queues.values()))
+            if not self._pending_retries:
+                return
+            await asyncio.sleep(0.05)
+
+    async def submit(
+        self,
+        endpoint_class: EndpointClass,
+        send: Callable[[], Awaitable[Any]],
+        retryable: bool = True,
+        retry_key: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Any:
+        """將 LINE API 呼叫放入佇列並等待結果
+
+        Args:
+            endpoint_class: 端點類別
+            send: 實際送出請求的函式
+            retryable: 失敗時是否允許重試
+            retry_key: send 送出的 X-Line-Retry-Key，None 時 5xx 與連線錯誤不重試
+            deadline: 送出期限 (epoch 秒)，None 表示不限
+
+        Returns:
+            Any: send 的回傳值
+
+        Raises:
+            OutboundQueueFullError: 佇列已滿
+            OutboundDeadlineError: 等待限流或重試時超過期限
+            LineBotApiError: 重試後仍失敗
+        """
+        if not self.running:
+            raise RuntimeError("OutboundDispatcher 尚未啟動")
+
+        job = OutboundJob(
+            endpoint_class=endpoint_class,
+            send=send,
+            future=asyncio.get_running_loop().create_future(),
+            retryable=retryable,
+            retry_key=retry_key,
+            deadline=deadline
+        )
+        try:
+            self._queues[endpoint_class].put_nowait(job)
+        except asyncio.QueueFull:
+            raise OutboundQueueFullError(f"發送佇列已滿 ({self.queue_size})")
+
+        return await job.future
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        """發送 worker 主迴圈 (只處理單一端點類別的佇列)"""
+        while True:
+            job = await queue.get()
+            self._in_flight += 1
+            try:
+                await self._run(job)
+            finally:
+                self._in_flight -= 1
+                queue.task_done()
+
+    async def _run(self, job: OutboundJob) -> None:
+        """執行單一發送工作"""
+        if job.future.done():
+            return
+
+        limiter = self.limiters.get(job.endpoint_class)
+        if limiter is not None:
+            await limiter.acquire()
+
+        if job.deadline is not None and time.time() >= job.deadline:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(OutboundDeadlineError())
+            return
+
+        job.attempts += 1
+        try:
+            result = await job.send()
+        except Exception as e:
+            if self._already_accepted(job, e):
+                # 先前的嘗試已送達，只是未收到回應
+                self.sent += 1
+                if not job.future.done():
+                    job.future.set_result(None)
+                return
+
+            delay = self._retry_delay(job, e)
+            if delay is None:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+                return
+
+            if job.deadline is not None and time.time() + delay >= job.deadline:
+                # 重試時已超過期限 (例如 reply token 過期)，交由呼叫端改以其他方式發送
+                self.failed += 1
+                logger.warning(
+                    "⚠️ {} 發送失敗，{:.2f} 秒後重試將超過期限，不再重試: {}",
+                    job.endpoint_class.value, delay, e
+                )
+                if not job.future.done():
+                    job.future.set_exception(OutboundDeadlineError())
+                return
+
+            self.retried += 1
+            logger.warning(
+                f"⚠️ {job.endpoint_class.value} 發送失敗，{delay:.2f} 秒後重試 "
+                f"(第 {job.attempts} 次): {e}"
+            )
+            self._schedule_retry(job, delay)
+            return
+
+        self.sent += 1
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def _retry_delay(self, job: OutboundJob, error: Exception) -> Optional[float]:
+        """計算重試延遲，不需重試時回傳 None"""
+        if not job.retryable or job.attempts > self.max_retries:
+            return None
+
+        if isinstance(error, LineBotApiError):
+            if error.status_code in self.TRANSIENT_STATUS:
+                if job.retry_key is None:
+                    return None
+            elif error.status_code not in self.REJECTED_STATUS:
+                return None
+            retry_after = self._retry_after(error)
+            if retry_after is not None:
+                limiter = self.limiters.get(job.endpoint_class)
+                if limiter is not None:
+                    limiter.pause(retry_after)
+                return retry_after
+        elif not isinstance(error, httpx.TransportError) or job.retry_key is None:
+            return None
+
+        # 指數退避加上完整抖動
+        backoff = min(self.retry_max_delay, self.retry_base_delay * (2 ** (job.attempts - 1)))
+        return random.uniform(0, backoff)
+
+    def _already_accepted(self, job: OutboundJob, error: Exception) -> bool:
+        """重試時 LINE 回應 409，表示相同 retry key 的請求先前已被受理"""
+        return (
+            job.retry_key is not None
+            and job.attempts > 1
+            and isinstance(error, LineBotApiError)
+            and error.status_code == self.ACCEPTED_STATUS
+        )
+
+    @staticmethod
+    def _retry_after(error: LineBotApiError) -> Optional[float]:
+        """讀取 Retry-After 標頭 (秒)"""
+        headers = {k.lower(): v for k, v in (error.headers or {}).items()}
+        value = headers.get("retry-after")
+        try:
+            return max(0.0, float(value)) if value is not None else None
+        except ValueError:
+            return None
+
+    def _schedule_retry(self, job: OutboundJob, delay: float) -> None:
+        """延遲後將工作重新放回佇列，不佔用 worker"""
+        def requeue() -> None:
+            self._pending_retries.pop(handle, None)
+            try:
+                self._queues[job.endpoint_class].put_nowait(job)
+            except asyncio.QueueFull:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(OutboundQueueFullError("重試時發送佇列已滿"))
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._pending_retries[handle] = job
+
+    def stats(self) -> Dict[str, Any]:
+        """取得佇列與限流器狀態"""
+        return {
+            "running": self.running,
+            "workers": self.worker_count,
+            "queue_depth": self.queue_depth,
+            "queues": {
+                endpoint_class.value: queue.qsize()
+                for endpoint_class, queue in self._queues.items()
+            },
+            "queue_size": self.queue_size,
+            "in_flight": self._in_flight,
+            "pending_retries": len(self._pending_retries),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "limiters": {
+                endpoint_class.value: limiter.state()
+                for endpoint_class, limiter in self.limiters.items()
+            },
+        }
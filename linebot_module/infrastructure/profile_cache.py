@@ -0,0 +1,135 @@
+"""使用者資料快取
+
+行程內的 LINE 使用者資料快取，提供容量上限、TTL、LRU 淘汰、
+查無使用者的負向快取，以及同一 user_id 並行查詢的合併
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from linebot_module.domain.models import User
+
+
+# 載入函式：查無使用者時回傳 None，暫時性錯誤時拋出例外 (不快取)
+ProfileLoader = Callable[[str], Awaitable[Optional[User]]]
+
+
+class ProfileCache:
+    """使用者資料 TTL/LRU 快取"""
+
+    def __init__(self, max_size: int, ttl_seconds: float, negative_ttl_seconds: float):
+        """初始化快取
+
+        Args:
+            max_size: 最多快取的使用者數
+            ttl_seconds: 使用者資料的存活時間 (秒)
+            negative_ttl_seconds: 查無使用者結果的存活時間 (秒)
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+
+        self._entries: "OrderedDict[str, Tuple[float, Optional[User]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def peek(self, user_id: str) -> Tuple[bool, Optional[User]]:
+        """查詢快取，命中時更新 LRU 順序
+
+        Args:
+            user_id: 使用者 ID
+
+        Returns:
+            Tuple[bool, Optional[User]]: (是否命中, 使用者資料)；
+            命中負向快取時為 (True, None)
+        """
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return False, None
+
+        expires_at, user = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[user_id]
+            return False, None
+
+        self._entries.move_to_end(user_id)
+        return True, user
+
+    def put(self, user_id: str, user: Optional[User]) -> None:
+        """寫入快取，user 為 None 時寫入負向快取
+
+        Args:
+            user_id: 使用者 ID
+            user: 使用者資料
+        """
+        ttl = self.ttl_seconds if user is not None else self.negative_ttl_seconds
+        self._entries[user_id] = (time.monotonic() + ttl, user)
+        self._entries.move_to_end(user_id)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, user_id: str, loader: ProfileLoader) -> Optional[User]:
+        """取得使用者資料，未命中時載入
+
+        同一 user_id 的並行查詢只會呼叫一次 loader。
+
+        Args:
+            user_id: 使用者 ID
+            loader: 向 LINE 查詢使用者資料的函式
+
+        Returns:
+            Optional[User]: 使用者資料，查無使用者時回傳 None
+
+        Raises:
+            Exception: loader 拋出的暫時性錯誤 (不會被快取)
+        """
+        hit, user = self.peek(user_id)
+        if hit:
+            if user is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return user
+
+        self.misses += 1
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._load(user_id, loader))
+            self._inflight[user_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+
+        return await asyncio.shield(task)
+
+    async def _load(self, user_id: str, loader: ProfileLoader) -> Optional[User]:
+        """載入使用者資料並寫入快取"""
+        user = await loader(user_id)
+        self.put(user_id, user)
+        return user
+
+    def invalidate(self, user_id: str) -> None:
+        """移除指定使用者的快取"""
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        """清除所有快取"""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """取得快取統計資料"""
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,252 @@
+"""Channel access token 管理
+
+以 channel ID / secret (或 JWT assertion) 向 LINE 取得 channel access token 並快取在記憶體，
+於到期前在背景更新 (加入隨機抖動，避免多個行程同時更新)；
+更新以單一工作進行，並行的更新要求共用同一次呼叫，發送訊息不需等待取得 token。
+
+支援的 token 類型：
+- stateless：有效 15 分鐘，可用 channel secret 或 JWT assertion 取得 (/oauth2/v3/token)
+- short_lived：有效 30 天，以 channel secret 取得 (/v2/oauth/accessToken)
+- jwt：channel access token v2.1，以 JWT assertion 取得 (/oauth2/v2.1/token)
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+from linebot_module.infrastructure.metrics import line_api_calls, line_api_duration
+
+
+# 回傳已簽章 JWT assertion 的函式
+AssertionProvider = Callable[[], str]
+TokenListener = Callable[[str], None]
+
+CLIENT_ASSERTION_TYPE = "urn:ietf:params:oauth:client-assertion-type:jwt-bearer"
+
+TOKEN_PATHS = {
+    "stateless": "/oauth2/v3/token",
+    "short_lived": "/v2/oauth/accessToken",
+    "jwt": "/oauth2/v2.1/token",
+}
+
+
+class TokenIssueError(Exception):
+    """無法取得 channel access token"""
+
+
+class ChannelTokenManager:
+    """單一 channel 的 access token 快取與背景更新"""
+
+    # 更新失敗後的重試延遲上限 (秒)
+    MAX_RETRY_DELAY = 60.0
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        endpoint: str,
+        mode: str,
+        channel_id: str,
+        channel_secret: str = "",
+        assertion_provider: Optional[AssertionProvider] = None,
+        refresh_margin: float = 0.25,
+        refresh_jitter: float = 0.1
+    ):
+        """初始化 token 管理器
+
+        Args:
+            http_client: 用於取得 token 的 HTTP 客戶端 (與 channel 共用連線池)
+            endpoint: LINE API 基底網址
+            mode: token 類型 (stateless、short_lived 或 jwt)
+            channel_id: LINE channel ID
+            channel_secret: LINE channel secret (jwt 模式不需要)
+            assertion_provider: 產生 JWT assertion 的函式 (jwt 模式必須提供)
+            refresh_margin: 剩餘有效期佔總有效期的比例低於此值時更新
+            refresh_jitter: 更新時間提前的隨機範圍 (佔總有效期的比例)
+
+        Raises:
+            ValueError: mode 不支援，或 jwt 模式未提供 assertion_provider
+        """
+        if mode not in TOKEN_PATHS:
+            raise ValueError(f"不支援的 token 類型: {mode}")
+        if mode == "jwt" and assertion_provider is None:
+            raise ValueError("jwt 模式需要 assertion_provider")
+
+        self.http_client = http_client
+        self.url = endpoint.rstrip("/") + TOKEN_PATHS[mode]
+        self.mode = mode
+        self.channel_id = channel_id
+        self.channel_secret = channel_secret
+        self.assertion_provider = assertion_provider
+        self.refresh_margin = refresh_margin
+        self.refresh_jitter = refresh_jitter
+
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._listeners: List[TokenListener] = []
+        self._refreshing: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+        self.refreshes = 0
+        self.failures = 0
+
+    @property
+    def token(self) -> Optional[str]:
+        """目前的 access token (尚未取得時為 None)"""
+        return self._token
+
+    def add_listener(self, listener: TokenListener) -> None:
+        """登錄 token 更新時呼叫的函式 (已有 token 時立即呼叫一次)"""
+        self._listeners.append(listener)
+        if self._token is not None:
+            listener(self._token)
+
+    async def start(self) -> None:
+        """取得第一個 token 並啟動背景更新
+
+        取得失敗時只記錄錯誤，由背景更新持續重試。
+        """
+        if self._loop_task is not None:
+            return
+        try:
+            await self.refresh()
+        except TokenIssueError as e:
+            logger.error(f"❌ 無法取得 channel {self.channel_id} 的 access token: {e}")
+            self._refresh_at = time.monotonic() + 1.0
+        self._loop_task = asyncio.create_task(
+            self._refresh_loop(), name=f"token-refresh-{self.channel_id}"
+        )
+
+    async def stop(self) -> None:
+        """停止背景更新"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+
+    async def refresh(self) -> str:
+        """立即更新 token，並行呼叫共用同一次更新
+
+        Returns:
+            str: 新的 access token
+
+        Raises:
+            TokenIssueError: 無法取得 token
+        """
+        if self._refreshing is None:
+            self._refreshing = asyncio.create_task(self._refresh())
+            self._refreshing.add_done_callback(self._clear_refreshing)
+        return await asyncio.shield(self._refreshing)
+
+    def _clear_refreshing(self, task: asyncio.Task) -> None:
+        if self._refreshing is task:
+            self._refreshing = None
+
+    async def invalidate(self, token: Optional[str]) -> str:
+        """標記 token 失效 (LINE 回應 401) 並取得新的 token
+
+        token 已被其他請求更新時不再重複取得。
+
+        Args:
+            token: 收到 401 時使用的 token
+
+        Returns:
+            str: 目前有效的 access token
+        """
+        if token != self._token and self._token is not None:
+            return self._token
+        logger.warning(f"🔑 channel {self.channel_id} 的 access token 失效，重新取得")
+        return await self.refresh()
+
+    async def _refresh(self) -> str:
+        """取得新的 token 並排定下次更新時間"""
+        token, expires_in = await self._issue()
+        now = time.monotonic()
+        self._token = token
+        self._expires_at = now + expires_in
+        self._refresh_at = (
+            now
+            + expires_in * (1 - self.refresh_margin)
+            - random.uniform(0, expires_in * self.refresh_jitter)
+        )
+        self.refreshes += 1
+        for listener in self._listeners:
+            listener(token)
+        logger.info("🔑 已更新 channel {} 的 access token，有效 {} 秒", self.channel_id, expires_in)
+        return token
+
+    def _form(self) -> Dict[str, str]:
+        """取得 token 請求的表單內容"""
+        form = {"grant_type": "client_credentials"}
+        if self.assertion_provider is not None:
+            form["client_assertion_type"] = CLIENT_ASSERTION_TYPE
+            form["client_assertion"] = self.assertion_provider()
+        else:
+            form["client_id"] = self.channel_id
+            form["client_secret"] = self.channel_secret
+        return form
+
+    async def _issue(self) -> Tuple[str, float]:
+        """向 LINE 取得 access token
+
+        Returns:
+            Tuple[str, float]: (access token, 有效秒數)
+
+        Raises:
+            TokenIssueError: 連線失敗或 LINE 回應錯誤
+        """
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            response = await self.http_client.post(self.url, data=self._form())
+            if response.status_code != 200:
+                status = str(response.status_code)
+                raise TokenIssueError(f"HTTP {response.status_code}: {response.text}")
+            data = response.json()
+            return data["access_token"], float(data["expires_in"])
+        except httpx.HTTPError as e:
+            status = "error"
+            raise TokenIssueError(str(e)) from e
+        except (KeyError, ValueError) as e:
+            status = "error"
+            raise TokenIssueError(f"無法解析 token 回應: {e}") from e
+        finally:
+            line_api_duration.labels("token").observe(time.perf_counter() - started)
+            line_api_calls.labels("token", status).inc()
+
+    async def _refresh_loop(self) -> None:
+        """於排定時間更新 token，失敗時以指數退避重試"""
+        failures = 0
+        while True:
+            delay = self._refresh_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            try:
+                await self.refresh()
+                failures = 0
+            except TokenIssueError as e:
+                failures += 1
+                self.failures += 1
+                retry_delay = min(self.MAX_RETRY_DELAY, 2.0 ** failures)
+                logger.error(
+                    f"❌ 更新 channel {self.channel_id} 的 access token 失敗: {e}，"
+                    f"{retry_delay:.0f} 秒後重試"
+                )
+                self._refresh_at = time.monotonic() + retry_delay
+
+    def stats(self) -> Dict[str, Any]:
+        """取得 token 狀態 (不含 token 內容)"""
+        now = time.monotonic()
+        return {
+            "mode": self.mode,
+            "has_token": self._token is not None,
+            "expires_in": round(max(0.0, self._expires_at - now), 1),
+            "refresh_in": round(max(0.0, self._refresh_at - now), 1),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
@@ -0,0 +1,483 @@
+"""使用者對話狀態儲存
+
+記憶體 LRU 快取在前，本機 SQLite 在後。
+狀態以 (channel ID, 使用者 ID) 為鍵，同一使用者在不同 channel 的狀態各自獨立；
+所有依使用者存取的方法都必須指定 channel_id，
+for_channel 回傳綁定單一 channel 的 IUserService 供訊息處理器使用。
+
+- 讀取：依序查找待寫入的變更、寫入中的變更、LRU 快取，最後才讀取 SQLite
+  (同一使用者並行的讀取共用同一次查詢)，因此行程內必定讀到自己的寫入
+- 寫入 (write-behind)：變更先記錄在記憶體並立即可讀，由背景工作依時間間隔
+  或累積筆數以單一交易批次寫入；同一使用者在批次間的多次變更只寫入最後狀態
+- 所有 SQLite 操作在單一執行緒中依序執行，不阻塞事件迴圈
+- hold 依鍵序列化載入、修改、寫回，同一使用者在不同對話 (私訊、群組)
+  同時處理的訊息不會互相覆寫；持有期間該狀態物件是唯一的資料來源，
+  update_user_status 與 get_user_info (不論在哪個 task 呼叫) 直接讀寫它，不等待鎖
+
+快取與待寫入的變更只存在於單一行程，儲存只支援單一行程使用：
+SERVER_WORKERS > 1 時各 worker 的狀態互不可見，且會互相覆寫。
+
+快取中的對話資料以 JSON 字串保存，每次載入都產生新的 UserState，
+訊息處理器修改 message.user_state 不會影響快取內容，
+比對序列化結果即可判斷是否需要寫回。
+行程當機時，尚未寫入的變更 (最多一個寫入間隔) 會遺失。
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from loguru import logger
+
+from linebot_module.domain.models import UserState
+from linebot_module.interfaces.message_handler import IUserService
+from linebot_module.infrastructure.metrics import user_state_flush_duration
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_state (
+    channel_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    status TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (channel_id, user_id)
+)
+"""
+
+_UPSERT = """
+INSERT INTO user_state (channel_id, user_id, status, data, updated_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (channel_id, user_id) DO UPDATE SET
+    status = excluded.status, data = excluded.data, updated_at = excluded.updated_at
+"""
+
+# 狀態的鍵：(channel ID, 使用者 ID)
+Key = Tuple[str, str]
+
+
+class _Record(NamedTuple):
+    """快取中的使用者狀態 (對話資料為 JSON 字串)"""
+
+    status: Optional[str]
+    data: str
+    updated_at: float
+
+
+class _KeyLock:
+    """單一鍵的鎖，記錄等待者數以便移除不再使用的鎖"""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+class UserStateStore:
+    """LRU 快取 + SQLite 的使用者狀態儲存，變更以 write-behind 批次寫入"""
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = 10000,
+        flush_interval: float = 1.0,
+        flush_batch_size: int = 500
+    ):
+        """初始化狀態儲存
+
+        Args:
+            path: SQLite 資料庫檔案路徑
+            max_size: LRU 快取的使用者數上限 (尚未寫入的變更不計入)
+            flush_interval: 批次寫入的時間間隔 (秒)
+            flush_batch_size: 待寫入的使用者數達到此值時提前寫入
+        """
+        self.path = path
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+
+        self._cache: "OrderedDict[Key, Optional[_Record]]" = OrderedDict()
+        self._dirty: Dict[Key, _Record] = {}
+        self._flushing: Dict[Key, _Record] = {}
+        self._loading: Dict[Key, asyncio.Task] = {}
+        self._locks: Dict[Key, _KeyLock] = {}
+        self._held: Dict[Key, UserState] = {}
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_failures = 0
+
+    async def open(self) -> None:
+        """開啟資料庫並啟動背景寫入"""
+        if self._flusher is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="user-state")
+        await self._run(self._connect)
+        self._flusher = asyncio.create_task(self._flush_loop(), name="user-state-flusher")
+        logger.info(f"🗂️ 使用者狀態儲存已開啟: {self.path}")
+
+    async def close(self) -> None:
+        """寫入剩餘的變更後關閉資料庫"""
+        if self._flusher is None:
+            return
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        self._flusher = None
+        await self.flush()
+        if self._dirty:
+            logger.error(f"❌ 關閉時仍有 {len(self._dirty)} 位使用者的狀態無法寫入")
+        await self._run(self._connection.close)
+        self._executor.shutdown(wait=True)
+        logger.info("🗂️ 使用者狀態儲存已關閉")
+
+    async def _run(self, func, *args):
+        """在資料庫執行緒中執行"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    # 以下方法在資料庫執行緒中執行
+
+    def _connect(self) -> None:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(_SCHEMA)
+        self._connection.commit()
+
+    def _select(self, key: Key) -> Optional[_Record]:
+        row = self._connection.execute(
+            "SELECT status, data, updated_at FROM user_state WHERE channel_id = ? AND user_id = ?",
+            key
+        ).fetchone()
+        return _Record(*row) if row else None
+
+    def _write_batch(self, rows: List[Tuple[str, str, Optional[str], str, float]]) -> None:
+        with self._connection:
+            self._connection.executemany(_UPSERT, rows)
+
+    # 序列化
+
+    @asynccontextmanager
+    async def _locked(self, key: Key) -> AsyncIterator[None]:
+        """在區塊內獨占鍵 (不可重入)"""
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = _KeyLock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            if not entry.users:
+                del self._locks[key]
+
+    @asynccontextmanager
+    async def hold(
+        self,
+        user_id: str,
+        *,
+        channel_id: str
+    ) -> AsyncIterator[UserState]:
+        """獨占並載入使用者狀態，區塊正常結束時寫回
+
+        持有期間其他 hold 需等待；update_user_status 與 get_user_info 則直接讀寫
+        持有中的狀態物件，不等待鎖，因此處理器在區塊內 (包括以 gather 或
+        create_task 產生的 task) 呼叫也不會死結，變更隨區塊結束一併寫回。
+        區塊內發生例外或被取消時不寫回。
+
+        Args:
+            user_id: 使用者 ID
+            channel_id: channel ID
+
+        Yields:
+            UserState: 持有中的狀態物件
+        """
+        key = (channel_id, user_id)
+        async with self._locked(key):
+            state = await self.load_state(user_id, channel_id=channel_id)
+            self._held[key] = state
+            try:
+                yield state
+            finally:
+                del self._held[key]
+            await self.save_state(state)
+
+    # 讀取
+
+    def _cached(self, key: Key) -> Tuple[bool, Optional[_Record]]:
+        """由記憶體取得狀態
+
+        Returns:
+            Tuple[bool, Optional[_Record]]: (是否在記憶體中, 狀態；None 表示使用者不存在)
+        """
+        record = self._dirty.get(key) or self._flushing.get(key)
+        if record is not None:
+            return True, record
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return True, self._cache[key]
+        return False, None
+
+    def _remember(self, key: Key, record: Optional[_Record]) -> None:
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def _get_record(self, key: Key) -> Optional[_Record]:
+        """取得使用者狀態，記憶體中沒有時讀取資料庫"""
+        found, record = self._cached(key)
+        if found:
+            self.hits += 1
+            return record
+
+        self.misses += 1
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            self._loading[key] = task
+            task.add_done_callback(lambda _: self._loading.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Key) -> Optional[_Record]:
+        record = await self._run(self._select, key)
+        # 讀取期間產生的變更比資料庫內容新
+        found, newer = self._cached(key)
+        if found:
+            return newer
+        self._remember(key, record)
+        return record
+
+    async def load_state(self, user_id: str, *, channel_id: str) -> UserState:
+        """載入使用者對話狀態 (使用者不存在時回傳空白狀態)
+
+        需要寫回時應改用 hold，避免覆寫其他 task 的變更。
+
+        Args:
+            user_id: 使用者 ID
+            channel_id: channel ID
+
+        Returns:
+            UserState: 新建立的狀態物件，修改後以 save_state 寫回
+        """
+        record = await self._get_record((channel_id, user_id))
+        if record is None:
+            return UserState.model_construct(
+                channel_id=channel_id, user_id=user_id, status=None, data={}, updated_at=None
+            )
+        return UserState.model_construct(
+            channel_id=channel_id,
+            user_id=user_id,
+            status=record.status,
+            data=json.loads(record.data),
+            updated_at=datetime.fromtimestamp(record.updated_at)
+        )
+
+    async def get_user_info(
+        self,
+        user_id: str,
+        *,
+        channel_id: str
+    ) -> Optional[dict]:
+        """取得使用者資訊
+
+        Args:
+            user_id: 使用者 ID
+            channel_id: channel ID
+
+        Returns:
+            Optional[dict]: 包含 status 與 data 的使用者狀態，None 表示尚無紀錄
+            (狀態持有中時回傳持有中的內容，包含尚未寫回的變更)
+        """
+        held = self._held.get((channel_id, user_id))
+        if held is not None:
+            return {
+                "channel_id": channel_id,
+                "user_id": user_id,
+                "status": held.status,
+                "data": json.loads(_dumps(held.data)),
+                "updated_at": held.updated_at,
+            }
+        record = await self._get_record((channel_id, user_id))
+        if record is None:
+            return None
+        return {
+            "channel_id": channel_id,
+            "user_id": user_id,
+            "status": record.status,
+            "data": json.loads(record.data),
+            "updated_at": datetime.fromtimestamp(record.updated_at),
+        }
+
+    def for_channel(self, channel_id: str) -> "ChannelUserService":
+        """取得綁定單一 channel 的使用者服務
+
+        Args:
+            channel_id: channel ID
+
+        Returns:
+            ChannelUserService: 以此 channel 存取狀態的 IUserService
+        """
+        return ChannelUserService(self, channel_id)
+
+    # 寫入
+
+    def _write(self, key: Key, status: Optional[str], data: str) -> None:
+        """記錄變更 (立即可讀)，累積足夠筆數時喚醒寫入工作"""
+        record = _Record(status, data, time.time())
+        self._dirty[key] = record
+        self._remember(key, record)
+        self.writes += 1
+        if len(self._dirty) >= self.flush_batch_size:
+            self._wake.set()
+
+    async def update_user_status(
+        self,
+        user_id: str,
+        status: str,
+        *,
+        channel_id: str
+    ) -> bool:
+        """更新使用者狀態 (對話資料不變)
+
+        狀態持有中 (hold) 時更新持有中的狀態物件，由持有者在區塊結束時寫回。
+
+        Args:
+            user_id: 使用者 ID
+            status: 新狀態
+            channel_id: channel ID
+
+        Returns:
+            bool: 更新是否成功
+        """
+        key = (channel_id, user_id)
+        held = self._held.get(key)
+        if held is not None:
+            held.status = status
+            return True
+        async with self._locked(key):
+            record = await self._get_record(key)
+            self._write(key, status, record.data if record else "{}")
+        return True
+
+    async def save_state(self, state: UserState) -> bool:
+        """寫回使用者對話狀態，內容未變更時不寫入
+
+        Args:
+            state: 由 load_state 取得並修改的狀態
+
+        Returns:
+            bool: 是否有變更
+        """
+        key = (state.channel_id, state.user_id)
+        data = _dumps(state.data)
+        found, record = self._cached(key)
+        if found and record is not None and record.status == state.status and record.data == data:
+            return False
+        if found and record is None and state.status is None and not state.data:
+            return False
+        self._write(key, state.status, data)
+        return True
+
+    async def flush(self) -> int:
+        """以單一交易寫入所有待寫入的變更
+
+        Returns:
+            int: 寫入的使用者數 (失敗時為 0，變更保留到下次寫入)
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return 0
+            batch, self._dirty = self._dirty, {}
+            self._flushing = batch
+            rows = [
+                (channel_id, user_id, record.status, record.data, record.updated_at)
+                for (channel_id, user_id), record in batch.items()
+            ]
+            started = time.perf_counter()
+            try:
+                await self._run(self._write_batch, rows)
+            except sqlite3.Error as e:
+                self.flush_failures += 1
+                logger.error(f"❌ 寫入使用者狀態失敗 ({len(rows)} 筆): {e}")
+                # 寫入期間又有變更的使用者保留較新的狀態
+                for key, record in batch.items():
+                    self._dirty.setdefault(key, record)
+                return 0
+            finally:
+                self._flushing = {}
+
+            user_state_flush_duration.observe(time.perf_counter() - started)
+            self.flushes += 1
+            self.rows_written += len(rows)
+            return len(rows)
+
+    async def _flush_loop(self) -> None:
+        """依時間間隔或累積筆數批次寫入"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """取得快取與批次寫入統計資料"""
+        lookups = self.hits + self.misses
+        return {
+            "cached": len(self._cache),
+            "max_size": self.max_size,
+            "dirty": len(self._dirty),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "rows_per_flush": round(self.rows_written / self.flushes, 2) if self.flushes else 0.0,
+            "flush_failures": self.flush_failures,
+        }
+
+
+class ChannelUserService(IUserService):
+    """綁定單一 channel 的使用者服務，讓處理器不必指定 channel"""
+
+    def __init__(self, store: UserStateStore, channel_id: str):
+        """初始化使用者服務
+
+        Args:
+            store: 使用者對話狀態儲存
+            channel_id: 所屬 channel
+        """
+        self.store = store
+        self.channel_id = channel_id
+
+    async def get_user_info(self, user_id: str) -> Optional[dict]:
+        """取得此 channel 的使用者資訊"""
+        return await self.store.get_user_info(user_id, channel_id=self.channel_id)
+
+    async def update_user_status(self, user_id: str, status: str) -> bool:
+        """更新此 channel 的使用者狀態"""
+        return await self.store.update_user_status(user_id, status, channel_id=self.channel_id)
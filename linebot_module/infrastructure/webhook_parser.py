@@ -0,0 +1,121 @@
+"""Webhook 快速解析
+
+以原始位元組驗證 LINE 簽章並一次解析 JSON，
+解析結果直接交給 MessageConverter 建立領域模型，不經過 SDK 物件
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+from typing import Any, Dict, List
+
+from linebot.exceptions import InvalidSignatureError
+
+try:
+    import orjson
+
+    def json_loads(body: bytes) -> Any:
+        """以 orjson 解析 JSON"""
+        return orjson.loads(body)
+
+except ImportError:  # pragma: no cover - 視安裝環境而定
+
+    def json_loads(body: bytes) -> Any:
+        """以標準函式庫解析 JSON"""
+        return json.loads(body)
+
+
+class WebhookSignatureVerifier:
+    """LINE Webhook 簽章驗證器
+
+    啟動時以 channel secret 建立 HMAC 物件，
+    每次驗證只複製已完成金鑰處理的狀態，不再重新計算金鑰。
+    """
+
+    def __init__(self, channel_secret: str):
+        """初始化簽章驗證器
+
+        Args:
+            channel_secret: LINE Channel Secret
+        """
+        self._hmac_template = hmac.new(
+            channel_secret.encode("utf-8"),
+            digestmod=hashlib.sha256
+        )
+
+    def verify(self, body: bytes, signature: str) -> bool:
+        """驗證請求簽章
+
+        Args:
+            body: 請求原始內容
+            signature: X-Line-Signature 標頭值
+
+        Returns:
+            bool: 簽章是否有效
+        """
+        if not signature:
+            return False
+
+        mac = self._hmac_template.copy()
+        mac.update(body)
+        return hmac.compare_digest(
+            base64.b64encode(mac.digest()),
+            signature.encode("utf-8")
+        )
+
+
+class WebhookParser:
+    """Webhook 請求解析器 - 單次驗證與單次 JSON 解析"""
+
+    def __init__(self, channel_secret: str):
+        """初始化解析器
+
+        Args:
+            channel_secret: LINE Channel Secret
+        """
+        self.verifier = WebhookSignatureVerifier(channel_secret)
+
+    def verify(self, body: bytes, signature: str) -> None:
+        """只驗證簽章，不解析內容
+
+        Args:
+            body: 請求原始內容
+            signature: X-Line-Signature 標頭值
+
+        Raises:
+            InvalidSignatureError: 簽章無效
+        """
+        if not self.verifier.verify(body, signature):
+            raise InvalidSignatureError(f"Invalid signature. signature={signature}")
+
+    def parse(self, body: bytes, signature: str) -> Dict[str, Any]:
+        """驗證簽章並解析 Webhook 內容
+
+        Args:
+            body: 請求原始內容
+            signature: X-Line-Signature 標頭值
+
+        Returns:
+            Dict[str, Any]: 解析後的 webhook payload
+
+        Raises:
+            InvalidSignatureError: 簽章無效
+        """
+        self.verify(body, signature)
+        return json_loads(body)
+
+    def parse_events(self, body: bytes, signature: str) -> List[Dict[str, Any]]:
+        """驗證簽章並取得事件列表
+
+        Args:
+            body: 請求原始內容
+            signature: X-Line-Signature 標頭值
+
+        Returns:
+            List[Dict[str, Any]]: 事件字典列表
+
+        Raises:
+            InvalidSignatureError: 簽章無效
+        """
+        return self.parse(body, signature).get("events", [])
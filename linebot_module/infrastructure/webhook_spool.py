@@ -0,0 +1,383 @@
+"""Webhook 預寫日誌 (spool)
+
+將已驗證簽章的 webhook 原始內容附加到本機分段檔案，寫入並 fsync 後即回應 LINE，
+由背景消費端依序取出處理；行程當機後於啟動時重播尚未處理完成的紀錄。
+
+- 群組提交：等待寫入期間到達的附加請求合併為一次寫入與一次 fsync
+- 紀錄格式：內容長度 (4 bytes) + CRC32 (4 bytes) + 接收時間 (8 bytes)
+  + channel ID 長度 (2 bytes) + channel ID + 內容；
+  重播時遇到不完整或校驗失敗的紀錄 (寫入途中當機) 即停止讀取該分段
+- 偏移量：依附加順序連續完成的最後位置 (水位) 寫入 offset 檔，重播由水位開始，
+  不再需要的分段會被刪除 (壓縮)
+- 水位之後已完成但不連續的紀錄重啟後會再次處理 (至少一次)，由事件去重吸收
+- 單一寫入者：開啟時以 flock 獨占目錄，其他行程 (例如 SERVER_WORKERS > 1
+  的其他 worker) 開啟同一目錄會立即失敗；多個 worker 需各自設定不同的目錄
+"""
+
+import asyncio
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+try:
+    import fcntl
+    FLOCK_AVAILABLE = True
+except ImportError:  # pragma: no cover - 非 POSIX 平台
+    FLOCK_AVAILABLE = False
+
+from linebot_module.infrastructure.metrics import spool_commit_duration
+
+
+# 紀錄標頭：內容長度、channel ID 與內容的 CRC32、接收時間 (epoch 秒)、channel ID 長度
+_HEADER = struct.Struct(">IIdH")
+_SEGMENT_SUFFIX = ".seg"
+_OFFSET_FILE = "offset"
+_LOCK_FILE = "lock"
+
+
+class SpoolLockedError(RuntimeError):
+    """spool 目錄已被其他行程開啟"""
+
+
+@dataclass
+class SpoolRecord:
+    """spool 中的一筆 webhook 紀錄"""
+
+    body: bytes
+    received_at: float
+    channel_id: str = "default"
+    segment: int = 0
+    end: int = 0          # 紀錄結尾在分段檔中的位置
+    pending: int = 0      # 尚未完成的事件數 (由消費端設定)
+    done: bool = False
+
+
+class WebhookSpool:
+    """分段式 webhook 預寫日誌"""
+
+    def __init__(self, directory: str, segment_max_bytes: int, commit_interval: float = 0.0):
+        """初始化 spool
+
+        Args:
+            directory: 分段檔目錄
+            segment_max_bytes: 單一分段檔大小上限，超過後寫入新分段
+            commit_interval: 群組提交前額外等待的時間 (秒)，0 表示只合併寫入期間到達的請求
+        """
+        self.directory = Path(directory)
+        self.segment_max_bytes = segment_max_bytes
+        self.commit_interval = commit_interval
+
+        self._batch: List[Tuple[SpoolRecord, asyncio.Future]] = []
+        self._wake = asyncio.Event()
+        self._ready: "asyncio.Queue[SpoolRecord]" = asyncio.Queue()
+        self._inflight: Deque[SpoolRecord] = deque()
+        self._segments: List[int] = []
+        self._segment = 0
+        self._file = None
+        self._lock_file = None
+        self._size = 0
+        self._watermark: Optional[Tuple[int, int]] = None
+        self._offset_dirty = False
+        self._flusher: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.appended = 0
+        self.commits = 0
+        self.replayed = 0
+        self.completed = 0
+
+    @property
+    def running(self) -> bool:
+        """是否已開啟"""
+        return self._flusher is not None and not self._closing
+
+    @property
+    def pending(self) -> int:
+        """已寫入但尚未完成的紀錄數"""
+        return len(self._inflight)
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"{seq:020d}{_SEGMENT_SUFFIX}"
+
+    async def open(self) -> int:
+        """重播未完成的紀錄並啟動寫入工作
+
+        Returns:
+            int: 重播的紀錄數 (可由 get 依序取出)
+
+        Raises:
+            SpoolLockedError: 目錄已被其他行程開啟
+        """
+        if self._flusher is not None:
+            return 0
+        records = await asyncio.to_thread(self._recover)
+        for record in records:
+            self._inflight.append(record)
+            self._ready.put_nowait(record)
+        self.replayed = len(records)
+        self._flusher = asyncio.create_task(self._flush_loop(), name="webhook-spool-flusher")
+        if records:
+            logger.warning(f"♻️ 由 spool 重播 {len(records)} 筆未完成的 webhook")
+        logger.info(f"💾 Webhook spool 已開啟: {self.directory}")
+        return len(records)
+
+    async def close(self) -> None:
+        """寫出剩餘的附加請求與水位後關閉檔案
+
+        未完成的紀錄保留在分段檔中，下次啟動時重播。
+        """
+        if not self.running:
+            return
+        self._closing = True
+        self._wake.set()
+        await self._flusher
+        await self._checkpoint()
+        await asyncio.to_thread(self._file.close)
+        self._unlock()
+        logger.info(f"💾 Webhook spool 已關閉，未完成 {self.pending} 筆")
+
+    async def append(
+        self,
+        body: bytes,
+        received_at: float,
+        channel_id: str = "default"
+    ) -> SpoolRecord:
+        """附加一筆 webhook 並等待寫入磁碟
+
+        Args:
+            body: 已驗證簽章的請求原始內容
+            received_at: webhook 接收時間 (epoch 秒)
+            channel_id: webhook 所屬的 channel
+
+        Returns:
+            SpoolRecord: 已持久化的紀錄
+
+        Raises:
+            RuntimeError: spool 尚未開啟或已關閉
+            OSError: 寫入或 fsync 失敗
+        """
+        if not self.running:
+            raise RuntimeError("WebhookSpool 尚未開啟")
+
+        record = SpoolRecord(body, received_at, channel_id)
+        future = asyncio.get_running_loop().create_future()
+        self._batch.append((record, future))
+        self.appended += 1
+        self._wake.set()
+        await future
+        return record
+
+    async def get(self) -> SpoolRecord:
+        """依附加順序取出下一筆待處理的紀錄"""
+        return await self._ready.get()
+
+    def complete(self, record: SpoolRecord) -> None:
+        """標記紀錄已處理完成並推進水位
+
+        Args:
+            record: 由 get 取得的紀錄
+        """
+        record.done = True
+        self.completed += 1
+        inflight = self._inflight
+        while inflight and inflight[0].done:
+            head = inflight.popleft()
+            self._watermark = (head.segment, head.end)
+            self._offset_dirty = True
+        if self._offset_dirty:
+            self._wake.set()
+
+    async def _flush_loop(self) -> None:
+        """寫入工作：合併等待中的附加請求，寫入後一次 fsync"""
+        while True:
+            await self._wake.wait()
+            if self.commit_interval > 0 and self._batch and not self._closing:
+                await asyncio.sleep(self.commit_interval)
+            self._wake.clear()
+
+            batch, self._batch = self._batch, []
+            if batch:
+                await self._commit(batch)
+            if self._offset_dirty:
+                await self._checkpoint()
+            if self._closing and not self._batch:
+                return
+
+    async def _commit(self, batch: List[Tuple[SpoolRecord, asyncio.Future]]) -> None:
+        """寫入一批紀錄並通知等待中的附加請求"""
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write_batch, [record for record, _ in batch])
+        except OSError as e:
+            logger.error(f"❌ 寫入 webhook spool 失敗: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        spool_commit_duration.observe(time.perf_counter() - started)
+        self.commits += 1
+        for record, future in batch:
+            self._inflight.append(record)
+            self._ready.put_nowait(record)
+            if not future.done():
+                future.set_result(None)
+
+    async def _checkpoint(self) -> None:
+        """寫出水位並刪除不再需要的分段"""
+        self._offset_dirty = False
+        oldest = self._inflight[0].segment if self._inflight else self._segment
+        await asyncio.to_thread(self._save_offset, self._watermark, oldest)
+
+    # 以下方法在執行緒中執行，同一時間只有寫入工作會呼叫
+
+    def _lock(self) -> None:
+        """以 flock 獨占 spool 目錄 (不等待)
+
+        Raises:
+            SpoolLockedError: 目錄已被其他行程開啟
+        """
+        if not FLOCK_AVAILABLE:
+            logger.warning("⚠️ 此平台不支援 flock，無法防止多個行程共用 spool 目錄")
+            return
+        lock_file = open(self.directory / _LOCK_FILE, "a+b")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise SpoolLockedError(
+                f"spool 目錄 {self.directory} 已被其他行程使用，"
+                "多個 worker 需設定不同的 WEBHOOK_SPOOL_DIR"
+            ) from None
+        self._lock_file = lock_file
+
+    def _unlock(self) -> None:
+        if self._lock_file is not None:
+            self._lock_file.close()  # 關閉檔案即釋放 flock
+            self._lock_file = None
+
+    def _recover(self) -> List[SpoolRecord]:
+        """取得目錄鎖後讀取水位之後的紀錄，並開啟新的分段供寫入"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock()
+        try:
+            return self._replay()
+        except BaseException:
+            self._unlock()
+            raise
+
+    def _replay(self) -> List[SpoolRecord]:
+        offset_segment, offset_position = self._load_offset()
+
+        records: List[SpoolRecord] = []
+        seqs = sorted(int(path.stem) for path in self.directory.glob(f"*{_SEGMENT_SUFFIX}"))
+        for seq in seqs:
+            if seq < offset_segment:
+                self._segment_path(seq).unlink(missing_ok=True)
+                continue
+            start = offset_position if seq == offset_segment else 0
+            records.extend(self._read_segment(seq, start))
+            self._segments.append(seq)
+
+        # 舊分段可能有不完整的結尾，新紀錄一律寫入新分段
+        self._segment = max(seqs[-1] + 1 if seqs else 0, offset_segment + 1)
+        self._open_segment(self._segment)
+        return records
+
+    def _read_segment(self, seq: int, start: int) -> List[SpoolRecord]:
+        """由指定位置讀取分段中的完整紀錄"""
+        data = self._segment_path(seq).read_bytes()
+        records = []
+        position = start
+        while position + _HEADER.size <= len(data):
+            length, crc, received_at, channel_length = _HEADER.unpack_from(data, position)
+            body_start = position + _HEADER.size + channel_length
+            end = body_start + length
+            if end > len(data):
+                break
+            channel = data[position + _HEADER.size:body_start]
+            body = data[body_start:end]
+            if zlib.crc32(body, zlib.crc32(channel)) != crc:
+                break
+            records.append(SpoolRecord(body, received_at, channel.decode("utf-8"), seq, end))
+            position = end
+        if position < len(data):
+            logger.warning(f"⚠️ spool 分段 {seq} 在位置 {position} 之後的內容不完整，已略過")
+        return records
+
+    def _open_segment(self, seq: int) -> None:
+        self._file = open(self._segment_path(seq), "ab")
+        self._size = self._file.tell()
+        self._segments.append(seq)
+
+    def _write_batch(self, records: List[SpoolRecord]) -> None:
+        """寫入一批紀錄並 fsync，失敗時截斷回寫入前的大小"""
+        if self._size >= self.segment_max_bytes:
+            self._file.close()
+            self._segment += 1
+            self._open_segment(self._segment)
+
+        start = self._size
+        chunks = []
+        position = start
+        for record in records:
+            channel = record.channel_id.encode("utf-8")
+            crc = zlib.crc32(record.body, zlib.crc32(channel))
+            chunks.append(_HEADER.pack(len(record.body), crc, record.received_at, len(channel)))
+            chunks.append(channel)
+            chunks.append(record.body)
+            position += _HEADER.size + len(channel) + len(record.body)
+            record.segment = self._segment
+            record.end = position
+
+        try:
+            self._file.write(b"".join(chunks))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError:
+            self._file.truncate(start)
+            raise
+        self._size = position
+
+    def _load_offset(self) -> Tuple[int, int]:
+        """讀取水位 (分段, 位置)，沒有紀錄時由頭開始"""
+        try:
+            segment, position = (self.directory / _OFFSET_FILE).read_text().split()
+            return int(segment), int(position)
+        except (OSError, ValueError):
+            return 0, 0
+
+    def _save_offset(self, watermark: Optional[Tuple[int, int]], oldest: int) -> None:
+        """以原子替換寫出水位，並刪除早於 oldest 的分段"""
+        if watermark is not None:
+            path = self.directory / _OFFSET_FILE
+            temp = path.with_suffix(".tmp")
+            temp.write_text(f"{watermark[0]} {watermark[1]}")
+            os.replace(temp, path)
+
+        for seq in [seq for seq in self._segments if seq < oldest and seq != self._segment]:
+            self._segment_path(seq).unlink(missing_ok=True)
+            self._segments.remove(seq)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得 spool 統計資料"""
+        return {
+            "enabled": True,
+            "directory": str(self.directory),
+            "segments": len(self._segments),
+            "active_segment": self._segment,
+            "appended": self.appended,
+            "commits": self.commits,
+            "records_per_commit": round(self.appended / self.commits, 2) if self.commits else 0.0,
+            "replayed": self.replayed,
+            "completed": self.completed,
+            "pending": self.pending,
+            "waiting": self._ready.qsize(),
+        }
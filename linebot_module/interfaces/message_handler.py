@@ -7,92 +7,106 @@ from abc import ABC, abstractmethod
 from typing import Optional, Union
 from linebot_module.domain.models import (
     BaseMessage, TextMessage, ImageMessage, 
-    AudioMessage, VideoMessage, LocationMessage, StickerMessage
+    AudioMessage, VideoMessage, FileMessage, LocationMessage, StickerMessage,
+    HandlerResponse
 )
 
 
 class IMessageHandler(ABC):
     """訊息處理介面
     
-    外部模組需要實作此介面來處理具體的業務邏輯
+    外部模組需要實作此介面來處理具體的業務邏輯。
+    各方法可回傳文字、OutboundMessage 或多則訊息的列表，
+    前五則以同一個 reply token 回覆，超出部分以 push 補送。
     """
     
     @abstractmethod
-    async def handle_text_message(self, message: TextMessage) -> Optional[str]:
+    async def handle_text_message(self, message: TextMessage) -> Optional[HandlerResponse]:
         """處理文字訊息
         
         Args:
             message: 文字訊息物件
             
         Returns:
-            Optional[str]: 回應訊息內容，None 表示不回應
+            Optional[HandlerResponse]: 回應訊息內容，None 表示不回應
         """
         pass
     
     @abstractmethod
-    async def handle_image_message(self, message: ImageMessage) -> Optional[str]:
+    async def handle_image_message(self, message: ImageMessage) -> Optional[HandlerResponse]:
         """處理圖片訊息
         
         Args:
             message: 圖片訊息物件
             
         Returns:
-            Optional[str]: 回應訊息內容，None 表示不回應
+            Optional[HandlerResponse]: 回應訊息內容，None 表示不回應
         """
         pass
     
-    async def handle_audio_message(self, message: AudioMessage) -> Optional[str]:
+    async def handle_audio_message(self, message: AudioMessage) -> Optional[HandlerResponse]:
         """處理語音訊息 (預留擴展)
         
         Args:
             message: 語音訊息物件
             
         Returns:
-            Optional[str]: 回應訊息內容，None 表示不回應
+            Optional[HandlerResponse]: 回應訊息內容，None 表示不回應
         """
         return None  # 預設實作：不處理
     
-    async def handle_video_message(self, message: VideoMessage) -> Optional[str]:
+    async def handle_video_message(self, message: VideoMessage) -> Optional[HandlerResponse]:
         """處理影片訊息 (預留擴展)
         
         Args:
             message: 影片訊息物件
             
         Returns:
-            Optional[str]: 回應訊息內容，None 表示不回應
+            Optional[HandlerResponse]: 回應訊息內容，None 表示不回應
         """
         return None  # 預設實作：不處理
     
-    async def handle_location_message(self, message: LocationMessage) -> Optional[str]:
+    async def handle_file_message(self, message: FileMessage) -> Optional[HandlerResponse]:
+        """處理檔案訊息 (預留擴展)
+        
+        Args:
+            message: 檔案訊息物件
+            
+        Returns:
+            Optional[HandlerResponse]: 回應訊息內容，None 表示不回應
+        """
+        return None  # 預設實作：不處理
+    
+    async def handle_location_message(self, message: LocationMessage) -> Optional[HandlerResponse]:
         """處理位置訊息 (預留擴展)
         
         Args:
             message: 位置訊息物件
             
         Returns:
-            Optional[str]: 回應訊息內容，None 表示不回應
+            Optional[HandlerResponse]: 回應訊息內容，None 表示不回應
         """
         return None  # 預設實作：不處理
     
-    async def handle_sticker_message(self, message: StickerMessage) -> Optional[str]:
+    async def handle_sticker_message(self, message: StickerMessage) -> Optional[HandlerResponse]:
         """處理貼圖訊息 (預留擴展)
         
         Args:
             message: 貼圖訊息物件
             
         Returns:
-            Optional[str]: 回應訊息內容，None 表示不回應
+            Optional[HandlerResponse]: 回應訊息內容，None 表示不回應
         """
         return None  # 預設實作：不處理
     
-    async def handle_unknown_message(self, message: BaseMessage) -> Optional[str]:
+    async def handle_unknown_message(self, message: BaseMessage) -> Optional[HandlerResponse]:
         """處理未知類型訊息
         
         Args:
             message: 基礎訊息物件
             
         Returns:
-            Optional[str]: 回應訊息內容，None 表示不回應
+            Optional[HandlerResponse]: 回應訊息內容，None 表示不回應
         """
         return "抱歉，我無法處理此類型的訊息。"
 
@@ -136,13 +150,13 @@ class IMessageRouter(ABC):
     """
     
     @abstractmethod
-    async def route_message(self, message: BaseMessage) -> Optional[str]:
+    async def route_message(self, message: BaseMessage) -> Optional[HandlerResponse]:
         """路由訊息到對應的處理器
         
         Args:
             message: 訊息物件
             
         Returns:
-            Optional[str]: 處理結果，None 表示不回應
+            Optional[HandlerResponse]: 處理結果，None 表示不回應
         """
         pass
\ No newline at end of file
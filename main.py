@@ -3,14 +3,53 @@
 啟動 FastAPI 應用程式並設定所有必要的路由與中介軟體
 """
 
+import asyncio
+import importlib.util
 import uvicorn
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from loguru import logger
 
-from linebot_module.config.settings import settings
-from linebot_module.application.api import router as api_router
-from linebot_module.application.dependencies import setup_dependencies
+from linebot_module.config.settings import Settings, settings
+from linebot_module.config.logging_config import setup_logging
+from linebot_module.infrastructure.metrics import metrics
+from linebot_module.application.api import router as api_router, consume_webhook_spool
+from linebot_module.application.dependencies import (
+    setup_dependencies, startup_dependencies, shutdown_dependencies
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """應用程式生命週期
+
+    啟動時建立共用服務並預熱連線池，關閉時釋放連線池
+    """
+    logger.info("🚀 LINE BOT 通訊模組啟動中...")
+    logger.info(f"📡 伺服器設定: {settings.host}:{settings.port}")
+    logger.info(f"🔧 偵錯模式: {settings.debug}，worker 數: {settings.server_workers}")
+    if settings.ngrok_url:
+        logger.info(f"🌐 ngrok 網址: {settings.ngrok_url}")
+    await startup_dependencies(app)
+    if app.state.webhook_spool is not None:
+        app.state.spool_consumer = asyncio.create_task(
+            consume_webhook_spool(app), name="webhook-spool-consumer"
+        )
+    logger.info("✅ 應用程式啟動完成")
+
+    yield
+
+    logger.info("🛑 LINE BOT 通訊模組關閉中...")
+    await shutdown_dependencies(app)
+    logger.info("✅ 應用程式已安全關閉")
+    await logger.complete()
+
+# 依設定初始化日誌輸出
+setup_logging()
 
 # 建立 FastAPI 應用程式實例
 app = FastAPI(
@@ -19,7 +58,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    lifespan=lifespan
 )
 
 # 設定 CORS 中介軟體
@@ -38,24 +78,6 @@ setup_dependencies(app)
 app.include_router(api_router, prefix="/api/v1")
 
 
-@app.on_event("startup")
-async def startup_event():
-    """應用程式啟動事件"""
-    logger.info("🚀 LINE BOT 通訊模組啟動中...")
-    logger.info(f"📡 伺服器設定: {settings.host}:{settings.port}")
-    logger.info(f"🔧 偵錯模式: {settings.debug}")
-    if settings.ngrok_url:
-        logger.info(f"🌐 ngrok 網址: {settings.ngrok_url}")
-    logger.info("✅ 應用程式啟動完成")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """應用程式關閉事件"""
-    logger.info("🛑 LINE BOT 通訊模組關閉中...")
-    logger.info("✅ 應用程式已安全關閉")
-
-
 @app.get("/")
 async def root():
     """根路徑端點 - 健康檢查"""
@@ -72,17 +94,57 @@ async def health_check():
     """健康檢查端點"""
     return {
         "status": "healthy",
-        "timestamp": settings.log_level,
+        "timestamp": datetime.now().isoformat(),
         "service": "linebot-communication-module"
     }
 
 
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus 指標端點"""
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def _resolve_impl(choice: str, module: str) -> str:
+    """指定的實作未安裝時改用 auto (由 uvicorn 自動選擇)"""
+    if choice == module and importlib.util.find_spec(module) is None:
+        logger.warning(f"⚠️ 未安裝 {module}，改用預設實作")
+        return "auto"
+    return choice
+
+
+def server_options(config: Settings = settings) -> Dict[str, Any]:
+    """依設定產生 uvicorn.run 的參數
+
+    偵錯模式且單一 worker 時啟用自動重新載入；
+    否則為正式環境模式，以多個 worker 行程執行。
+
+    Args:
+        config: 應用程式設定
+
+    Returns:
+        Dict[str, Any]: uvicorn.run 的關鍵字參數
+    """
+    production = not config.debug or config.server_workers > 1
+    return {
+        "host": config.host,
+        "port": config.port,
+        "log_level": config.log_level.lower(),
+        "reload": not production,
+        "workers": config.server_workers if production else None,
+        "loop": _resolve_impl(config.server_loop, "uvloop"),
+        "http": _resolve_impl(config.server_http, "httptools"),
+        "backlog": config.server_backlog,
+        "timeout_keep_alive": config.server_keepalive_timeout,
+        "limit_concurrency": config.server_limit_concurrency,
+        "timeout_graceful_shutdown": config.server_graceful_shutdown_seconds,
+    }
+
+
 if __name__ == "__main__":
     # 直接執行時啟動伺服器
-    uvicorn.run(
-        "main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.debug,
-        log_level=settings.log_level.lower()
-    )
\ No newline at end of file
+    uvicorn.run("main:app", **server_options())
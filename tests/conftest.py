@@ -0,0 +1,19 @@
+"""測試共用設定"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from linebot_module.config.settings import settings
+from main import app
+
+
+# 未設定 secret 時不會建立 default channel
+if not settings.line_channel_secret:
+    settings.line_channel_secret = "test-channel-secret"
+
+
+@pytest.fixture
+def client():
+    """FastAPI 測試客戶端"""
+    with TestClient(app) as test_client:
+        yield test_client
@@ -1,9 +1,58 @@
 """測試 API 端點"""
 
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock
 
+from linebot_module.config.settings import Settings, settings
+from linebot_module.infrastructure.line_api_service import LineApiService
+
+
+def signed_webhook(events: list, secret: str = None, destination: str = "Ubot") -> dict:
+    """產生帶有正確簽章的 webhook 請求參數"""
+    body = json.dumps({"destination": destination, "events": events}).encode("utf-8")
+    secret = settings.line_channel_secret if secret is None else secret
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()
+    return {
+        "content": body,
+        "headers": {
+            "X-Line-Signature": base64.b64encode(digest).decode("utf-8"),
+            "Content-Type": "application/json",
+        },
+    }
+
+
+def text_event(event_id: str, redelivery: bool = False) -> dict:
+    """建立文字訊息事件"""
+    return {
+        "type": "message",
+        "mode": "active",
+        "timestamp": 1700000000000,
+        "source": {"type": "user", "userId": "U0001"},
+        "webhookEventId": event_id,
+        "deliveryContext": {"isRedelivery": redelivery},
+        "replyToken": f"reply-{event_id}",
+        "message": {"id": f"msg-{event_id}", "type": "text", "text": "Hello"},
+    }
+
+
+def wait_for_events(client, count: int, timeout: float = 2.0) -> None:
+    """等待事件執行器處理完指定數量的事件"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        executor = client.get("/api/v1/webhook/stats").json()["executor"]
+        if executor["completed"] + executor["failed"] >= count:
+            return
+        time.sleep(0.01)
+    raise AssertionError("事件未在時間內處理完成")
+
 
 class TestWebhookEndpoint:
     """測試 Webhook 端點"""
@@ -27,6 +76,44 @@ class TestWebhookEndpoint:
         )
         
         assert response.status_code == 400
+    
+    @patch('linebot_module.application.api.process_message_event', new_callable=AsyncMock)
+    def test_webhook_valid_signature(self, mock_process, client):
+        """測試有效簽章的訊息事件被排入處理"""
+        response = client.post("/api/v1/webhook", **signed_webhook([text_event("e1")]))
+        
+        assert response.status_code == 200
+        wait_for_events(client, 1)
+        assert mock_process.call_count == 1
+        assert mock_process.call_args.args[0]["message"]["text"] == "Hello"
+    
+    @patch('linebot_module.application.api.process_message_event', new_callable=AsyncMock)
+    def test_webhook_drops_redelivered_event(self, mock_process, client):
+        """測試重送的事件只處理一次"""
+        client.post("/api/v1/webhook", **signed_webhook([text_event("dup")]))
+        client.post("/api/v1/webhook", **signed_webhook([text_event("dup", redelivery=True)]))
+        
+        wait_for_events(client, 1)
+        assert mock_process.call_count == 1
+        stats = client.get("/api/v1/webhook/stats").json()
+        assert stats["deduplication"]["redeliveries_dropped"] == 1
+    
+    @patch('linebot_module.application.api.process_message_event', new_callable=AsyncMock)
+    def test_webhook_full_queue_allows_redelivery(self, mock_process, client):
+        """測試佇列已滿時回應 503，且重送的事件仍會被處理"""
+        executor = client.app.state.event_executor
+        with patch.object(executor, "submit", return_value=False):
+            response = client.post("/api/v1/webhook", **signed_webhook([text_event("busy")]))
+        
+        assert response.status_code == 503
+        
+        response = client.post(
+            "/api/v1/webhook", **signed_webhook([text_event("busy", redelivery=True)])
+        )
+        
+        assert response.status_code == 200
+        wait_for_events(client, 1)
+        assert mock_process.call_count == 1
 
 
 class TestSendMessageEndpoint:
@@ -64,6 +151,22 @@ class TestSendMessageEndpoint:
         )
         
         assert response.status_code == 422  # Validation error
+    
+    def test_send_flex_unknown_template(self, client):
+        """測試指定未載入的 Flex 範本時回應失敗"""
+        response = client.post(
+            "/api/v1/send-message",
+            json={
+                "user_id": "user_001",
+                "message_type": "flex",
+                "template": "missing",
+                "params": {}
+            }
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["success"] is False
+        assert "missing" in response.json()["error_message"]
 
 
 class TestUserProfileEndpoint:
@@ -120,4 +223,200 @@ class TestHealthCheckEndpoint:
         data = response.json()
         assert data["status"] == "healthy"
         assert data["version"] == "1.0.0"
-        assert data["docs"] == "/docs"
\ No newline at end of file
+        assert data["docs"] == "/docs"
+
+class TestGracefulShutdown:
+    """測試關閉時的 webhook 拒絕與佇列清空"""
+    
+    @patch('linebot_module.application.api.process_message_event', new_callable=AsyncMock)
+    def test_webhook_rejected_while_draining(self, mock_process, client):
+        """測試關閉中回應 503 且事件未被記錄為已處理"""
+        client.app.state.draining = True
+        response = client.post("/api/v1/webhook", **signed_webhook([text_event("late")]))
+        client.app.state.draining = False
+        
+        assert response.status_code == 503
+        
+        response = client.post(
+            "/api/v1/webhook", **signed_webhook([text_event("late", redelivery=True)])
+        )
+        assert response.status_code == 200
+        wait_for_events(client, 1)
+        assert mock_process.call_count == 1
+    
+    def test_shutdown_drains_pending_events(self):
+        """測試關閉時先處理完已排入的事件"""
+        from main import app
+        
+        finished = []
+        
+        async def slow_job():
+            await asyncio.sleep(0.1)
+            finished.append(True)
+        
+        with TestClient(app) as test_client:
+            for i in range(3):
+                assert test_client.app.state.event_executor.submit(f"U{i}", slow_job)
+        
+        assert finished == [True, True, True]
+
+
+class TestAppLifespan:
+    """測試服務實例在應用程式生命週期內只建立一次"""
+
+    def test_service_reused_across_requests(self):
+        """測試所有請求共用啟動時建立的 LINE API 服務"""
+        from main import app
+
+        with patch.object(
+            LineApiService, "get_user_profile", autospec=True, return_value=None
+        ) as mock_get_profile:
+            with TestClient(app) as test_client:
+                for user_id in ("U1", "U2", "U3"):
+                    assert test_client.get(f"/api/v1/user/{user_id}").status_code == 404
+                service = test_client.app.state.line_api_service
+
+        instances = {id(call.args[0]) for call in mock_get_profile.call_args_list}
+        assert instances == {id(service)}
+
+    def test_service_closed_on_shutdown(self):
+        """測試關閉時釋放各 channel 的 LINE API 服務"""
+        from main import app
+
+        with patch.object(
+            LineApiService, "close", autospec=True, side_effect=LineApiService.close
+        ) as mock_close:
+            with TestClient(app) as test_client:
+                registry = test_client.app.state.channel_registry
+                services = [channel.line_api_service for channel in registry]
+                assert mock_close.await_count == 0
+
+        assert mock_close.await_count == len(services)
+        assert {id(call.args[0]) for call in mock_close.await_args_list} == set(map(id, services))
+
+
+class TestServerOptions:
+    """測試伺服器啟動參數"""
+    
+    def test_debug_mode_reloads(self):
+        """測試偵錯模式以單一行程自動重新載入"""
+        from main import server_options
+        
+        options = server_options(Settings(debug=True, server_workers=1))
+        
+        assert options["reload"] is True
+        assert options["workers"] is None
+    
+    def test_production_mode(self):
+        """測試正式環境模式的 worker 與連線設定"""
+        from main import server_options
+        
+        options = server_options(Settings(
+            debug=False, server_workers=4, server_keepalive_timeout=90,
+            server_limit_concurrency=500, server_graceful_shutdown_seconds=20
+        ))
+        
+        assert options["reload"] is False
+        assert options["workers"] == 4
+        assert options["timeout_keep_alive"] == 90
+        assert options["limit_concurrency"] == 500
+        assert options["timeout_graceful_shutdown"] == 20
+
+
+class TestWebhookSpoolMode:
+    """測試預寫日誌模式的 webhook"""
+    
+    @patch('linebot_module.application.api.process_message_event', new_callable=AsyncMock)
+    def test_webhook_spooled_then_processed(self, mock_process, tmp_path, monkeypatch):
+        """測試 webhook 寫入 spool 後回應，並由消費端處理"""
+        from main import app
+        
+        monkeypatch.setattr(settings, "webhook_spool_enabled", True)
+        monkeypatch.setattr(settings, "webhook_spool_dir", str(tmp_path))
+        
+        with TestClient(app) as test_client:
+            response = test_client.post(
+                "/api/v1/webhook", **signed_webhook([text_event("s1"), text_event("s2")])
+            )
+            
+            assert response.status_code == 200
+            wait_for_events(test_client, 2)
+            spool = test_client.get("/api/v1/webhook/stats").json()["spool"]
+        
+        assert mock_process.call_count == 2
+        assert spool["appended"] == 1
+        assert spool["completed"] == 1
+        assert spool["pending"] == 0
+
+
+class TestMultiChannelWebhook:
+    """測試多 channel 的 webhook 分派"""
+    
+    @pytest.fixture
+    def shop_client(self, monkeypatch):
+        """多設定一個 shop channel 的測試客戶端"""
+        from main import app
+        from linebot_module.config.settings import ChannelConfig
+        
+        monkeypatch.setattr(settings, "line_channels", [ChannelConfig(
+            channel_id="shop",
+            access_token="shop-token",
+            secret="shop-secret",
+            bot_user_id="Ushop",
+            handler="linebot_module.application.dependencies:DefaultMessageHandler"
+        )])
+        with TestClient(app) as test_client:
+            yield test_client
+    
+    @patch('linebot_module.application.api.process_message_event', new_callable=AsyncMock)
+    def test_route_by_path(self, mock_process, shop_client):
+        """測試依路徑分派並使用 channel 的處理器與路由器"""
+        response = shop_client.post(
+            "/api/v1/webhook/shop",
+            **signed_webhook([text_event("p1")], secret="shop-secret")
+        )
+        
+        assert response.status_code == 200
+        wait_for_events(shop_client, 1)
+        shop = shop_client.app.state.channel_registry.get("shop")
+        _, handler, router_service, *_ = mock_process.call_args.args
+        assert handler is shop.message_handler
+        assert router_service is shop.message_router
+    
+    @patch('linebot_module.application.api.process_message_event', new_callable=AsyncMock)
+    def test_route_by_destination(self, mock_process, shop_client):
+        """測試依 destination 分派，並以該 channel 的 secret 驗證簽章"""
+        response = shop_client.post(
+            "/api/v1/webhook",
+            **signed_webhook([text_event("d1")], secret="shop-secret", destination="Ushop")
+        )
+        
+        assert response.status_code == 200
+        wait_for_events(shop_client, 1)
+        shop = shop_client.app.state.channel_registry.get("shop")
+        assert mock_process.call_args.args[2] is shop.message_router
+    
+    def test_wrong_channel_secret(self, shop_client):
+        """測試以其他 channel 的 secret 簽章時拒絕"""
+        response = shop_client.post(
+            "/api/v1/webhook",
+            **signed_webhook([text_event("w1")], destination="Ushop")
+        )
+        
+        assert response.status_code == 400
+    
+    def test_unknown_destination(self, shop_client):
+        """測試 destination 不屬於簽章相符的 channel 時不改由 default channel 處理"""
+        response = shop_client.post(
+            "/api/v1/webhook", **signed_webhook([text_event("x1")], destination="Uother")
+        )
+        
+        assert response.status_code == 404
+    
+    def test_unknown_channel(self, shop_client):
+        """測試未設定的 channel 回應 404"""
+        response = shop_client.post(
+            "/api/v1/webhook/unknown", **signed_webhook([text_event("u1")])
+        )
+        
+        assert response.status_code == 404
@@ -0,0 +1,117 @@
+"""測試 LINE channel 登錄表"""
+
+import json
+
+import pytest
+
+from linebot_module.config.settings import ChannelConfig, Settings
+from linebot_module.application.dependencies import DefaultMessageHandler
+from linebot_module.application.services.channel_registry import (
+    DEFAULT_CHANNEL_ID, create_channel, create_channel_registry, load_message_handler
+)
+from linebot_module.infrastructure.user_state_store import UserStateStore
+
+
+def shop_config(**overrides) -> ChannelConfig:
+    """建立 shop channel 設定"""
+    values = {
+        "channel_id": "shop",
+        "access_token": "shop-token",
+        "secret": "shop-secret",
+        "bot_user_id": "Ushop",
+    }
+    values.update(overrides)
+    return ChannelConfig(**values)
+
+
+class TestChannelRegistry:
+    """測試 channel 建立與查找"""
+
+    @pytest.mark.asyncio
+    async def test_registry_from_settings(self, tmp_path):
+        """測試合併 default、line_channels 與設定檔中的 channel"""
+        channels_file = tmp_path / "channels.json"
+        channels_file.write_text(json.dumps([
+            {"channel_id": "news", "access_token": "news-token", "secret": "news-secret"}
+        ]))
+        config = Settings(
+            line_channel_access_token="default-token",
+            line_channel_secret="default-secret",
+            line_channels=[shop_config()],
+            line_channels_file=str(channels_file)
+        )
+
+        registry = create_channel_registry(config)
+
+        assert [channel.channel_id for channel in registry] == [DEFAULT_CHANNEL_ID, "shop", "news"]
+        assert registry.routes_by_destination
+        assert registry.for_destination("Ushop").channel_id == "shop"
+        assert registry.for_destination("Uother") is None
+        assert registry.get("news").line_api_service.access_token == "news-token"
+        await registry.stop(0)
+
+    @pytest.mark.asyncio
+    async def test_channels_have_separate_pools_and_limiters(self):
+        """測試各 channel 使用獨立的連線池與限流器"""
+        registry = create_channel_registry(Settings(
+            line_channel_secret="default-secret", line_channels=[shop_config(push_rate=5)]
+        ))
+        default, shop = registry.default, registry.get("shop")
+
+        assert default.line_api_service.http_client is not shop.line_api_service.http_client
+        assert shop.dispatcher.stats()["limiters"]["push"]["rate"] == 5
+        assert default.parser.verifier is not shop.parser.verifier
+        await registry.stop(0)
+
+    def test_duplicate_channel_rejected(self):
+        """測試重複的 channel ID 無法登錄"""
+        with pytest.raises(ValueError):
+            create_channel_registry(Settings(line_channels=[shop_config(), shop_config()]))
+
+    @pytest.mark.asyncio
+    async def test_default_channel_requires_secret(self):
+        """測試未設定 secret 時不建立 default channel，並依 destination 分派"""
+        registry = create_channel_registry(Settings(
+            line_channel_secret="", line_channels=[shop_config()]
+        ))
+
+        assert registry.default is None
+        assert [channel.channel_id for channel in registry] == ["shop"]
+        assert registry.routes_by_destination
+        await registry.stop(0)
+
+    def test_empty_secret_rejected(self):
+        """測試沒有 secret 的 channel 無法建立"""
+        with pytest.raises(ValueError):
+            create_channel_registry(Settings(line_channels=[shop_config(secret="")]))
+        with pytest.raises(ValueError):
+            create_channel_registry(Settings(line_channel_secret="", line_channels=[]))
+
+    @pytest.mark.asyncio
+    async def test_channel_handler(self):
+        """測試依匯入路徑建立 channel 的處理器"""
+        channel = create_channel(shop_config(
+            handler="linebot_module.application.dependencies:DefaultMessageHandler"
+        ))
+
+        assert isinstance(channel.message_handler, DefaultMessageHandler)
+        await channel.line_api_service.close()
+
+    @pytest.mark.asyncio
+    async def test_channel_user_service(self, tmp_path):
+        """測試 channel 的使用者服務綁定該 channel"""
+        store = UserStateStore(str(tmp_path / "state.db"))
+        channel = create_channel(shop_config(), user_state_store=store)
+
+        assert channel.user_service.channel_id == "shop"
+        assert channel.user_service.store is store
+        await channel.line_api_service.close()
+
+        channel = create_channel(shop_config())
+        assert channel.user_service is None
+        await channel.line_api_service.close()
+
+    def test_invalid_handler(self):
+        """測試匯入路徑不是訊息處理器時拒絕"""
+        with pytest.raises(TypeError):
+            load_message_handler("linebot_module.config.settings:Settings")
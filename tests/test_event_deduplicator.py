@@ -0,0 +1,74 @@
+"""測試 webhook 事件去重"""
+
+import time
+
+from linebot_module.application.services.event_deduplicator import EventDeduplicator
+
+
+def make_event(event_id: str, redelivery: bool = False) -> dict:
+    """建立 webhook 事件"""
+    return {
+        "type": "message",
+        "webhookEventId": event_id,
+        "deliveryContext": {"isRedelivery": redelivery},
+        "message": {"id": f"msg-{event_id}", "type": "text", "text": "hi"},
+    }
+
+
+class TestEventDeduplicator:
+    """測試時間窗去重"""
+
+    def test_drops_redelivered_event(self):
+        """測試丟棄重送事件"""
+        dedup = EventDeduplicator(window_seconds=60, max_entries=100)
+
+        assert dedup.is_duplicate(make_event("e1")) is False
+        assert dedup.is_duplicate(make_event("e1", redelivery=True)) is True
+        assert dedup.is_duplicate(make_event("e2", redelivery=True)) is False
+
+        stats = dedup.stats()
+        assert stats["duplicates_dropped"] == 1
+        assert stats["redeliveries"] == 2
+        assert stats["redeliveries_dropped"] == 1
+
+    def test_bounded_by_max_entries(self):
+        """測試記錄數不超過上限"""
+        dedup = EventDeduplicator(window_seconds=60, max_entries=3)
+
+        for i in range(10):
+            dedup.is_duplicate(make_event(f"e{i}"))
+
+        assert dedup.stats()["tracked_ids"] == 3
+        assert dedup.is_duplicate(make_event("e9")) is True
+        assert dedup.is_duplicate(make_event("e0")) is False
+
+    def test_expires_after_window(self):
+        """測試超過時間窗後不再視為重複"""
+        dedup = EventDeduplicator(window_seconds=0.01, max_entries=100)
+
+        dedup.is_duplicate(make_event("e1"))
+        time.sleep(0.02)
+
+        assert dedup.is_duplicate(make_event("e1")) is False
+
+    def test_falls_back_to_message_id(self):
+        """測試沒有 webhookEventId 時使用訊息 ID"""
+        dedup = EventDeduplicator(window_seconds=60, max_entries=100)
+        event = make_event("e1")
+        del event["webhookEventId"]
+
+        assert dedup.is_duplicate(event) is False
+        assert dedup.is_duplicate(dict(event)) is True
+
+    def test_forget_then_record_again(self):
+        """測試 forget 後重新記錄的 ID 不會因舊紀錄被移除而遺失"""
+        dedup = EventDeduplicator(window_seconds=60, max_entries=2)
+
+        dedup.is_duplicate(make_event("e1"))
+        dedup.forget(make_event("e1"))
+        assert dedup.is_duplicate(make_event("e1", redelivery=True)) is False
+
+        # 環狀佇列超過上限，移除 e1 的舊紀錄
+        dedup.is_duplicate(make_event("e2"))
+
+        assert dedup.is_duplicate(make_event("e1", redelivery=True)) is True
@@ -0,0 +1,115 @@
+"""測試 webhook 事件執行器"""
+
+import asyncio
+
+import pytest
+
+from linebot_module.application.services.event_executor import (
+    EventExecutor, conversation_key
+)
+
+
+class TestEventExecutor:
+    """測試分片執行與背壓"""
+
+    @pytest.mark.asyncio
+    async def test_same_conversation_runs_in_order(self):
+        """測試同一對話的事件依序執行"""
+        executor = EventExecutor(workers=4, queue_size=10)
+        await executor.start()
+        order = []
+
+        def job(i):
+            async def run():
+                await asyncio.sleep(0.01 if i == 0 else 0)
+                order.append(i)
+            return run
+
+        for i in range(3):
+            assert executor.submit("U1", job(i))
+        await executor.stop()
+
+        assert order == [0, 1, 2]
+        assert executor.stats()["completed"] == 3
+
+    @pytest.mark.asyncio
+    async def test_conversations_run_in_parallel(self):
+        """測試不同對話的事件平行執行"""
+        executor = EventExecutor(workers=8, queue_size=10)
+        await executor.start()
+        keys = [f"U{i}" for i in range(50)]
+        shards = {executor._shard(key) for key in keys}
+        running = 0
+        peak = 0
+
+        async def job():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        for key in keys:
+            executor.submit(key, job)
+        await executor.stop()
+
+        assert peak == len(shards) > 1
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_shard_full(self):
+        """測試分片佇列已滿時拒絕事件，且失敗的事件不影響 worker"""
+        executor = EventExecutor(workers=1, queue_size=1)
+        await executor.start()
+        release = asyncio.Event()
+
+        async def blocking():
+            await release.wait()
+            raise RuntimeError("handler error")
+
+        async def noop():
+            pass
+
+        assert executor.submit("U1", blocking)
+        await asyncio.sleep(0)
+        assert executor.submit("U1", noop)
+        assert not executor.submit("U1", noop)
+
+        release.set()
+        await executor.stop()
+
+        stats = executor.stats()
+        assert (stats["completed"], stats["failed"], stats["rejected"]) == (1, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_earliest_deadline_runs_first(self):
+        """測試同一分片中截止時間較早的事件優先執行"""
+        executor = EventExecutor(workers=1, queue_size=10)
+        await executor.start()
+        release = asyncio.Event()
+        order = []
+
+        async def blocking():
+            await release.wait()
+
+        def job(name):
+            async def run():
+                order.append(name)
+            return run
+
+        executor.submit("U1", blocking)
+        await asyncio.sleep(0)
+        executor.submit("U2", job("late"), deadline=200.0)
+        executor.submit("U3", job("no-deadline"))
+        executor.submit("U4", job("early"), deadline=100.0)
+
+        release.set()
+        await executor.stop()
+
+        assert order == ["early", "late", "no-deadline"]
+
+    def test_conversation_key_prefers_group(self):
+        """測試群組事件以群組 ID 分片"""
+        event = {"source": {"type": "group", "groupId": "G1", "userId": "U1"}}
+
+        assert conversation_key(event) == "G1"
+        assert conversation_key({"source": {"userId": "U1"}}) == "U1"
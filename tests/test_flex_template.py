@@ -0,0 +1,128 @@
+"""測試 Flex 訊息範本"""
+
+import json
+
+import httpx
+import pytest
+
+from linebot_module.domain.models import MessageType, OutboundFlexMessage, SendMessageRequest
+from linebot_module.infrastructure.flex_template import (
+    FlexTemplate, FlexTemplateError, FlexTemplateRegistry
+)
+from linebot_module.infrastructure.http_client import HttpxAsyncHttpClient
+from linebot_module.infrastructure.line_api_service import LineApiService
+
+
+ORDER_CONTENTS = {
+    "type": "bubble",
+    "body": {
+        "type": "box",
+        "layout": "vertical",
+        "contents": [
+            {"type": "text", "text": "訂單 #{{ order_id }}", "weight": "bold"},
+            {"type": "box", "layout": "vertical", "contents": "{{ items }}"},
+            {"type": "separator"},
+            {"type": "text", "text": "感謝您的購買"},
+        ],
+    },
+}
+
+
+def order_template() -> FlexTemplate:
+    return FlexTemplate("order", "訂單 {{ order_id }} 已成立", ORDER_CONTENTS)
+
+
+class TestFlexTemplate:
+    """測試範本編譯、驗證與渲染"""
+
+    def test_render_parameters(self):
+        """測試字串內插與整值取代"""
+        items = [{"type": "text", "text": "咖啡 x1"}]
+        contents = order_template().render({"order_id": 42, "items": items})
+
+        body = contents["body"]["contents"]
+        assert body[0]["text"] == "訂單 #42"
+        assert body[1]["contents"] is items
+        assert order_template().parameters == {"order_id", "items"}
+
+    def test_static_fragments_shared(self):
+        """測試不含參數的子樹直接共用，範本本身不被修改"""
+        template = order_template()
+        first = template.render({"order_id": 1, "items": []})
+        second = template.render({"order_id": 2, "items": []})
+
+        assert first["body"]["contents"][3] is second["body"]["contents"][3]
+        assert first["body"]["contents"][0] is not second["body"]["contents"][0]
+        assert template.contents["body"]["contents"][0]["text"] == "訂單 #{{ order_id }}"
+
+    def test_missing_parameter(self):
+        """測試缺少參數時拒絕渲染"""
+        with pytest.raises(FlexTemplateError, match="items"):
+            order_template().render({"order_id": 1})
+
+    def test_validated_once_at_load(self):
+        """測試載入時即拒絕不符合規格的範本"""
+        with pytest.raises(FlexTemplateError, match="layout"):
+            FlexTemplate("bad", "alt", {"type": "bubble", "body": {"type": "box", "contents": []}})
+        with pytest.raises(FlexTemplateError):
+            FlexTemplate("bad", "alt", {"type": "text", "text": "not a container"})
+        with pytest.raises(FlexTemplateError):
+            FlexTemplate("bad", "", {"type": "bubble"})
+
+    def test_message_for_handler(self):
+        """測試渲染為可由處理器回傳的發送訊息"""
+        message = order_template().message({"order_id": 7, "items": []})
+
+        assert isinstance(message, OutboundFlexMessage)
+        assert message.alt_text == "訂單 7 已成立"
+        assert message.message_type == MessageType.FLEX
+
+    def test_registry_from_directory(self, tmp_path):
+        """測試由目錄載入範本"""
+        (tmp_path / "order.json").write_text(
+            json.dumps({"altText": "訂單 {{ order_id }}", "contents": ORDER_CONTENTS}),
+            encoding="utf-8"
+        )
+        registry = FlexTemplateRegistry.from_directory(str(tmp_path))
+
+        assert "order" in registry
+        assert registry.stats() == {"order": ["items", "order_id"]}
+        with pytest.raises(FlexTemplateError):
+            registry.get("missing")
+
+
+class TestFlexSending:
+    """測試以範本發送 Flex 訊息"""
+
+    @pytest.mark.asyncio
+    async def test_bulk_send_renders_template(self):
+        """測試批次發送依範本渲染，相同參數合併為 multicast"""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={})
+
+        registry = FlexTemplateRegistry()
+        registry.register(order_template())
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        service = LineApiService(HttpxAsyncHttpClient(client), flex_templates=registry)
+        params = {"order_id": 9, "items": [{"type": "text", "text": "茶 x2"}]}
+
+        results, api_calls = await service.send_bulk_messages([
+            SendMessageRequest(user_id=user_id, message_type="flex", template="order", params=params)
+            for user_id in ("U1", "U2")
+        ] + [
+            SendMessageRequest(user_id="U3", message_type="flex", template="order", params={})
+        ])
+        await service.close()
+
+        assert api_calls == 2
+        assert [r.success for r in results] == [True, True, False]
+        assert "order_id" in results[2].error_message
+        body = json.loads(requests[0].content)
+        message = body["messages"][0]
+        assert body["to"] == ["U1", "U2"]
+        assert message["type"] == "flex"
+        assert message["altText"] == "訂單 9 已成立"
+        assert message["contents"]["body"]["contents"][1]["contents"][0]["text"] == "茶 x2"
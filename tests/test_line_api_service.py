@@ -0,0 +1,294 @@
+"""測試 LINE API 服務"""
+
+import json
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from linebot_module.config.settings import settings
+from linebot_module.infrastructure.http_client import HttpxAsyncHttpClient
+from linebot_module.infrastructure.line_api_service import LineApiService
+from linebot_module.infrastructure.metrics import line_api_calls, line_api_duration
+
+
+def build_service(handler) -> LineApiService:
+    """建立使用模擬傳輸層的 LINE API 服務"""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return LineApiService(HttpxAsyncHttpClient(client))
+
+
+class TestLineApiService:
+    """測試以 httpx 實作的非同步 LINE API 呼叫"""
+
+    @pytest.mark.asyncio
+    async def test_send_text_message_success(self):
+        """測試推播文字訊息"""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={})
+
+        service = build_service(handler)
+        result = await service.send_text_message("user_001", "Hello")
+        await service.close()
+
+        assert result.success is True
+        assert requests[0].url.path == "/v2/bot/message/push"
+        body = json.loads(requests[0].content)
+        assert body["to"] == "user_001"
+        assert body["messages"][0]["text"] == "Hello"
+
+    @pytest.mark.asyncio
+    async def test_push_retry_reuses_retry_key(self):
+        """測試 push 重試時沿用同一個 X-Line-Retry-Key"""
+        from linebot_module.infrastructure.outbound_dispatcher import (
+            EndpointClass, OutboundDispatcher, TokenBucket
+        )
+
+        keys = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            keys.append(request.headers.get("X-Line-Retry-Key"))
+            return httpx.Response(500 if len(keys) == 1 else 200, json={"message": "error"})
+
+        dispatcher = OutboundDispatcher(
+            limiters={endpoint_class: TokenBucket(1000) for endpoint_class in EndpointClass},
+            retry_base_delay=0.01
+        )
+        await dispatcher.start()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        service = LineApiService(HttpxAsyncHttpClient(client), dispatcher=dispatcher)
+        result = await service.send_text_message("user_001", "Hello")
+        await dispatcher.stop()
+        await service.close()
+
+        assert result.success is True
+        assert len(keys) == 2
+        assert keys[0] and keys[0] == keys[1]
+
+    @pytest.mark.asyncio
+    async def test_throttled_reply_not_retried_past_deadline(self):
+        """測試 reply 被限流且 Retry-After 超過回覆期限時不重試"""
+        import time
+
+        from linebot_module.domain.models import OutboundTextMessage
+        from linebot_module.infrastructure.outbound_dispatcher import (
+            DEADLINE_EXCEEDED, EndpointClass, OutboundDispatcher, TokenBucket
+        )
+
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(429, headers={"Retry-After": "30"}, json={"message": "error"})
+
+        dispatcher = OutboundDispatcher(
+            limiters={endpoint_class: TokenBucket(1000) for endpoint_class in EndpointClass}
+        )
+        await dispatcher.start()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        service = LineApiService(HttpxAsyncHttpClient(client), dispatcher=dispatcher)
+        result = await service.reply_messages(
+            "token", [OutboundTextMessage(text="Hello")], deadline=time.time() + 5
+        )
+        await dispatcher.stop()
+        await service.close()
+
+        assert result.success is False
+        assert DEADLINE_EXCEEDED in result.error_message
+        assert len(requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_send_text_message_api_error(self):
+        """測試 LINE API 回傳錯誤"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(400, json={"message": "The request body has 1 error(s)"})
+
+        service = build_service(handler)
+        result = await service.send_text_message("user_001", "Hello")
+        await service.close()
+
+        assert result.success is False
+        assert result.error_message
+
+    @pytest.mark.asyncio
+    async def test_api_endpoint_is_configurable(self):
+        """測試 LINE API 基底網址可由設定指向模擬伺服器"""
+        urls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            urls.append(str(request.url))
+            return httpx.Response(200, json={})
+
+        with patch.object(settings, "line_api_endpoint", "http://127.0.0.1:9000"):
+            service = build_service(handler)
+        await service.send_text_message("user_001", "Hello")
+        await service.close()
+
+        assert urls == ["http://127.0.0.1:9000/v2/bot/message/push"]
+
+    @pytest.mark.asyncio
+    async def test_api_calls_are_recorded_by_status(self):
+        """測試 LINE API 呼叫依結果記錄指標"""
+        statuses = iter([200, 400])
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(next(statuses), json={"message": "error"})
+
+        ok = line_api_calls.labels("push", "ok").value
+        bad = line_api_calls.labels("push", "400").value
+        observed = line_api_duration.labels("push").count
+
+        service = build_service(handler)
+        await service.send_text_message("user_001", "Hello")
+        await service.send_text_message("user_001", "Hello")
+        await service.close()
+
+        assert line_api_calls.labels("push", "ok").value == ok + 1
+        assert line_api_calls.labels("push", "400").value == bad + 1
+        assert line_api_duration.labels("push").count == observed + 2
+
+    @pytest.mark.asyncio
+    async def test_get_user_profile(self):
+        """測試取得使用者資料"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={
+                "userId": "user_001",
+                "displayName": "Test User",
+                "pictureUrl": "https://example.com/avatar.jpg"
+            })
+
+        service = build_service(handler)
+        user = await service.get_user_profile("user_001")
+        await service.close()
+
+        assert user is not None
+        assert user.display_name == "Test User"
+
+    @pytest.mark.asyncio
+    async def test_get_message_content(self):
+        """測試取得訊息內容"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.url.host == "api-data.line.me"
+            return httpx.Response(200, content=b"\x89PNG" * 1000)
+
+        service = build_service(handler)
+        content = await service.get_message_content("msg_001")
+        await service.close()
+
+        assert content == b"\x89PNG" * 1000
+
+    @pytest.mark.asyncio
+    async def test_iter_message_content_streams_chunks(self):
+        """測試逐塊串流訊息內容"""
+        payload = b"x" * (200 * 1024)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=payload, headers={"content-type": "video/mp4"})
+
+        service = build_service(handler)
+        chunks = [chunk async for chunk in service.iter_message_content("msg_001", 64 * 1024)]
+        await service.close()
+
+        assert b"".join(chunks) == payload
+        assert len(chunks) > 1
+
+    @pytest.mark.asyncio
+    async def test_compressed_content_has_no_length(self):
+        """測試壓縮編碼的內容不回報標頭中的大小 (迭代取得的是解碼後內容)"""
+        import gzip
+
+        payload = b"x" * 4096
+        compressed = gzip.compress(payload)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=compressed, headers={
+                "content-encoding": "gzip", "content-length": str(len(compressed)),
+            })
+
+        service = build_service(handler)
+        stream = await service.open_message_content("msg_001")
+        chunks = [chunk async for chunk in stream]
+        await service.close()
+
+        assert stream.content_length is None
+        assert b"".join(chunks) == payload
+
+    @pytest.mark.asyncio
+    async def test_content_error_without_json_body(self):
+        """測試錯誤回應不是 JSON 時仍回報 LINE API 錯誤"""
+        from linebot.exceptions import LineBotApiError
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(502, text="<html>Bad Gateway</html>")
+
+        service = build_service(handler)
+        with pytest.raises(LineBotApiError) as excinfo:
+            await service.open_message_content("msg_001")
+        await service.close()
+
+        assert excinfo.value.status_code == 502
+        assert "Bad Gateway" in excinfo.value.error.message
+
+    @pytest.mark.asyncio
+    async def test_save_message_content(self, tmp_path):
+        """測試將訊息內容寫入檔案"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=b"audio-bytes")
+
+        service = build_service(handler)
+        target = tmp_path / "msg_001.m4a"
+        size = await service.save_message_content("msg_001", target)
+        await service.close()
+
+        assert size == len(b"audio-bytes")
+        assert target.read_bytes() == b"audio-bytes"
+
+    @pytest.mark.asyncio
+    async def test_save_message_content_not_found(self, tmp_path):
+        """測試內容不存在時不留下檔案"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(404, json={"message": "Not found"})
+
+        service = build_service(handler)
+        target = tmp_path / "missing.jpg"
+        size = await service.save_message_content("missing", target)
+        await service.close()
+
+        assert size is None
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_send_bulk_messages_coalesces_multicast(self):
+        """測試相同內容合併為 multicast 呼叫"""
+        from linebot_module.domain.models import SendMessageRequest
+
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append((request.url.path, json.loads(request.content)))
+            return httpx.Response(200, json={})
+
+        service = build_service(handler)
+        requests = [
+            SendMessageRequest(user_id=f"U{i}", message_type="text", content="活動通知")
+            for i in range(1200)
+        ] + [
+            SendMessageRequest(user_id="U_solo", message_type="text", content="個人訊息"),
+            SendMessageRequest(user_id="U_img", message_type="image", content="x"),
+        ]
+
+        results, api_calls = await service.send_bulk_messages(requests)
+        await service.close()
+
+        multicasts = [body for path, body in calls if path == "/v2/bot/message/multicast"]
+        pushes = [body for path, body in calls if path == "/v2/bot/message/push"]
+        assert api_calls == 4
+        assert sorted(len(body["to"]) for body in multicasts) == [200, 500, 500]
+        assert pushes[0]["to"] == "U_solo"
+        assert len(results) == len(requests)
+        assert all(result.success for result in results[:-1])
+        assert results[-1].success is False
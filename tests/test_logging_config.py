@@ -0,0 +1,64 @@
+"""測試日誌設定"""
+
+import io
+import json
+
+import pytest
+
+from linebot_module.config.logging_config import get_logger, setup_logging
+from linebot_module.config.settings import Settings
+
+
+@pytest.fixture
+def restore_logging():
+    """測試結束後恢復預設日誌設定"""
+    yield
+    setup_logging(Settings())
+
+
+def configure(**overrides) -> io.StringIO:
+    """以指定設定初始化日誌並回傳輸出緩衝區"""
+    stream = io.StringIO()
+    setup_logging(Settings(**overrides), stream)
+    return stream
+
+
+class TestLoggingConfig:
+    """測試取樣與 JSON 輸出"""
+
+    def test_sampling_keeps_errors(self, restore_logging):
+        """測試取樣比例為 0 時丟棄成功日誌但保留錯誤日誌"""
+        stream = configure(log_sample_rates={"webhook": 0.0})
+        log = get_logger("webhook")
+
+        log.info("收到 {}", "事件")
+        log.error("處理失敗")
+        get_logger("router").info("路由 {}", "訊息")
+
+        output = stream.getvalue()
+        assert "收到" not in output
+        assert "處理失敗" in output
+        assert "路由 訊息" in output
+
+    def test_json_output(self, restore_logging):
+        """測試結構化 JSON 輸出包含類別與呼叫位置"""
+        stream = configure(log_format="json")
+
+        get_logger("line_api").info("成功推播 {} 則訊息", 3)
+
+        record = json.loads(stream.getvalue().strip())
+        assert record["message"] == "成功推播 3 則訊息"
+        assert record["level"] == "INFO"
+        assert record["category"] == "line_api"
+        assert record["function"] == "test_json_output"
+
+    def test_enqueued_sink(self, restore_logging):
+        """測試背景執行緒寫出的日誌在 complete 後可見"""
+        from loguru import logger
+
+        stream = configure(log_format="json", log_enqueue=True)
+
+        get_logger("webhook").warning("佇列已滿")
+        logger.complete()
+
+        assert json.loads(stream.getvalue().strip())["message"] == "佇列已滿"
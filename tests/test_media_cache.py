@@ -0,0 +1,103 @@
+"""測試訊息內容磁碟快取"""
+
+import asyncio
+
+import pytest
+
+from linebot_module.infrastructure.media_cache import MediaCache
+
+
+def make_downloader(payloads: dict, calls: list, delay: float = 0):
+    """建立將指定內容寫入檔案的下載函式"""
+    async def downloader(message_id, path):
+        calls.append(message_id)
+        await asyncio.sleep(delay)
+        path.write_bytes(payloads[message_id])
+        return "image/jpeg"
+    return downloader
+
+
+class TestMediaCache:
+    """測試快取命中、淘汰與並行下載"""
+
+    @pytest.mark.asyncio
+    async def test_hit_after_miss(self, tmp_path):
+        """測試第二次取得時命中快取"""
+        calls = []
+        cache = MediaCache(str(tmp_path), max_bytes=1024, ttl_seconds=60)
+        downloader = make_downloader({"m1": b"abc"}, calls)
+
+        first = await cache.fetch("m1", downloader)
+        second = await cache.fetch("m1", downloader)
+
+        assert first.read_bytes() == b"abc"
+        assert second.path == first.path
+        assert first.content_type == "image/jpeg"
+        assert calls == ["m1"]
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_download(self, tmp_path):
+        """測試並行未命中只下載一次"""
+        calls = []
+        cache = MediaCache(str(tmp_path), max_bytes=1024, ttl_seconds=60)
+        downloader = make_downloader({"m1": b"abc"}, calls, delay=0.01)
+
+        entries = await asyncio.gather(*(cache.fetch("m1", downloader) for _ in range(5)))
+
+        assert calls == ["m1"]
+        assert all(entry.read_bytes() == b"abc" for entry in entries)
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_by_size(self, tmp_path):
+        """測試超過容量時淘汰最久未使用的項目"""
+        calls = []
+        cache = MediaCache(str(tmp_path), max_bytes=10, ttl_seconds=60)
+        downloader = make_downloader({"m1": b"1234", "m2": b"5678", "m3": b"9012"}, calls)
+
+        await cache.fetch("m1", downloader)
+        await cache.fetch("m2", downloader)
+        await cache.fetch("m1", downloader)
+        await cache.fetch("m3", downloader)
+
+        assert cache.get("m2") is None
+        assert cache.get("m1") is not None
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] == 8
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiration(self, tmp_path):
+        """測試過期項目重新下載"""
+        calls = []
+        cache = MediaCache(str(tmp_path), max_bytes=1024, ttl_seconds=0)
+        downloader = make_downloader({"m1": b"abc"}, calls)
+
+        await cache.fetch("m1", downloader)
+        await asyncio.sleep(0.01)
+        await cache.fetch("m1", downloader)
+
+        assert calls == ["m1", "m1"]
+        assert cache.stats()["expirations"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_download(self, tmp_path):
+        """測試下載失敗時回傳 None 且不留下暫存檔"""
+        cache = MediaCache(str(tmp_path), max_bytes=1024, ttl_seconds=60)
+
+        async def downloader(message_id, path):
+            path.write_bytes(b"partial")
+            raise RuntimeError("boom")
+
+        assert await cache.fetch("m1", downloader) is None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_reload_existing_files(self, tmp_path):
+        """測試重新啟動時載入既有快取檔案"""
+        (tmp_path / "m1.jpg").write_bytes(b"abc")
+
+        cache = MediaCache(str(tmp_path), max_bytes=1024, ttl_seconds=60)
+
+        entry = cache.get("m1")
+        assert entry is not None
+        assert entry.read_bytes() == b"abc"
@@ -0,0 +1,212 @@
+"""測試媒體託管"""
+
+import asyncio
+import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from linebot_module.config.settings import settings
+from linebot_module.infrastructure import media_store as media_store_module
+from linebot_module.infrastructure.http_client import HttpxAsyncHttpClient
+from linebot_module.infrastructure.line_api_service import LineApiService
+from linebot_module.infrastructure.media_store import MediaStore, MediaStoreError
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+JPEG = b"\xff\xd8\xff\xe0" + bytes(range(256)) * 4
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    """以複製檔案取代 Pillow 產生預覽圖，記錄呼叫次數"""
+    calls = []
+
+    def fake_render(source, target, max_dimension, max_bytes):
+        calls.append(source)
+        shutil.copyfile(source, target)
+
+    monkeypatch.setattr(media_store_module, "render_preview", fake_render)
+    return calls
+
+
+class TestMediaStore:
+    """測試內容定址儲存與預覽圖產生"""
+
+    @pytest.mark.asyncio
+    async def test_identical_images_rendered_once(self, tmp_path, rendered):
+        """測試相同內容 (含並行上傳) 只儲存與產生預覽圖一次"""
+        with ThreadPoolExecutor(1) as executor:
+            store = MediaStore(str(tmp_path), "https://bot.example.com/api/v1/media", executor=executor)
+            store.start()
+            assets = await asyncio.gather(*(store.store(JPEG) for _ in range(5)))
+
+        assert len(rendered) == 1
+        assert len({asset.digest for asset in assets}) == 1
+        asset = assets[0]
+        assert asset.original_name == f"{asset.digest}.jpg"
+        assert asset.preview_name == f"{asset.digest}.preview.jpg"
+        assert store.url_for(asset.preview_name).startswith("https://bot.example.com/api/v1/media/")
+        assert store.stats()["stored"] == 1
+
+    @pytest.mark.asyncio
+    async def test_existing_files_not_rendered_again(self, tmp_path, rendered):
+        """測試重新啟動後已存在的預覽圖不重新產生"""
+        source = tmp_path / "photo.png"
+        source.write_bytes(PNG)
+        with ThreadPoolExecutor(1) as executor:
+            first = MediaStore(str(tmp_path / "hosted"), executor=executor)
+            first.start()
+            await first.store(source)
+
+            second = MediaStore(str(tmp_path / "hosted"), executor=executor)
+            second.start()
+            asset = await second.store(str(source))
+
+        assert len(rendered) == 1
+        assert asset.content_type == "image/png"
+
+    @pytest.mark.asyncio
+    async def test_without_renderer_uses_original(self, tmp_path, monkeypatch):
+        """測試無法產生預覽圖時以不超過上限的原圖作為預覽圖"""
+        monkeypatch.setattr(media_store_module, "PILLOW_AVAILABLE", False)
+        store = MediaStore(str(tmp_path))
+        store.start()
+
+        asset = await store.store(PNG)
+
+        assert asset.preview_name == asset.original_name
+
+        monkeypatch.setattr(media_store_module, "MAX_PREVIEW_BYTES", 10)
+        with pytest.raises(MediaStoreError):
+            await store.store(JPEG)
+
+    @pytest.mark.asyncio
+    async def test_render_failure_is_media_error(self, tmp_path, monkeypatch):
+        """測試預覽圖產生失敗 (無法解碼、行程異常結束) 時回報 MediaStoreError"""
+        from concurrent.futures.process import BrokenProcessPool
+
+        errors = [OSError("cannot identify image file"), BrokenProcessPool("worker died")]
+
+        def failing_render(source, target, max_dimension, max_bytes):
+            raise errors.pop(0)
+
+        monkeypatch.setattr(media_store_module, "render_preview", failing_render)
+        with ThreadPoolExecutor(1) as executor:
+            store = MediaStore(str(tmp_path), executor=executor)
+            store.start()
+            with pytest.raises(MediaStoreError, match="無法產生預覽圖"):
+                await store.store(JPEG)
+            with pytest.raises(MediaStoreError):
+                await store.store(PNG)
+
+        assert store.stats()["previews_rendered"] == 0
+
+    @pytest.mark.asyncio
+    async def test_rejects_unsupported_format(self, tmp_path):
+        """測試拒絕 JPEG / PNG 以外的內容"""
+        store = MediaStore(str(tmp_path))
+
+        with pytest.raises(MediaStoreError):
+            await store.store(b"GIF89a....")
+
+    @pytest.mark.asyncio
+    async def test_render_preview_with_pillow(self, tmp_path):
+        """測試以 Pillow 縮小預覽圖"""
+        image_module = pytest.importorskip("PIL.Image")
+        source = tmp_path / "large.png"
+        image_module.new("RGBA", (1200, 800), (255, 0, 0, 128)).save(source)
+
+        target = tmp_path / "preview.jpg"
+        media_store_module.render_preview(str(source), str(target), 240, 1024 * 1024)
+
+        with image_module.open(target) as preview:
+            assert preview.format == "JPEG"
+            assert max(preview.size) == 240
+
+    @pytest.mark.asyncio
+    async def test_send_image_from_bytes(self, tmp_path, rendered):
+        """測試發送圖片時以託管網址補上原圖與預覽圖網址"""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={})
+
+        with ThreadPoolExecutor(1) as executor:
+            store = MediaStore(str(tmp_path), "https://bot.example.com/api/v1/media", executor=executor)
+            store.start()
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            service = LineApiService(HttpxAsyncHttpClient(client), media_store=store)
+            result = await service.send_image_message("user_001", image=JPEG)
+            await service.close()
+
+        assert result.success is True
+        message = json.loads(requests[0].content)["messages"][0]
+        assert message["originalContentUrl"].endswith(".jpg")
+        assert message["previewImageUrl"].endswith(".preview.jpg")
+
+
+class TestMediaEndpoints:
+    """測試媒體上傳與下載端點"""
+
+    @pytest.fixture
+    def media_client(self, tmp_path, monkeypatch, rendered):
+        """啟用媒體託管 (以執行緒產生預覽圖) 的測試客戶端"""
+        from main import app
+
+        monkeypatch.setattr(settings, "media_store_enabled", True)
+        monkeypatch.setattr(settings, "media_store_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "media_public_base_url", "https://bot.example.com")
+        monkeypatch.setattr(media_store_module, "PILLOW_AVAILABLE", True)
+        monkeypatch.setattr(media_store_module, "ProcessPoolExecutor", ThreadPoolExecutor)
+        with TestClient(app) as test_client:
+            yield test_client
+
+    def test_upload_and_fetch(self, media_client):
+        """測試上傳後以回傳的網址取得內容，ETag 相符時回應 304"""
+        response = media_client.post("/api/v1/media", content=JPEG)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["original_content_url"].startswith("https://bot.example.com/api/v1/media/")
+        path = body["original_content_url"].removeprefix("https://bot.example.com")
+
+        fetched = media_client.get(path)
+        assert fetched.status_code == 200
+        assert fetched.content == JPEG
+        assert "immutable" in fetched.headers["cache-control"]
+
+        cached = media_client.get(path, headers={"If-None-Match": fetched.headers["etag"]})
+        assert cached.status_code == 304
+
+    def test_range_requests(self, media_client):
+        """測試單一區段 Range 回應 206，超出範圍回應 416"""
+        path = media_client.post("/api/v1/media", content=JPEG).json()["original_content_url"]
+        path = path.removeprefix("https://bot.example.com")
+
+        partial = media_client.get(path, headers={"Range": "bytes=4-13"})
+        assert partial.status_code == 206
+        assert partial.content == JPEG[4:14]
+        assert partial.headers["content-range"] == f"bytes 4-13/{len(JPEG)}"
+
+        suffix = media_client.get(path, headers={"Range": "bytes=-16"})
+        assert suffix.content == JPEG[-16:]
+
+        invalid = media_client.get(path, headers={"Range": f"bytes={len(JPEG)}-"})
+        assert invalid.status_code == 416
+        assert invalid.headers["content-range"] == f"bytes */{len(JPEG)}"
+
+    def test_upload_rejects_unsupported_format(self, media_client):
+        """測試上傳非圖片內容時回應 400"""
+        response = media_client.post("/api/v1/media", content=b"not an image")
+
+        assert response.status_code == 400
+
+    def test_unknown_media(self, media_client):
+        """測試不存在或不合法的檔名回應 404"""
+        assert media_client.get("/api/v1/media/missing.jpg").status_code == 404
+        assert media_client.get("/api/v1/media/..%2Fsecret").status_code == 404
@@ -0,0 +1,242 @@
+"""測試訊息路由服務"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from linebot_module.application.services.message_router import MessageRouterService
+from linebot_module.domain.models import (
+    BaseMessage, FileMessage, OutboundImageMessage, OutboundTextMessage,
+    SendMessageResponse, TextMessage
+)
+from linebot_module.infrastructure.line_api_service import LineApiService
+from linebot_module.infrastructure.outbound_dispatcher import DEADLINE_EXCEEDED
+from linebot_module.interfaces.message_handler import IMessageHandler
+
+
+class StaticHandler(IMessageHandler):
+    """回傳固定內容的訊息處理器"""
+
+    def __init__(self, response):
+        self.response = response
+
+    async def handle_text_message(self, message):
+        return self.response
+
+    async def handle_image_message(self, message):
+        return None
+
+
+def make_line_api_service() -> MagicMock:
+    """建立模擬的 LINE API 服務"""
+    service = MagicMock()
+    service.MAX_MESSAGES_PER_CALL = LineApiService.MAX_MESSAGES_PER_CALL
+    service.reply_messages = AsyncMock(return_value=SendMessageResponse(success=True))
+    service.push_messages = AsyncMock(return_value=SendMessageResponse(success=True))
+    return service
+
+
+def make_text_message() -> TextMessage:
+    """建立文字訊息"""
+    return TextMessage(message_id="m1", user_id="U0001", text="hi")
+
+
+class TestProcessAndReply:
+    """測試回覆訊息的打包"""
+
+    @pytest.mark.asyncio
+    async def test_text_response(self):
+        """測試文字回應以單則訊息回覆"""
+        service = make_line_api_service()
+        router = MessageRouterService(service)
+
+        assert await router.process_and_reply(make_text_message(), StaticHandler("ok"), "token")
+
+        messages = service.reply_messages.call_args.args[1]
+        assert messages == [OutboundTextMessage(text="ok")]
+        service.push_messages.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_multiple_messages_in_one_reply(self):
+        """測試多則訊息以同一個 reply token 回覆"""
+        service = make_line_api_service()
+        router = MessageRouterService(service)
+        response = [
+            "文字",
+            OutboundImageMessage(
+                original_content_url="https://example.com/a.jpg",
+                preview_image_url="https://example.com/a_preview.jpg"
+            ),
+        ]
+
+        assert await router.process_and_reply(make_text_message(), StaticHandler(response), "token")
+
+        service.reply_messages.assert_awaited_once()
+        assert len(service.reply_messages.call_args.args[1]) == 2
+        service.push_messages.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_overflow_sent_as_push(self):
+        """測試超過五則的訊息以 push 補送"""
+        service = make_line_api_service()
+        router = MessageRouterService(service)
+        response = [f"第 {i} 則" for i in range(7)]
+
+        assert await router.process_and_reply(make_text_message(), StaticHandler(response), "token")
+
+        assert len(service.reply_messages.call_args.args[1]) == 5
+        user_id, pushed = service.push_messages.call_args.args
+        assert user_id == "U0001"
+        assert [m.text for m in pushed] == ["第 5 則", "第 6 則"]
+
+    @pytest.mark.asyncio
+    async def test_overflow_pushed_to_group(self):
+        """測試群組訊息的補送對象為群組而不是發言者"""
+        service = make_line_api_service()
+        router = MessageRouterService(service)
+        message = TextMessage(message_id="m1", user_id="U0001", conversation_id="C0001", text="hi")
+
+        assert await router.process_and_reply(message, StaticHandler(["a"] * 6), "token")
+
+        target, pushed = service.push_messages.call_args.args
+        assert target == "C0001"
+        assert len(pushed) == 1
+
+    @pytest.mark.asyncio
+    async def test_no_response(self):
+        """測試沒有回應內容時不回覆"""
+        service = make_line_api_service()
+        router = MessageRouterService(service)
+
+        assert await router.process_and_reply(make_text_message(), StaticHandler(None), "token")
+
+        service.reply_messages.assert_not_called()
+
+
+class FileHandler(StaticHandler):
+    """處理檔案與自訂類型訊息的處理器"""
+
+    async def handle_file_message(self, message):
+        return f"檔案：{message.file_name}"
+
+    async def handle_beacon_message(self, message):
+        return "beacon"
+
+
+class BeaconMessage(BaseMessage):
+    """自訂的訊息類型"""
+
+    message_type: str = "beacon"
+
+
+class TestRouteMessage:
+    """測試依訊息類型分派"""
+
+    @pytest.mark.asyncio
+    async def test_file_message_dispatched(self):
+        """測試檔案訊息分派到 handle_file_message"""
+        router = MessageRouterService(make_line_api_service())
+        message = FileMessage(message_id="m2", user_id="U0001", file_name="a.pdf")
+
+        assert await router.route_message(message, FileHandler(None)) == "檔案：a.pdf"
+
+    @pytest.mark.asyncio
+    async def test_custom_type_registration(self):
+        """測試註冊自訂訊息類型的處理器"""
+        router = MessageRouterService(make_line_api_service())
+        message = BeaconMessage(message_id="m3", user_id="U0001")
+
+        assert await router.route_message(message, FileHandler(None)) == "抱歉，我無法處理此類型的訊息。"
+
+        router.register_handler("beacon", "handle_beacon_message")
+
+        assert await router.route_message(message, FileHandler(None)) == "beacon"
+
+
+class SlowHandler(StaticHandler):
+    """執行時間超過上限的處理器"""
+
+    async def handle_text_message(self, message):
+        await asyncio.sleep(1)
+        return "太慢了"
+
+
+class TestReplyDeadline:
+    """測試回覆期限與 push 補送"""
+
+    @pytest.mark.asyncio
+    async def test_missed_deadline_falls_back_to_push(self):
+        """測試錯過期限時改以 push 發送"""
+        service = make_line_api_service()
+        router = MessageRouterService(service, fallback_policy="push")
+
+        assert await router.process_and_reply(
+            make_text_message(), StaticHandler("ok"), "token", deadline=time.time() - 1
+        )
+
+        service.reply_messages.assert_not_called()
+        user_id, pushed = service.push_messages.call_args.args
+        assert user_id == "U0001"
+        assert [m.text for m in pushed] == ["ok"]
+        assert router.stats()["fallback_pushes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_reply_token_falls_back_to_push(self):
+        """測試 LINE 回報 reply token 無效時改以 push 發送"""
+        service = make_line_api_service()
+        service.reply_messages = AsyncMock(return_value=SendMessageResponse(
+            success=False, error_message='LineBotApiError: status_code=400, "Invalid reply token"'
+        ))
+        router = MessageRouterService(service, fallback_policy="push")
+
+        assert await router.process_and_reply(
+            make_text_message(), StaticHandler("ok"), "token", deadline=time.time() + 60
+        )
+
+        service.push_messages.assert_awaited_once()
+        assert router.stats()["missed_replies"] == 1
+
+    @pytest.mark.asyncio
+    async def test_reply_retry_past_deadline_falls_back_to_push(self):
+        """測試回覆被限流且重試會超過期限時改以 push 發送"""
+        service = make_line_api_service()
+        service.reply_messages = AsyncMock(return_value=SendMessageResponse(
+            success=False, error_message=DEADLINE_EXCEEDED
+        ))
+        router = MessageRouterService(service, fallback_policy="push")
+        deadline = time.time() + 60
+
+        assert await router.process_and_reply(
+            make_text_message(), StaticHandler("ok"), "token", deadline=deadline
+        )
+
+        assert service.reply_messages.call_args.kwargs["deadline"] == deadline
+        service.push_messages.assert_awaited_once()
+        assert router.stats()["missed_replies"] == 1
+
+    @pytest.mark.asyncio
+    async def test_drop_policy(self):
+        """測試捨棄策略不發送任何訊息"""
+        service = make_line_api_service()
+        router = MessageRouterService(service, fallback_policy="drop")
+
+        assert not await router.process_and_reply(
+            make_text_message(), StaticHandler("ok"), "token", deadline=time.time() - 1
+        )
+
+        service.reply_messages.assert_not_called()
+        service.push_messages.assert_not_called()
+        assert router.stats()["dropped_replies"] == 1
+
+    @pytest.mark.asyncio
+    async def test_handler_timeout(self):
+        """測試處理器逾時不回覆"""
+        service = make_line_api_service()
+        router = MessageRouterService(service, handler_timeout=0.01)
+
+        assert not await router.process_and_reply(make_text_message(), SlowHandler(None), "token")
+
+        service.reply_messages.assert_not_called()
+        assert router.stats()["handler_timeouts"] == 1
@@ -0,0 +1,66 @@
+"""測試指標登錄表與 /metrics 端點"""
+
+import pytest
+
+from linebot_module.infrastructure.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry:
+    """測試 Prometheus 文字格式輸出"""
+
+    def test_counter_and_gauge(self):
+        """測試計數器與量測值"""
+        registry = MetricsRegistry()
+        calls = registry.counter("calls", "呼叫次數", ("endpoint", "status"))
+        depth = registry.gauge("depth", "佇列深度")
+
+        calls.labels("push", "ok").inc()
+        calls.labels("push", "ok").inc()
+        calls.labels("push", "429").inc()
+        depth.set_function(lambda: 7)
+
+        output = registry.render()
+
+        assert "# TYPE calls counter" in output
+        assert 'calls_total{endpoint="push",status="ok"} 2' in output
+        assert 'calls_total{endpoint="push",status="429"} 1' in output
+        assert "depth 7" in output
+
+    def test_histogram_buckets_are_cumulative(self):
+        """測試直方圖分桶為累計值"""
+        registry = MetricsRegistry()
+        latency = registry.histogram("latency_seconds", "延遲", ("endpoint",), buckets=(0.1, 1.0))
+
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latency.labels("reply").observe(value)
+
+        output = registry.render()
+
+        assert 'latency_seconds_bucket{endpoint="reply",le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{endpoint="reply",le="1.0"} 3' in output
+        assert 'latency_seconds_bucket{endpoint="reply",le="+Inf"} 4' in output
+        assert 'latency_seconds_sum{endpoint="reply"} 4.05' in output
+        assert 'latency_seconds_count{endpoint="reply"} 4' in output
+
+    def test_label_count_mismatch(self):
+        """測試標籤數量不符時拋出錯誤"""
+        registry = MetricsRegistry()
+        calls = registry.counter("calls", "呼叫次數", ("endpoint",))
+
+        with pytest.raises(ValueError):
+            calls.labels("push", "ok")
+
+
+class TestMetricsEndpoint:
+    """測試 /metrics 端點"""
+
+    def test_metrics_endpoint(self, client):
+        """測試輸出包含應用程式指標"""
+        client.get("/api/v1/health")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE linebot_webhook_duration_seconds histogram" in response.text
+        assert "linebot_event_queue_depth 0" in response.text
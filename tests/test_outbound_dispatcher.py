@@ -0,0 +1,256 @@
+"""測試訊息發送佇列"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from linebot.exceptions import LineBotApiError
+from linebot.models import Error
+
+from linebot_module.infrastructure.outbound_dispatcher import (
+    EndpointClass, OutboundDeadlineError, OutboundDispatcher, OutboundQueueFullError,
+    TokenBucket
+)
+
+
+def api_error(status_code: int, headers: dict = None) -> LineBotApiError:
+    """建立 LINE API 錯誤"""
+    return LineBotApiError(
+        status_code=status_code,
+        headers=headers or {},
+        error=Error(message="error")
+    )
+
+
+def make_dispatcher(**kwargs) -> OutboundDispatcher:
+    """建立測試用發送佇列"""
+    options = dict(workers=2, queue_size=10, max_retries=3, retry_base_delay=0.01)
+    options.update(kwargs)
+    return OutboundDispatcher(
+        limiters={endpoint_class: TokenBucket(1000) for endpoint_class in EndpointClass},
+        **options
+    )
+
+
+class TestTokenBucket:
+    """測試限流器"""
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_when_empty(self):
+        """測試 token 用完時等待補充"""
+        bucket = TokenBucket(rate=100, capacity=1)
+
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+
+        assert time.monotonic() - start >= 0.015
+
+    @pytest.mark.asyncio
+    async def test_pause(self):
+        """測試 Retry-After 暫停"""
+        bucket = TokenBucket(rate=1000)
+        bucket.pause(0.05)
+
+        start = time.monotonic()
+        await bucket.acquire()
+
+        assert time.monotonic() - start >= 0.04
+
+
+class TestOutboundDispatcher:
+    """測試發送與重試"""
+
+    @pytest.mark.asyncio
+    async def test_submit_returns_result(self):
+        """測試回傳發送結果"""
+        dispatcher = make_dispatcher()
+        await dispatcher.start()
+
+        async def send():
+            return "ok"
+
+        assert await dispatcher.submit(EndpointClass.PUSH, send) == "ok"
+        await dispatcher.stop()
+        assert dispatcher.stats()["sent"] == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_on_429_honors_retry_after(self):
+        """測試 429 依 Retry-After 重試"""
+        dispatcher = make_dispatcher()
+        await dispatcher.start()
+        attempts = []
+
+        async def send():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise api_error(429, {"Retry-After": "0.05"})
+            return "ok"
+
+        assert await dispatcher.submit(EndpointClass.PUSH, send) == "ok"
+        await dispatcher.stop()
+
+        assert len(attempts) == 2
+        assert attempts[1] - attempts[0] >= 0.04
+        assert dispatcher.stats()["retried"] == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_after_past_deadline_not_retried(self):
+        """測試 Retry-After 超過期限 (reply token 過期) 時不再重試"""
+        dispatcher = make_dispatcher()
+        await dispatcher.start()
+        attempts = []
+
+        async def send():
+            attempts.append(time.monotonic())
+            raise api_error(429, {"Retry-After": "5"})
+
+        with pytest.raises(OutboundDeadlineError):
+            await dispatcher.submit(EndpointClass.REPLY, send, deadline=time.time() + 1)
+        await dispatcher.stop()
+
+        assert len(attempts) == 1
+        assert dispatcher.stats()["pending_retries"] == 0
+        assert dispatcher.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_within_deadline(self):
+        """測試期限內仍可重試"""
+        dispatcher = make_dispatcher()
+        await dispatcher.start()
+        attempts = []
+
+        async def send():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise api_error(429, {"Retry-After": "0.01"})
+            return "ok"
+
+        assert await dispatcher.submit(
+            EndpointClass.REPLY, send, deadline=time.time() + 60
+        ) == "ok"
+        await dispatcher.stop()
+
+        assert len(attempts) == 2
+
+    @pytest.mark.asyncio
+    async def test_client_error_not_retried(self):
+        """測試 4xx 錯誤不重試"""
+        dispatcher = make_dispatcher()
+        await dispatcher.start()
+        attempts = []
+
+        async def send():
+            attempts.append(1)
+            raise api_error(400)
+
+        with pytest.raises(LineBotApiError):
+            await dispatcher.submit(EndpointClass.REPLY, send)
+        await dispatcher.stop()
+
+        assert len(attempts) == 1
+        assert dispatcher.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self):
+        """測試超過重試次數後失敗"""
+        dispatcher = make_dispatcher(max_retries=2)
+        await dispatcher.start()
+        attempts = []
+
+        async def send():
+            attempts.append(1)
+            raise api_error(503)
+
+        with pytest.raises(LineBotApiError):
+            await dispatcher.submit(EndpointClass.PUSH, send, retry_key="key-1")
+        await dispatcher.stop()
+
+        assert len(attempts) == 3
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("error", [api_error(503), httpx.ConnectError("reset")])
+    async def test_transient_error_needs_retry_key(self, error):
+        """測試沒有 retry key 的請求 (reply) 在 5xx 與連線錯誤時不重試"""
+        dispatcher = make_dispatcher()
+        await dispatcher.start()
+        attempts = []
+
+        async def send():
+            attempts.append(1)
+            raise error
+
+        with pytest.raises(type(error)):
+            await dispatcher.submit(EndpointClass.REPLY, send)
+        await dispatcher.stop()
+
+        assert len(attempts) == 1
+        assert dispatcher.stats()["retried"] == 0
+
+    @pytest.mark.asyncio
+    async def test_conflict_after_retry_is_success(self):
+        """測試重試時回應 409 (相同 retry key 已受理) 視為發送成功"""
+        dispatcher = make_dispatcher()
+        await dispatcher.start()
+        attempts = []
+
+        async def send():
+            attempts.append(1)
+            raise api_error(503 if len(attempts) == 1 else 409)
+
+        assert await dispatcher.submit(EndpointClass.PUSH, send, retry_key="key-1") is None
+        await dispatcher.stop()
+
+        assert len(attempts) == 2
+        assert dispatcher.stats()["sent"] == 1
+
+    @pytest.mark.asyncio
+    async def test_throttled_push_does_not_block_reply(self):
+        """測試 push 被限流時 reply 不需排隊等待"""
+        dispatcher = OutboundDispatcher(
+            limiters={
+                EndpointClass.PUSH: TokenBucket(rate=1, capacity=1),
+                EndpointClass.REPLY: TokenBucket(1000),
+            },
+            workers=2,
+            queue_size=10
+        )
+        await dispatcher.start()
+
+        async def send():
+            return "ok"
+
+        pushes = [
+            asyncio.create_task(dispatcher.submit(EndpointClass.PUSH, send)) for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        result = await asyncio.wait_for(dispatcher.submit(EndpointClass.REPLY, send), 0.5)
+
+        assert result == "ok"
+        assert dispatcher.stats()["queues"]["push"] >= 2
+        for task in pushes:
+            task.cancel()
+        await dispatcher.stop(0)
+
+    @pytest.mark.asyncio
+    async def test_queue_full(self):
+        """測試佇列已滿"""
+        dispatcher = make_dispatcher(workers=1, queue_size=1)
+        await dispatcher.start()
+        release = asyncio.Event()
+
+        async def slow_send():
+            await release.wait()
+
+        first = asyncio.create_task(dispatcher.submit(EndpointClass.PUSH, slow_send))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(dispatcher.submit(EndpointClass.PUSH, slow_send))
+        await asyncio.sleep(0)
+
+        with pytest.raises(OutboundQueueFullError):
+            await dispatcher.submit(EndpointClass.PUSH, slow_send)
+
+        release.set()
+        await asyncio.gather(first, second)
+        await dispatcher.stop()
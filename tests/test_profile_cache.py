@@ -0,0 +1,108 @@
+"""測試使用者資料快取"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from linebot_module.domain.models import User
+from linebot_module.infrastructure.http_client import HttpxAsyncHttpClient
+from linebot_module.infrastructure.line_api_service import LineApiService
+from linebot_module.infrastructure.profile_cache import ProfileCache
+
+
+class TestProfileCache:
+    """測試快取行為"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_share_one_load(self):
+        """測試並行查詢只載入一次"""
+        cache = ProfileCache(max_size=10, ttl_seconds=60, negative_ttl_seconds=10)
+        calls = []
+
+        async def loader(user_id):
+            calls.append(user_id)
+            await asyncio.sleep(0.01)
+            return User(user_id=user_id, display_name="Alice")
+
+        users = await asyncio.gather(*(cache.get("U1", loader) for _ in range(5)))
+        again = await cache.get("U1", loader)
+
+        assert calls == ["U1"]
+        assert all(user.display_name == "Alice" for user in users)
+        assert again.display_name == "Alice"
+        assert cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        """測試超過容量時淘汰最久未使用的使用者"""
+        cache = ProfileCache(max_size=2, ttl_seconds=60, negative_ttl_seconds=10)
+
+        cache.put("U1", User(user_id="U1"))
+        cache.put("U2", User(user_id="U2"))
+        cache.peek("U1")
+        cache.put("U3", User(user_id="U3"))
+
+        assert cache.peek("U2") == (False, None)
+        assert cache.peek("U1")[0] is True
+        assert cache.stats()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self):
+        """測試暫時性錯誤不寫入快取"""
+        cache = ProfileCache(max_size=10, ttl_seconds=60, negative_ttl_seconds=10)
+
+        async def failing_loader(user_id):
+            raise RuntimeError("timeout")
+
+        with pytest.raises(RuntimeError):
+            await cache.get("U1", failing_loader)
+
+        assert cache.peek("U1") == (False, None)
+
+
+class TestLineApiServiceProfileCache:
+    """測試 LINE API 服務的使用者資料快取"""
+
+    @pytest.mark.asyncio
+    async def test_not_found_is_negatively_cached(self):
+        """測試查無使用者的結果被快取"""
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            return httpx.Response(404, json={"message": "Not found"})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        cache = ProfileCache(max_size=10, ttl_seconds=60, negative_ttl_seconds=10)
+        service = LineApiService(HttpxAsyncHttpClient(client), profile_cache=cache)
+
+        assert await service.get_user_profile("U404") is None
+        assert await service.get_user_profile("U404") is None
+        await service.close()
+
+        assert len(calls) == 1
+        assert cache.stats()["negative_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_prefetch_and_invalidate(self):
+        """測試批次預先載入與清除快取"""
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            user_id = request.url.path.rsplit("/", 1)[-1]
+            calls.append(user_id)
+            return httpx.Response(200, json={"userId": user_id, "displayName": user_id})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        cache = ProfileCache(max_size=10, ttl_seconds=60, negative_ttl_seconds=10)
+        service = LineApiService(HttpxAsyncHttpClient(client), profile_cache=cache)
+
+        assert await service.prefetch_user_profiles(["U1", "U2", "U1"]) == 2
+        assert await service.prefetch_user_profiles(["U1", "U2"]) == 0
+
+        service.invalidate_user_profile("U1")
+        await service.get_user_profile("U1")
+        await service.close()
+
+        assert sorted(calls) == ["U1", "U1", "U2"]
@@ -0,0 +1,144 @@
+"""測試 channel access token 管理"""
+
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from linebot_module.infrastructure.http_client import HttpxAsyncHttpClient
+from linebot_module.infrastructure.line_api_service import LineApiService
+from linebot_module.infrastructure.token_manager import ChannelTokenManager, TokenIssueError
+
+
+class FakeLine:
+    """模擬 token 端點與 push 端點"""
+
+    def __init__(self, expires_in: float = 900, unauthorized_pushes: int = 0):
+        self.expires_in = expires_in
+        self.unauthorized_pushes = unauthorized_pushes
+        self.issued = 0
+        self.token_forms = []
+        self.push_tokens = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/oauth2/v3/token":
+            self.issued += 1
+            self.token_forms.append(parse_qs(request.content.decode()))
+            return httpx.Response(200, json={
+                "access_token": f"token-{self.issued}",
+                "expires_in": self.expires_in,
+                "token_type": "Bearer",
+            })
+        if request.url.path == "/v2/bot/message/push":
+            self.push_tokens.append(request.headers["Authorization"])
+            if self.unauthorized_pushes:
+                self.unauthorized_pushes -= 1
+                return httpx.Response(401, json={"message": "Authentication failed"})
+            return httpx.Response(200, json={})
+        return httpx.Response(404, json={"message": "Not found"})
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+def build_manager(client: httpx.AsyncClient, **kwargs) -> ChannelTokenManager:
+    """建立 stateless 模式的 token 管理器"""
+    return ChannelTokenManager(
+        client, "https://api.line.me", "stateless", "1234567890", "secret", **kwargs
+    )
+
+
+class TestChannelTokenManager:
+    """測試 token 取得、快取與更新"""
+
+    @pytest.mark.asyncio
+    async def test_start_issues_token_with_credentials(self):
+        """測試啟動時以 channel ID / secret 取得 token 並通知服務"""
+        line = FakeLine()
+        client = line.client()
+        manager = build_manager(client)
+        service = LineApiService(HttpxAsyncHttpClient(client), token_manager=manager)
+
+        await manager.start()
+
+        assert manager.token == "token-1"
+        assert service.line_bot_api.headers["Authorization"] == "Bearer token-1"
+        assert line.token_forms[0]["client_id"] == ["1234567890"]
+        assert line.token_forms[0]["grant_type"] == ["client_credentials"]
+        await manager.stop()
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_refresh_single_flight(self):
+        """測試並行的更新只取得一次 token"""
+        line = FakeLine()
+        client = line.client()
+        manager = build_manager(client)
+
+        tokens = await asyncio.gather(*(manager.refresh() for _ in range(10)))
+
+        assert set(tokens) == {"token-1"}
+        assert line.issued == 1
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_invalidate_stale_token_is_noop(self):
+        """測試以舊 token 回報失效時不重複取得"""
+        line = FakeLine()
+        client = line.client()
+        manager = build_manager(client)
+        await manager.refresh()
+        await manager.refresh()
+
+        assert await manager.invalidate("token-1") == "token-2"
+        assert line.issued == 2
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_background_refresh_before_expiry(self):
+        """測試於到期前在背景更新 token"""
+        line = FakeLine(expires_in=0.2)
+        client = line.client()
+        manager = build_manager(client, refresh_margin=0.5, refresh_jitter=0.1)
+
+        await manager.start()
+        await asyncio.sleep(0.35)
+
+        assert line.issued >= 2
+        assert manager.token == f"token-{line.issued}"
+        await manager.stop()
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_issue_failure(self):
+        """測試取得失敗時拋出 TokenIssueError，啟動時只記錄錯誤"""
+        client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(400, json={"error": "invalid_client"})
+        ))
+        manager = build_manager(client)
+
+        with pytest.raises(TokenIssueError):
+            await manager.refresh()
+
+        await manager.start()
+        assert manager.token is None
+        assert manager.stats()["has_token"] is False
+        await manager.stop()
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_send_retries_after_unauthorized(self):
+        """測試 LINE 回應 401 時重新取得 token 後重試"""
+        line = FakeLine(unauthorized_pushes=1)
+        client = line.client()
+        manager = build_manager(client)
+        service = LineApiService(HttpxAsyncHttpClient(client), token_manager=manager)
+        await manager.start()
+
+        result = await service.send_text_message("U0001", "Hello")
+
+        assert result.success is True
+        assert line.push_tokens == ["Bearer token-1", "Bearer token-2"]
+        await manager.stop()
+        await client.aclose()
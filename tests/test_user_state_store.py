@@ -0,0 +1,267 @@
+"""測試使用者對話狀態儲存"""
+
+import asyncio
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+import pytest_asyncio
+
+from linebot_module.application.services.message_router import MessageRouterService
+from linebot_module.domain.models import TextMessage
+from linebot_module.infrastructure.user_state_store import UserStateStore
+from linebot_module.interfaces.message_handler import IMessageHandler
+
+
+CHANNEL = "default"
+
+
+def stored_rows(path) -> dict:
+    """直接讀取資料庫內容"""
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute("SELECT user_id, status, data FROM user_state").fetchall()
+    return {user_id: (status, data) for user_id, status, data in rows}
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path):
+    """不會自動寫入 (間隔很長) 的狀態儲存"""
+    store = UserStateStore(str(tmp_path / "state.db"), max_size=2, flush_interval=3600)
+    await store.open()
+    yield store
+    await store.close()
+
+
+class TestUserStateStore:
+    """測試快取、write-behind 與讀取自己的寫入"""
+
+    @pytest.mark.asyncio
+    async def test_read_your_writes_before_flush(self, store):
+        """測試變更在寫入資料庫前即可讀取"""
+        assert await store.get_user_info("U1", channel_id=CHANNEL) is None
+
+        assert await store.update_user_status("U1", "ordering", channel_id=CHANNEL) is True
+
+        assert (await store.get_user_info("U1", channel_id=CHANNEL))["status"] == "ordering"
+        assert stored_rows(store.path) == {}
+
+    @pytest.mark.asyncio
+    async def test_updates_batched_into_one_transaction(self, store):
+        """測試多次變更合併為一次寫入，同一使用者只寫入最後狀態"""
+        for i in range(5):
+            await store.update_user_status("U1", f"step-{i}", channel_id=CHANNEL)
+        await store.update_user_status("U2", "idle", channel_id=CHANNEL)
+
+        assert await store.flush() == 2
+
+        assert stored_rows(store.path) == {"U1": ("step-4", "{}"), "U2": ("idle", "{}")}
+        assert store.stats()["flushes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_when_batch_full(self, tmp_path):
+        """測試待寫入筆數達到上限時提前寫入"""
+        store = UserStateStore(str(tmp_path / "state.db"), flush_interval=3600, flush_batch_size=3)
+        await store.open()
+        for user_id in ("U1", "U2", "U3"):
+            await store.update_user_status(user_id, "new", channel_id=CHANNEL)
+
+        for _ in range(100):
+            if store.stats()["rows_written"] == 3:
+                break
+            await asyncio.sleep(0.01)
+
+        assert len(stored_rows(store.path)) == 3
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_evicted_state_reloaded(self, store):
+        """測試超出快取上限的狀態寫入後由資料庫重新載入"""
+        state = await store.load_state("U1", channel_id=CHANNEL)
+        state.status = "checkout"
+        state.data["cart"] = ["咖啡"]
+        await store.save_state(state)
+        await store.flush()
+        await store.update_user_status("U2", "a", channel_id=CHANNEL)
+        await store.update_user_status("U3", "b", channel_id=CHANNEL)
+
+        reloaded = await store.load_state("U1", channel_id=CHANNEL)
+
+        assert reloaded.status == "checkout"
+        assert reloaded.data == {"cart": ["咖啡"]}
+        assert store.stats()["misses"] >= 2
+
+    @pytest.mark.asyncio
+    async def test_unchanged_state_not_written(self, store):
+        """測試未修改的狀態不寫入"""
+        assert await store.save_state(await store.load_state("U1", channel_id=CHANNEL)) is False
+        await store.update_user_status("U1", "a", channel_id=CHANNEL)
+        assert await store.save_state(await store.load_state("U1", channel_id=CHANNEL)) is False
+
+        assert store.stats()["writes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_state_per_channel(self, store):
+        """測試同一使用者在不同 channel 的狀態各自獨立"""
+        await store.update_user_status("U1", "shopping", channel_id="shop")
+        await store.update_user_status("U1", "reading", channel_id="news")
+        await store.flush()
+
+        assert (await store.get_user_info("U1", channel_id="shop"))["status"] == "shopping"
+        assert (await store.get_user_info("U1", channel_id="news"))["status"] == "reading"
+        assert await store.get_user_info("U1", channel_id=CHANNEL) is None
+        assert (await store.for_channel("shop").get_user_info("U1"))["status"] == "shopping"
+
+    @pytest.mark.asyncio
+    async def test_channel_required(self, store):
+        """測試未指定 channel 時不會讀寫預設 channel 的狀態"""
+        with pytest.raises(TypeError):
+            await store.update_user_status("U1", "shopping")
+
+    @pytest.mark.asyncio
+    async def test_hold_serializes_updates(self, store):
+        """測試 hold 區塊內的載入與寫回不會與其他 task 交錯，區塊內的狀態更新隨區塊寫回"""
+        async def increment():
+            async with store.hold("U1", channel_id=CHANNEL) as state:
+                await asyncio.sleep(0.01)
+                state.data["count"] = state.data.get("count", 0) + 1
+                await store.update_user_status("U1", "counted", channel_id=CHANNEL)
+
+        await asyncio.gather(*(increment() for _ in range(5)))
+
+        info = await store.get_user_info("U1", channel_id=CHANNEL)
+        assert info["data"] == {"count": 5}
+        assert info["status"] == "counted"
+        assert store._locks == {}
+        assert store._held == {}
+
+    @pytest.mark.asyncio
+    async def test_hold_not_saved_on_error(self, store):
+        """測試 hold 區塊內發生例外時不寫回"""
+        with pytest.raises(RuntimeError):
+            async with store.hold("U1", channel_id=CHANNEL) as state:
+                state.data["count"] = 1
+                raise RuntimeError("boom")
+
+        assert await store.get_user_info("U1", channel_id=CHANNEL) is None
+        assert store._held == {}
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending(self, tmp_path):
+        """測試關閉時寫入剩餘的變更"""
+        path = str(tmp_path / "state.db")
+        store = UserStateStore(path, flush_interval=3600)
+        await store.open()
+        await store.update_user_status("U1", "done", channel_id=CHANNEL)
+        await store.close()
+
+        reopened = UserStateStore(path)
+        await reopened.open()
+        assert (await reopened.get_user_info("U1", channel_id=CHANNEL))["status"] == "done"
+        await reopened.close()
+
+
+class CounterHandler(IMessageHandler):
+    """以對話狀態計數的訊息處理器"""
+
+    async def handle_text_message(self, message):
+        count = message.user_state.data.get("count", 0) + 1
+        message.user_state.data["count"] = count
+        return f"第 {count} 則"
+
+    async def handle_image_message(self, message):
+        return None
+
+
+class SlowCounterHandler(CounterHandler):
+    """讀取狀態後等待一段時間才寫入的處理器"""
+
+    async def handle_text_message(self, message):
+        count = message.user_state.data.get("count", 0) + 1
+        await asyncio.sleep(0.01)
+        message.user_state.data["count"] = count
+        return None
+
+
+class StatusHandler(CounterHandler):
+    """透過 IUserService 更新並讀取狀態的處理器 (在子 task 中呼叫)"""
+
+    def __init__(self, user_service):
+        self.user_service = user_service
+
+    async def handle_text_message(self, message):
+        message.user_state.data["seen"] = True
+        await asyncio.gather(
+            self.user_service.update_user_status(message.user_id, "ordering"),
+            asyncio.create_task(self.user_service.get_user_info(message.user_id)),
+        )
+        info = await asyncio.create_task(self.user_service.get_user_info(message.user_id))
+        return info["status"]
+
+
+class StateCheckHandler(CounterHandler):
+    """回報是否載入狀態的處理器"""
+
+    async def handle_text_message(self, message):
+        return "no state" if message.user_state is None else "state"
+
+
+class TestRouterUserState:
+    """測試路由器載入與寫回對話狀態"""
+
+    @pytest.mark.asyncio
+    async def test_handler_state_persisted(self, store):
+        """測試處理器修改的狀態在下一則訊息可讀取"""
+        router = MessageRouterService(MagicMock(), user_state_store=store)
+        handler = CounterHandler()
+
+        for i in range(3):
+            message = TextMessage(message_id=f"m{i}", user_id="U1", text="hi")
+            response = await router.route_message(message, handler)
+
+        assert response == "第 3 則"
+        assert (await store.get_user_info("U1", channel_id=CHANNEL))["data"] == {"count": 3}
+        assert store.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_messages_not_lost(self, store):
+        """測試同一使用者同時處理的訊息 (例如私訊與群組) 不會互相覆寫狀態"""
+        router = MessageRouterService(MagicMock(), user_state_store=store, channel_id="shop")
+        handler = SlowCounterHandler()
+
+        await asyncio.gather(*(
+            router.route_message(
+                TextMessage(message_id=f"m{i}", user_id="U1", text="hi"), handler
+            )
+            for i in range(4)
+        ))
+
+        assert (await store.get_user_info("U1", channel_id="shop"))["data"] == {"count": 4}
+
+    @pytest.mark.asyncio
+    async def test_handler_status_update_kept(self, store):
+        """測試處理器 (包括其子 task) 更新的狀態不被路由器寫回的狀態覆寫"""
+        router = MessageRouterService(MagicMock(), user_state_store=store, channel_id="shop")
+        handler = StatusHandler(store.for_channel("shop"))
+
+        response = await asyncio.wait_for(
+            router.route_message(TextMessage(message_id="m1", user_id="U1", text="hi"), handler),
+            timeout=1
+        )
+
+        assert response == "ordering"
+        info = await store.get_user_info("U1", channel_id="shop")
+        assert info["status"] == "ordering"
+        assert info["data"] == {"seen": True}
+        assert await store.get_user_info("U1", channel_id=CHANNEL) is None
+
+    @pytest.mark.asyncio
+    async def test_missing_user_id_skips_state(self, store):
+        """測試沒有使用者 ID 的事件不載入狀態"""
+        router = MessageRouterService(MagicMock(), user_state_store=store)
+
+        response = await router.route_message(
+            TextMessage(message_id="m1", user_id="", text="hi"), StateCheckHandler()
+        )
+
+        assert response == "no state"
+        assert store.stats()["misses"] == 0
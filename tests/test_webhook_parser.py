@@ -0,0 +1,168 @@
+"""測試 Webhook 解析與訊息轉換"""
+
+import base64
+import hashlib
+import hmac
+import json
+
+from unittest.mock import patch
+
+import pytest
+from linebot.exceptions import InvalidSignatureError
+from linebot.models import MessageEvent
+
+from linebot_module.domain.models import (
+    AudioMessage, FileMessage, ImageMessage, LocationMessage, StickerMessage,
+    TextMessage, VideoMessage
+)
+from linebot_module.infrastructure.line_api_service import MessageConverter
+from linebot_module.infrastructure.webhook_parser import WebhookParser
+
+CHANNEL_SECRET = "test_channel_secret"
+
+
+def sign(body: bytes, secret: str = CHANNEL_SECRET) -> str:
+    """產生 X-Line-Signature"""
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("utf-8")
+
+
+def make_text_event(text: str = "Hello") -> dict:
+    """建立文字訊息事件"""
+    return {
+        "type": "message",
+        "mode": "active",
+        "timestamp": 1700000000000,
+        "source": {"type": "user", "userId": "U0001"},
+        "webhookEventId": "01H000000000000000000000",
+        "deliveryContext": {"isRedelivery": False},
+        "replyToken": "reply_token_001",
+        "message": {"id": "10001", "type": "text", "quoteToken": "q", "text": text},
+    }
+
+
+class TestWebhookParser:
+    """測試簽章驗證與解析"""
+
+    def test_parse_valid_signature(self):
+        """測試有效簽章"""
+        body = json.dumps({"destination": "Ubot", "events": [make_text_event()]}).encode()
+        parser = WebhookParser(CHANNEL_SECRET)
+
+        events = parser.parse_events(body, sign(body))
+
+        assert len(events) == 1
+        assert events[0]["message"]["text"] == "Hello"
+
+    def test_parse_invalid_signature(self):
+        """測試無效簽章"""
+        body = json.dumps({"events": []}).encode()
+        parser = WebhookParser(CHANNEL_SECRET)
+
+        with pytest.raises(InvalidSignatureError):
+            parser.parse_events(body, sign(body, "other_secret"))
+
+    def test_parse_missing_signature(self):
+        """測試缺少簽章"""
+        parser = WebhookParser(CHANNEL_SECRET)
+
+        with pytest.raises(InvalidSignatureError):
+            parser.parse_events(b'{"events": []}', "")
+
+
+class TestMessageConverter:
+    """測試由事件字典建立領域模型"""
+
+    def test_from_webhook_event_text(self):
+        """測試文字訊息轉換"""
+        event = make_text_event("你好")
+
+        message = MessageConverter.from_webhook_event(event)
+
+        assert isinstance(message, TextMessage)
+        assert message.text == "你好"
+        assert message.user_id == "U0001"
+        assert message.message_id == "10001"
+        assert message.conversation_id == "U0001"
+        assert message.raw_data == event
+
+    def test_from_webhook_event_group_source(self):
+        """測試群組事件的對話 ID 為群組 ID"""
+        event = make_text_event()
+        event["source"] = {"type": "group", "groupId": "C0001", "userId": "U0001"}
+
+        message = MessageConverter.from_webhook_event(event)
+
+        assert message.user_id == "U0001"
+        assert message.conversation_id == "C0001"
+
+    def test_from_webhook_event_image(self):
+        """測試圖片訊息轉換"""
+        event = make_text_event()
+        event["message"] = {
+            "id": "10002",
+            "type": "image",
+            "contentProvider": {"type": "line"},
+        }
+
+        message = MessageConverter.from_webhook_event(event)
+
+        assert isinstance(message, ImageMessage)
+        assert message.content_type == "line"
+
+    @pytest.mark.parametrize("message, model, field, expected", [
+        ({"type": "audio", "duration": 1500}, AudioMessage, "duration", 1500),
+        ({"type": "video", "duration": 3000}, VideoMessage, "duration", 3000),
+        ({"type": "file", "fileName": "a.pdf", "fileSize": 42}, FileMessage, "file_name", "a.pdf"),
+        ({"type": "location", "title": "台北", "latitude": 25.03, "longitude": 121.56},
+         LocationMessage, "latitude", 25.03),
+        ({"type": "sticker", "packageId": "1", "stickerId": "2"}, StickerMessage, "sticker_id", "2"),
+    ])
+    def test_from_webhook_event_other_types(self, message, model, field, expected):
+        """測試其他訊息類型轉換"""
+        event = make_text_event()
+        event["message"] = {"id": "10003", **message}
+
+        converted = MessageConverter.from_webhook_event(event)
+
+        assert isinstance(converted, model)
+        assert getattr(converted, field) == expected
+
+    def test_unsupported_type_is_rejected(self):
+        """測試不支援的訊息類型回傳 None"""
+        event = make_text_event()
+        event["message"] = {"id": "10004", "type": "beacon"}
+
+        assert not MessageConverter.supports("beacon")
+        assert MessageConverter.from_webhook_event(event) is None
+
+    def test_from_line_message_uses_registry(self):
+        """測試 SDK 事件物件經由相同登錄表轉換"""
+        event = MessageEvent.new_from_json_dict(make_text_event("嗨"))
+
+        message = MessageConverter.from_line_message(event)
+
+        assert isinstance(message, TextMessage)
+        assert message.text == "嗨"
+        assert message.user_id == "U0001"
+
+    def test_lean_mode_matches_validated_model(self):
+        """測試精簡模式建立的模型與驗證後的模型相同，且不複製 raw_data"""
+        event = make_text_event("你好")
+        validated = MessageConverter.from_webhook_event(event)
+
+        with patch.object(MessageConverter, "lean_mode", True):
+            lean = MessageConverter.from_webhook_event(event)
+
+        assert lean == validated
+        assert lean.model_dump() == validated.model_dump()
+        assert lean.raw_data is event
+
+    def test_raw_data_not_retained(self):
+        """測試關閉 raw_data 保留"""
+        with patch.object(MessageConverter, "lean_mode", True), \
+                patch.object(MessageConverter, "retain_raw_data", False):
+            message = MessageConverter.from_webhook_event(make_text_event())
+
+        assert message.raw_data is None
+        assert message.text
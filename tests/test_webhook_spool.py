@@ -0,0 +1,183 @@
+"""測試 webhook 預寫日誌"""
+
+import asyncio
+
+import pytest
+
+from linebot_module.infrastructure.webhook_spool import (
+    FLOCK_AVAILABLE, SpoolLockedError, WebhookSpool
+)
+
+
+async def drain(spool: WebhookSpool, count: int) -> list:
+    """依序取出指定數量的紀錄"""
+    return [await asyncio.wait_for(spool.get(), 1.0) for _ in range(count)]
+
+
+class TestWebhookSpool:
+    """測試寫入、重播、水位與壓縮"""
+
+    @pytest.mark.asyncio
+    async def test_completed_records_not_replayed(self, tmp_path):
+        """測試全部完成後重新開啟不會重播"""
+        spool = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        assert await spool.open() == 0
+
+        await spool.append(b'{"events": [1]}', 100.0)
+        await spool.append(b'{"events": [2]}', 101.0)
+        for record in await drain(spool, 2):
+            spool.complete(record)
+        await spool.close()
+
+        reopened = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        assert await reopened.open() == 0
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_replay_from_watermark(self, tmp_path):
+        """測試由連續完成的位置之後重播，接收時間一併保留"""
+        spool = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        await spool.open()
+        for i in range(4):
+            await spool.append(f"body-{i}".encode(), 100.0 + i)
+
+        records = await drain(spool, 4)
+        spool.complete(records[0])
+        spool.complete(records[2])  # 不連續，水位停在第一筆之後
+        await spool.close()
+
+        reopened = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        assert await reopened.open() == 3
+        replayed = await drain(reopened, 3)
+        assert [r.body for r in replayed] == [b"body-1", b"body-2", b"body-3"]
+        assert replayed[0].received_at == 101.0
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_torn_tail_ignored(self, tmp_path):
+        """測試寫入途中當機留下的不完整紀錄被略過"""
+        spool = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        await spool.open()
+        await spool.append(b"complete", 100.0)
+        await spool.close()
+
+        segment = next(tmp_path.glob("*.seg"))
+        with open(segment, "ab") as f:
+            f.write(b"\x00\x00\x00\x10partial")
+
+        reopened = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        assert await reopened.open() == 1
+        assert (await drain(reopened, 1))[0].body == b"complete"
+
+        # 新紀錄寫入新分段，不受不完整結尾影響
+        await reopened.append(b"next", 101.0)
+        await reopened.close()
+        again = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        assert await again.open() == 2
+        await again.close()
+
+    @pytest.mark.asyncio
+    async def test_finished_segments_compacted(self, tmp_path):
+        """測試已完成的分段被刪除"""
+        spool = WebhookSpool(str(tmp_path), segment_max_bytes=1)
+        await spool.open()
+        for i in range(5):
+            await spool.append(f"body-{i}".encode(), 100.0)
+        assert len(list(tmp_path.glob("*.seg"))) == 5
+
+        for record in await drain(spool, 5):
+            spool.complete(record)
+        await spool.close()
+
+        assert len(list(tmp_path.glob("*.seg"))) == 1
+
+    @pytest.mark.asyncio
+    async def test_group_commit(self, tmp_path):
+        """測試同時到達的附加請求合併為較少次的 fsync"""
+        spool = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024, commit_interval=0.01)
+        await spool.open()
+
+        await asyncio.gather(*(spool.append(b"x", 100.0) for _ in range(50)))
+
+        assert spool.stats()["appended"] == 50
+        assert spool.stats()["commits"] < 50
+        await spool.close()
+
+    @pytest.mark.asyncio
+    async def test_append_requires_open(self, tmp_path):
+        """測試未開啟時拒絕寫入"""
+        spool = WebhookSpool(str(tmp_path), segment_max_bytes=1024)
+
+        with pytest.raises(RuntimeError):
+            await spool.append(b"x", 100.0)
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not FLOCK_AVAILABLE, reason="需要 flock")
+    async def test_single_writer(self, tmp_path):
+        """測試同一目錄只能由一個 spool 開啟，關閉後即可重新開啟"""
+        spool = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        await spool.open()
+
+        other = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        with pytest.raises(SpoolLockedError):
+            await other.open()
+        assert not other.running
+
+        await spool.close()
+        assert await other.open() == 0
+        await other.close()
+
+
+class TestSpooledJobs:
+    """測試 spool 紀錄中事件的完成標記"""
+
+    @pytest.mark.asyncio
+    async def test_cancelled_job_replayed(self, tmp_path):
+        """測試關閉時被取消的事件不標記完成，重新開啟後重播"""
+        from linebot_module.application.api import run_spooled_job
+
+        spool = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        await spool.open()
+        await spool.append(b'{"events": [1]}', 100.0)
+        record, = await drain(spool, 1)
+        record.pending = 1
+        started = asyncio.Event()
+
+        async def job():
+            started.set()
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(run_spooled_job(job, spool, record))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await spool.close()
+
+        assert record.pending == 1
+        reopened = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        assert await reopened.open() == 1
+        assert (await drain(reopened, 1))[0].body == b'{"events": [1]}'
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_job_completed(self, tmp_path):
+        """測試處理器錯誤的事件仍標記完成，不會無限重播"""
+        from linebot_module.application.api import run_spooled_job
+
+        spool = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        await spool.open()
+        await spool.append(b'{"events": [1]}', 100.0)
+        record, = await drain(spool, 1)
+        record.pending = 1
+
+        async def job():
+            raise RuntimeError("handler failed")
+
+        with pytest.raises(RuntimeError):
+            await run_spooled_job(job, spool, record)
+        await spool.close()
+
+        reopened = WebhookSpool(str(tmp_path), segment_max_bytes=1024 * 1024)
+        assert await reopened.open() == 0
+        await reopened.close()